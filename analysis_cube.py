@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Pre-aggregated analysis cube over the enriched injury dataset
+Injuries are aggregated once by season, team, surface, climate zone, day
+of week, injury category and position, with count, sum and sum of
+squares of days_out and games_missed plus a days_out quantile sketch.
+Article and dashboard questions (injuries per team by season, surface
+severity, day-of-week split) are roll-ups over the cube rather than
+re-reads of the raw CSV. Every measure is additive, so a refresh folds
+only new, changed and removed injuries into the cube.
+"""
+
+import os
+import argparse
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from date_normalization import calendar_lookup, parse_dates
+from enrichment_view import DEFAULT_VIEW, EnrichmentView, with_injury_ids
+from injury_taxonomy import classify
+from mls_ids import IdRegistry
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CUBE = "mls_analysis_cube.csv"
+# The fact rows last folded into the cube (what a refresh diffs against)
+DEFAULT_LEDGER = "mls_analysis_cube_rows.csv"
+
+DIMENSIONS = ['season', 'team', 'surface_type', 'climate_zone', 'day_of_week',
+              'injury_category', 'position']
+MEASURES = ['days_out', 'games_missed']
+UNKNOWN = 'Unknown'
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# days_out sketch: log-spaced buckets (as in DDSketch) with quantiles within
+# SKETCH_ACCURACY relative error. Bucket counts add and subtract exactly,
+# which keeps roll-ups and incremental refreshes exact.
+SKETCH_ACCURACY = 0.1
+SKETCH_MAX_DAYS = 3650
+_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+SKETCH_BUCKETS = 2 + int(np.ceil(np.log(SKETCH_MAX_DAYS) / np.log(_GAMMA)))
+SKETCH_COLUMNS = [f'days_out_b{i:02d}' for i in range(SKETCH_BUCKETS)]
+
+SUM_COLUMNS = (['injuries']
+               + [f'{m}_{stat}' for m in MEASURES for stat in ('n', 'sum', 'sumsq')]
+               + SKETCH_COLUMNS)
+
+
+def sketch_bucket(values: np.ndarray) -> np.ndarray:
+    """Sketch bucket per value: 0 for values <= 0, else 1 + ceil(log_gamma(value))"""
+    values = np.clip(np.asarray(values, dtype=float), 0, SKETCH_MAX_DAYS)
+    buckets = np.zeros(len(values), dtype='int64')
+    positive = values > 0
+    buckets[positive] = 1 + np.ceil(np.log(values[positive]) / np.log(_GAMMA) - 1e-9).astype('int64')
+    return buckets
+
+
+def sketch_values() -> np.ndarray:
+    """Representative value per bucket (within SKETCH_ACCURACY of every value in it)"""
+    upper = _GAMMA ** np.arange(SKETCH_BUCKETS - 1)
+    return np.concatenate([[0.0], 2 * upper / (_GAMMA + 1)])
+
+
+def sketch_quantiles(buckets: np.ndarray, quantiles: Sequence[float]) -> np.ndarray:
+    """
+    Quantiles from bucket counts, one row per group
+
+    Args:
+        buckets: (groups, SKETCH_BUCKETS) counts
+        quantiles: Quantiles in [0, 1]
+
+    Returns:
+        (groups, len(quantiles)) values (NaN for empty groups)
+    """
+    totals = buckets.sum(axis=1)
+    cumulative = np.cumsum(buckets, axis=1)
+    representative = sketch_values()
+    result = np.full((len(buckets), len(quantiles)), np.nan)
+    for j, q in enumerate(quantiles):
+        rank = np.maximum(np.ceil(q * totals), 1)
+        index = np.argmax(cumulative >= rank[:, None], axis=1)
+        result[:, j] = np.where(totals > 0, representative[index], np.nan)
+    return result
+
+
+def _positions(injuries: pd.DataFrame, seasons: pd.Series, rosters_csv: str) -> pd.Series:
+    """
+    Playing position per injury
+
+    Legacy files carry a shirt number in the position column; those
+    rows take the player's position from the stored roster of the season.
+    """
+    position = injuries['position'].astype('string').str.strip() if 'position' in injuries.columns \
+        else pd.Series(pd.NA, index=injuries.index, dtype='string')
+    position = position.mask(position.str.fullmatch(r'[\d\-]*', na=True))
+    if position.isna().any() and os.path.exists(rosters_csv):
+        rosters = pd.read_csv(rosters_csv, dtype={'season': 'string', 'position': 'string'})
+        rosters = rosters.dropna(subset=['position']).drop_duplicates(['player_id', 'season'])
+        keys = pd.DataFrame({'player_id': pd.to_numeric(injuries['player_id'], errors='coerce'),
+                             'season': seasons.to_numpy()})
+        looked_up = keys.merge(rosters[['player_id', 'season', 'position']],
+                               on=['player_id', 'season'], how='left')['position']
+        position = position.fillna(pd.Series(looked_up.to_numpy(), index=injuries.index, dtype='string'))
+    return position.fillna(UNKNOWN)
+
+
+def fact_rows(injuries: pd.DataFrame, view_csv: str = DEFAULT_VIEW,
+              rosters_csv: str = "mls_rosters.csv",
+              registry: Optional[IdRegistry] = None) -> pd.DataFrame:
+    """
+    One row per injury with its cube dimensions and measures
+
+    Surface and climate zone are those of the match fixture matching
+    linked the injury to (Unknown when unmatched or without a view).
+
+    Returns:
+        injury_id (index), row_digest, DIMENSIONS (strings) and MEASURES
+    """
+    registry = registry or IdRegistry()
+    injuries = with_injury_ids(registry.add_id_columns(injuries.copy()), registry)
+    injuries = injuries[injuries['injury_id'].notna()].drop_duplicates('injury_id', keep='last')
+    if os.path.exists(view_csv):
+        injuries = EnrichmentView(view_csv).join(injuries)
+    dates = parse_dates(injuries['injury_date']).dt.normalize()
+    seasons = calendar_lookup(dates)['mls_season'].astype('string')
+
+    facts = pd.DataFrame({
+        'season': seasons.to_numpy(),
+        'team': injuries['team'].to_numpy(),
+        'surface_type': injuries.get('surface_type', pd.Series(index=injuries.index, dtype=object)).to_numpy(),
+        'climate_zone': injuries.get('climate_zone', pd.Series(index=injuries.index, dtype=object)).to_numpy(),
+        'day_of_week': dates.dt.day_name().to_numpy(),
+        'injury_category': classify(injuries['injury_type'])['injury_category'].to_numpy(),
+        'position': _positions(injuries, seasons, rosters_csv).to_numpy(),
+    }, index=pd.Index(injuries['injury_id'].astype(str), name='injury_id'))
+    facts = facts.astype(object).where(facts.notna(), UNKNOWN).astype(str)
+    for measure in MEASURES:
+        facts[measure] = pd.to_numeric(injuries[measure], errors='coerce').to_numpy()
+    facts.insert(0, 'row_digest', pd.util.hash_pandas_object(facts, index=False).astype(str).to_numpy())
+    return facts
+
+
+def aggregate(facts: pd.DataFrame, sign: int = 1) -> pd.DataFrame:
+    """
+    Cube cells of a set of fact rows
+
+    Args:
+        facts: fact_rows() table
+        sign: -1 to produce the cells to subtract when rows leave the cube
+
+    Returns:
+        DIMENSIONS plus SUM_COLUMNS, one row per populated cell
+    """
+    sums = pd.DataFrame({'injuries': np.ones(len(facts), dtype='int64')}, index=facts.index)
+    for measure in MEASURES:
+        values = facts[measure].to_numpy(float)
+        known = ~np.isnan(values)
+        sums[f'{measure}_n'] = known.astype('int64')
+        sums[f'{measure}_sum'] = np.where(known, values, 0.0)
+        sums[f'{measure}_sumsq'] = np.where(known, values ** 2, 0.0)
+    days = facts['days_out'].to_numpy(float)
+    one_hot = np.zeros((len(facts), SKETCH_BUCKETS), dtype='int64')
+    known = ~np.isnan(days)
+    one_hot[np.flatnonzero(known), sketch_bucket(days[known])] = 1
+    sums[SKETCH_COLUMNS] = one_hot
+    sums = sums * sign
+    cells = pd.concat([facts[DIMENSIONS], sums], axis=1).groupby(DIMENSIONS, as_index=False).sum()
+    return cells[DIMENSIONS + SUM_COLUMNS]
+
+
+class AnalysisCube:
+    """The materialized cube plus the fact rows it was built from"""
+
+    def __init__(self, path: str = DEFAULT_CUBE, ledger: str = DEFAULT_LEDGER):
+        self.path = path
+        self.ledger = ledger
+        self._cells: Optional[pd.DataFrame] = None
+        self._loaded_mtime = None
+
+    def load(self) -> pd.DataFrame:
+        """Cube cells (cached until the file changes; empty if not built yet)"""
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=DIMENSIONS + SUM_COLUMNS)
+        mtime = os.path.getmtime(self.path)
+        if self._cells is None or mtime != self._loaded_mtime:
+            self._cells = pd.read_csv(self.path, dtype={d: str for d in DIMENSIONS}, keep_default_na=False)
+            self._loaded_mtime = mtime
+        return self._cells
+
+    def _load_ledger(self) -> pd.DataFrame:
+        if not (os.path.exists(self.ledger) and os.path.exists(self.path)):
+            return pd.DataFrame(columns=['injury_id', 'row_digest'] + DIMENSIONS + MEASURES).set_index('injury_id')
+        dtypes = {d: str for d in DIMENSIONS}
+        dtypes.update({'injury_id': str, 'row_digest': str})
+        return pd.read_csv(self.ledger, dtype=dtypes, keep_default_na=False,
+                           na_values={m: [''] for m in MEASURES}).set_index('injury_id')
+
+    def refresh(self, injuries: pd.DataFrame, view_csv: str = DEFAULT_VIEW,
+                rosters_csv: str = "mls_rosters.csv", prune: bool = True,
+                rebuild: bool = False) -> Dict[str, int]:
+        """
+        Fold new, changed and removed injuries into the cube
+
+        Only rows whose dimensions or measures changed since the last
+        refresh are aggregated: the cube gains their new cells and loses
+        their old ones. Without a cube or ledger on disk (or with rebuild)
+        everything is aggregated from scratch.
+
+        Args:
+            injuries: Injury table (injury_id derived when missing)
+            view_csv: Enrichment view with surface and climate zone
+            rosters_csv: Rosters for legacy rows without a position
+            prune: Remove injuries missing from the table; pass False to
+                fold in a batch of new rows only
+            rebuild: Ignore the stored cube and ledger
+
+        Returns:
+            Counts of 'added', 'updated', 'removed', 'unchanged' and 'cells'
+        """
+        facts = fact_rows(injuries, view_csv, rosters_csv)
+        old = self._load_ledger() if not rebuild else self._load_ledger().iloc[0:0]
+        cells = self.load() if len(old) else pd.DataFrame(columns=DIMENSIONS + SUM_COLUMNS)
+
+        common = facts.index.intersection(old.index)
+        changed = common[facts.loc[common, 'row_digest'].to_numpy() != old.loc[common, 'row_digest'].to_numpy()]
+        added = facts.index.difference(old.index)
+        removed = old.index.difference(facts.index) if prune else old.index[:0]
+
+        plus = facts.loc[added.union(changed)]
+        minus = old.loc[removed.union(changed)]
+        if len(plus) or len(minus) or not os.path.exists(self.path):
+            cells = pd.concat([cells, aggregate(plus), aggregate(minus, sign=-1)], ignore_index=True)
+            cells = cells.astype({c: 'float64' for c in SUM_COLUMNS})
+            cells = cells.groupby(DIMENSIONS, as_index=False)[SUM_COLUMNS].sum()
+            cells = cells[cells['injuries'] > 0]
+            integers = [c for c in SUM_COLUMNS if not c.endswith(('_sum', '_sumsq'))]
+            cells = cells.astype({c: 'int64' for c in integers}).sort_values(DIMENSIONS)
+
+            ledger = pd.concat([old.drop(index=removed.union(changed)), plus])
+            for path, table, index in ((self.ledger, ledger, True), (self.path, cells, False)):
+                tmp = path + ".tmp"
+                table.to_csv(tmp, index=index)
+                os.replace(tmp, path)
+            self._cells = None
+
+        counts = {
+            'added': len(added),
+            'updated': len(changed),
+            'removed': len(removed),
+            'unchanged': len(common) - len(changed),
+            'cells': len(self.load()),
+        }
+        logger.info(f"Analysis cube refreshed: {counts}")
+        return counts
+
+    def rollup(self, by: List[str], where: Optional[Dict[str, Sequence[str]]] = None,
+               quantiles: Sequence[float] = (0.5, 0.9)) -> pd.DataFrame:
+        """
+        Aggregate the cube to a coarser grain
+
+        Args:
+            by: Grouping dimensions (any subset of DIMENSIONS, may be empty)
+            where: Dimension -> allowed values, applied before grouping
+            quantiles: days_out quantiles to estimate from the sketch
+
+        Returns:
+            by columns plus injuries, teams (distinct teams in the group, for
+            per-team rates across expansion years), mean/std of days_out
+            and games_missed, and days_out_p<q> columns
+        """
+        cells = self.load()
+        for dimension, values in (where or {}).items():
+            values = [values] if isinstance(values, str) else list(values)
+            cells = cells[cells[dimension].isin([str(v) for v in values])]
+
+        keys = list(by) or ['_all']
+        cells = cells.assign(_all=0, _team=cells['team'].where(cells['team'] != UNKNOWN))
+        grouped = cells.groupby(keys, sort=True)
+        table = grouped[SUM_COLUMNS].sum()
+        result = pd.DataFrame(index=table.index)
+        result['injuries'] = table['injuries']
+        if 'team' not in by:
+            result['teams'] = grouped['_team'].nunique()
+            result['injuries_per_team'] = (result['injuries'] / result['teams'].replace(0, np.nan)).round(1)
+        for measure in MEASURES:
+            n = table[f'{measure}_n'].to_numpy(float)
+            total = table[f'{measure}_sum'].to_numpy(float)
+            squares = table[f'{measure}_sumsq'].to_numpy(float)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.where(n > 0, total / n, np.nan)
+                variance = np.where(n > 1, (squares - total ** 2 / np.maximum(n, 1)) / (n - 1), np.nan)
+            result[f'{measure}_mean'] = np.round(mean, 1)
+            result[f'{measure}_std'] = np.round(np.sqrt(np.maximum(variance, 0)), 1)
+        estimates = sketch_quantiles(table[SKETCH_COLUMNS].to_numpy('int64'), quantiles)
+        for j, q in enumerate(quantiles):
+            result[f'days_out_p{q * 100:g}'] = np.round(estimates[:, j], 0)
+
+        result = result.reset_index(drop=not by)
+        result['injuries'] = result['injuries'].astype('int64')
+        if 'day_of_week' in by:
+            order = pd.Categorical(result['day_of_week'], categories=WEEKDAYS + [UNKNOWN], ordered=True)
+            result = (result.assign(_order=order).sort_values([c if c != 'day_of_week' else '_order' for c in by])
+                      .drop(columns=['_order']).reset_index(drop=True))
+        return result
+
+
+def parse_where(conditions: List[str]) -> Dict[str, List[str]]:
+    """dimension=value[,value...] arguments as a filter dict"""
+    where: Dict[str, List[str]] = {}
+    for condition in conditions:
+        dimension, _, values = condition.partition('=')
+        if dimension not in DIMENSIONS or not values:
+            raise ValueError(f"Bad filter '{condition}' (expected one of {', '.join(DIMENSIONS)}=value)")
+        where.setdefault(dimension, []).extend(v.strip() for v in values.split(','))
+    return where
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Pre-aggregated injury analysis cube")
+    parser.add_argument('--cube', default=DEFAULT_CUBE)
+    parser.add_argument('--ledger', default=DEFAULT_LEDGER)
+    sub = parser.add_subparsers(dest='command')
+    refresh = sub.add_parser('refresh', help="Fold new and changed injuries into the cube (default)")
+    refresh.add_argument('--injuries', default="mls_player_injuries.csv")
+    refresh.add_argument('--view', default=DEFAULT_VIEW)
+    refresh.add_argument('--rosters', default="mls_rosters.csv")
+    refresh.add_argument('--rebuild', action='store_true', help="Aggregate everything from scratch")
+    query = sub.add_parser('query', help="Roll the cube up to some dimensions")
+    query.add_argument('--by', nargs='*', choices=DIMENSIONS, default=['season'])
+    query.add_argument('--where', nargs='*', default=[], metavar='DIM=VALUE[,VALUE]')
+    query.add_argument('--quantiles', nargs='+', type=float, default=[0.5, 0.9])
+    query.add_argument('--output', default='', help="CSV for the result (default: print only)")
+    args = parser.parse_args()
+
+    cube = AnalysisCube(args.cube, args.ledger)
+    if args.command == 'query':
+        if not os.path.exists(args.cube):
+            logger.error(f"{args.cube} not found; run 'python3 analysis_cube.py refresh' first")
+            return
+        cube.load()
+        start = time.perf_counter()
+        table = cube.rollup(args.by, parse_where(args.where), args.quantiles)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if args.output:
+            table.to_csv(args.output, index=False)
+        print("="*70)
+        print(f"ANALYSIS CUBE by {', '.join(args.by) or '(all)'}"
+              + (f" where {' '.join(args.where)}" if args.where else ''))
+        print("="*70)
+        with pd.option_context('display.width', 200, 'display.max_rows', 500):
+            print(table.to_string(index=False))
+        print("="*70)
+        print(f"Rolled up {len(cube.load()):,} cells in {elapsed_ms:.1f} ms")
+        print("="*70)
+        return
+
+    injuries_csv = getattr(args, 'injuries', "mls_player_injuries.csv")
+    counts = cube.refresh(
+        pd.read_csv(injuries_csv),
+        view_csv=getattr(args, 'view', DEFAULT_VIEW),
+        rosters_csv=getattr(args, 'rosters', "mls_rosters.csv"),
+        rebuild=getattr(args, 'rebuild', False),
+    )
+    print("="*70)
+    print("ANALYSIS CUBE REFRESH")
+    print("="*70)
+    print(f"Added: {counts['added']:,}  Updated: {counts['updated']:,}  "
+          f"Removed: {counts['removed']:,}  Unchanged: {counts['unchanged']:,}")
+    print(f"Cells: {counts['cells']:,} (saved to {args.cube})")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end throughput benchmark
+Replays a recorded fixture archive (or serves a synthetic fault-injecting
+league) on localhost and runs the scraper, fixture matcher and 30-day
+performance collector against it with no politeness delay. Each stage runs in
+a fresh process so CPU time and peak RSS are per stage.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import resource
+import argparse
+import logging
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+import fake_transfermarkt
+from page_archive import SEGMENTS_DIR, PageArchive
+from page_fixtures import FixtureArchive, ReplayServer
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+STAGES = ['scrape', 'fixtures', 'performance_30day']
+
+# Copied into the stage working directory when present
+SUPPORT_FILES = ['mls_stadiums.csv', 'mls_players.csv', 'mls_teams.csv']
+
+
+def _run_stage(stage: str, workdir: str, base_url: str, seasons: List[str],
+               injuries_csv: str) -> Dict:
+    """Run one stage in the current (fresh) process and measure it"""
+    os.chdir(workdir)
+    os.environ['TRANSFERMARKT_BASE_URL'] = base_url
+    os.environ.pop('TRANSFERMARKT_RECORD_DIR', None)
+    # No politeness ceiling against a local stand-in
+    os.environ['TRANSFERMARKT_MAX_RPM'] = '0'
+    logging.getLogger().setLevel(logging.WARNING)
+
+    from pipeline_metrics import METRICS
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    if stage == 'scrape':
+        from scrape_mls_injuries import TransfermarktScraper
+        scraper = TransfermarktScraper(delay=0, checkpoint_file="bench_checkpoint.json")
+        df = scraper.scrape_mls_injuries(seasons=seasons, output_file=injuries_csv)
+        scraper.registry.save()
+    elif stage == 'fixtures':
+        from match_injuries_to_fixtures import FixtureMatchingService
+        df = FixtureMatchingService(delay=0).enhance_injuries_with_fixtures(
+            input_csv=injuries_csv, output_csv="bench_fixture_matched.csv"
+        )
+    else:
+        from collect_30day_performance import Performance30DayCollector
+        df = Performance30DayCollector(delay=0).enhance_injury_dataset(
+            input_csv=injuries_csv, output_csv="bench_30day_performance.csv"
+        )
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    pages = METRICS.counter_total('http_requests_total')
+    rows = len(df) if df is not None else 0
+    return {
+        'stage': stage,
+        'wall_s': round(wall, 3),
+        'cpu_s': round(cpu, 3),
+        'pages': int(pages),
+        'rows': rows,
+        'pages_per_s': round(pages / wall, 2) if wall > 0 else None,
+        'rows_per_s': round(rows / wall, 2) if wall > 0 else None,
+        # ru_maxrss is KiB on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(server, stages: List[str], seasons: List[str],
+                  injuries_csv: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Run the selected stages against a local stand-in server
+
+    Args:
+        server: Started page_fixtures.ReplayServer or
+            fake_transfermarkt.FakeTransfermarktServer (stopped on return)
+        stages: Subset of STAGES, run in order
+        seasons: Seasons for the scrape stage
+        injuries_csv: Input for the matcher stages; defaults to the scrape
+            stage's output when it runs, else mls_player_injuries.csv
+        limit: Only use the first N injury rows for the matcher stages
+
+    Returns:
+        One result dict per stage
+    """
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    for name in SUPPORT_FILES:
+        if os.path.exists(os.path.join(repo_dir, name)):
+            shutil.copy(os.path.join(repo_dir, name), workdir)
+
+    stage_input = "bench_injuries.csv"
+    if 'scrape' not in stages or injuries_csv:
+        import pandas as pd
+        df = pd.read_csv(injuries_csv or os.path.join(repo_dir, "mls_player_injuries.csv"))
+        if limit:
+            df = df.head(limit)
+        df.to_csv(os.path.join(workdir, stage_input), index=False)
+
+    results = []
+    context = get_context('spawn')
+    try:
+        for stage in stages:
+            statuses_before = dict(server.status_counts)
+            # A fresh interpreter per stage keeps CPU and RSS figures independent
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(_run_stage, stage, workdir, server.base_url, seasons, stage_input).result()
+            result['non_200'] = sum(
+                count - statuses_before.get(status, 0)
+                for status, count in server.status_counts.items() if status != 200
+            )
+            results.append(result)
+            if stage == 'scrape' and limit:
+                import pandas as pd
+                path = os.path.join(workdir, stage_input)
+                pd.read_csv(path).head(limit).to_csv(path, index=False)
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    revision = _git_revision()
+    stamp = datetime.now().isoformat(timespec='seconds')
+    for result in results:
+        result.update(revision=revision, run_at=stamp)
+    return results
+
+
+def format_results(results: List[Dict]) -> str:
+    lines = [f"{'stage':<18} {'wall s':>8} {'cpu s':>8} {'pages':>7} {'pages/s':>8} "
+             f"{'rows':>7} {'rows/s':>8} {'peak MB':>8} {'non-200':>7}"]
+    lines.append('-' * len(lines[0]))
+    for r in results:
+        lines.append(
+            f"{r['stage']:<18} {r['wall_s']:>8.2f} {r['cpu_s']:>8.2f} {r['pages']:>7} "
+            f"{r['pages_per_s'] or 0:>8.1f} {r['rows']:>7} {r['rows_per_s'] or 0:>8.1f} "
+            f"{r['peak_rss_mb']:>8.1f} {r['non_200']:>7}"
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Offline pipeline throughput benchmark")
+    parser.add_argument('archive', nargs='?', help="Fixture archive or page archive directory")
+    parser.add_argument('--fake', action='store_true',
+                        help="Use a synthetic fault-injecting league instead of an archive")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--seasons', nargs='+', default=["2024"])
+    parser.add_argument('--injuries', help="Input CSV for the matcher stages")
+    parser.add_argument('--limit', type=int, help="Only use the first N injury rows")
+    parser.add_argument('--results', default="benchmark_results.jsonl",
+                        help="Append results here for comparison across changes")
+    fake_transfermarkt.add_arguments(parser)
+    args = parser.parse_args()
+    if not args.fake and not args.archive:
+        parser.error("give a fixture archive or --fake")
+
+    print("="*70)
+    print("MLS Injury Pipeline - Offline Benchmark")
+    print("="*70)
+
+    if args.fake:
+        server = fake_transfermarkt.server_from_args(args).start()
+        source = f"fake:{args.profile}:{args.teams}x{args.players_per_team}"
+    else:
+        if os.path.isdir(os.path.join(args.archive, SEGMENTS_DIR)):
+            archive = PageArchive(args.archive)
+        else:
+            archive = FixtureArchive(args.archive)
+        if not len(archive):
+            parser.error(f"fixture archive {args.archive} is empty")
+        server = ReplayServer(archive).start()
+        source = args.archive
+
+    results = run_benchmark(server, args.stages, args.seasons, args.injuries, args.limit)
+    for result in results:
+        result['source'] = source
+    print()
+    print(format_results(results))
+    if any(r['non_200'] for r in results):
+        print("\nNote: non-200 responses were served (archive misses or injected faults)")
+
+    with open(args.results, 'a') as f:
+        for result in results:
+            f.write(json.dumps(result) + '\n')
+    print(f"\nResults appended to {args.results}")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,8 +7,9 @@ echo "======================================"
 echo ""
 
 # Check if scraper is still running
-if ps -p 56797 > /dev/null 2>&1; then
-    echo "✓ Scraper is RUNNING (PID: 56797)"
+PIDS=$(pgrep -f "scrape_mls_injuries.py|scraper_supervisor.py|sharded_scraper.py" | tr '\n' ' ')
+if [ -n "$PIDS" ]; then
+    echo "✓ Scraper is RUNNING (PID: $PIDS)"
 else
     echo "✗ Scraper has STOPPED"
 fi
@@ -33,6 +34,15 @@ else
     echo "Output file not yet created"
 fi
 
+echo ""
+echo "Live status (scraper_status.txt):"
+echo "--------------------------------------"
+if [ -f "scraper_status.txt" ]; then
+    sed 's/^/  /' scraper_status.txt
+else
+    echo "  No status file yet (scraper_status.txt)"
+fi
+
 echo ""
 echo "To check progress again, run: bash check_progress.sh"
 echo "To view full log: tail -f scraper_output.log"
@@ -4,13 +4,19 @@ Collect player performance data 30 days before and after each injury
 Uses Transfermarkt match-by-match performance data
 """
 
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
-import time
-from datetime import datetime, timedelta
+from datetime import timedelta
 import logging
-from tqdm import tqdm
+import argparse
+
+from date_normalization import parse_date, performance_seasons
+from injury_stream import InjuryStream, append_csv, follow, register_stream_ids
+from mls_ids import IdRegistry
+from page_fetcher import PageFetcher
+from page_parsers import match_log_url, parse_match_log
+from pipeline_metrics import METRICS, start_monitoring
+from request_planner import build_plan, format_plan, plan_performance_30day, summary_line
+from run_logging import progress
 
 logging.basicConfig(
     level=logging.INFO,
@@ -24,35 +30,21 @@ class Performance30DayCollector:
 
     BASE_URL = "https://www.transfermarkt.us"
 
-    def __init__(self, delay: float = 3.0):
+    def __init__(self, delay: float = 3.0, registry: IdRegistry = None):
         self.delay = delay
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        })
+        self.registry = registry or IdRegistry()
+        self.fetcher = PageFetcher(delay=delay)
+        self.session = self.fetcher.session
+        # Parsed match logs by URL; a player's injuries share season pages
+        self.match_log_cache = {}
 
     def _get_page(self, url: str):
         """Fetch page with rate limiting"""
-        try:
-            time.sleep(self.delay)
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
-        except Exception as e:
-            logger.error(f"Failed to fetch {url}: {e}")
-            return None
+        return self.fetcher.get_page(url)
 
     def parse_date(self, date_str: str):
-        """Parse various date formats from Transfermarkt"""
-        try:
-            # Try "Mon DD, YYYY" format
-            return datetime.strptime(date_str, '%b %d, %Y')
-        except:
-            try:
-                # Try other common formats
-                return pd.to_datetime(date_str)
-            except:
-                return None
+        """Parse various date formats from Transfermarkt (memoized in date_normalization)"""
+        return parse_date(date_str)
 
     def get_match_performance_data(self, player_url: str, season: str):
         """
@@ -60,77 +52,17 @@ class Performance30DayCollector:
 
         Returns list of matches with dates and stats
         """
-        # Build performance detail URL
-        perf_url = player_url.replace('/profil/', '/leistungsdatendetails/')
-        perf_url += f"/saison/{season}/plus/1"  # plus/1 gives detailed match view
+        perf_url = match_log_url(player_url, season)
+        METRICS.record_cache('match_logs', perf_url in self.match_log_cache)
+        if perf_url in self.match_log_cache:
+            return self.match_log_cache[perf_url]
 
         soup = self._get_page(perf_url)
         if not soup:
             return []
 
-        matches = []
-
-        # Find the performance table
-        perf_table = soup.find('table', {'class': 'items'})
-        if not perf_table:
-            return []
-
-        rows = perf_table.find_all('tr', {'class': ['odd', 'even']})
-
-        for row in rows:
-            cells = row.find_all('td')
-            if len(cells) < 10:
-                continue
-
-            try:
-                # Extract match date
-                date_cell = cells[2]
-                date_str = date_cell.text.strip()
-                match_date = self.parse_date(date_str)
-
-                if not match_date:
-                    continue
-
-                # Extract stats
-                # Position in lineup (started/sub)
-                position_cell = cells[3]
-                started = 'Startaufstellung' in position_cell.get('title', '') or \
-                         position_cell.find('span', {'class': 'hauptposition'}) is not None
-
-                # Minutes played
-                minutes_cell = cells[5]
-                minutes_text = minutes_cell.text.strip().replace("'", "")
-                minutes = int(minutes_text) if minutes_text.isdigit() else 0
-
-                # Goals
-                goals_cell = cells[6]
-                goals = int(goals_cell.text.strip()) if goals_cell.text.strip().isdigit() else 0
-
-                # Assists
-                assists_cell = cells[7]
-                assists = int(assists_cell.text.strip()) if assists_cell.text.strip().isdigit() else 0
-
-                # Yellow/Red cards
-                yellow_cell = cells[8]
-                yellow = 1 if yellow_cell.find('div', {'class': 'yellow-card'}) else 0
-
-                red_cell = cells[9]
-                red = 1 if red_cell.find('div', {'class': 'red-card'}) else 0
-
-                matches.append({
-                    'date': match_date,
-                    'started': started,
-                    'minutes': minutes,
-                    'goals': goals,
-                    'assists': assists,
-                    'yellow_cards': yellow,
-                    'red_cards': red
-                })
-
-            except Exception as e:
-                logger.debug(f"Error parsing match row: {e}")
-                continue
-
+        matches = parse_match_log(soup)
+        self.match_log_cache[perf_url] = matches
         return matches
 
     def calculate_30day_stats(self, injury_date_str: str, player_url: str):
@@ -143,22 +75,8 @@ class Performance30DayCollector:
         if not injury_date:
             return {}, {}
 
-        # Determine which season(s) to check
-        injury_year = injury_date.year
-
         # MLS season typically runs Feb-Oct, but check both current and adjacent years
-        seasons_to_check = []
-
-        # For dates in Jan-Jun, check previous year's season
-        if injury_date.month <= 6:
-            seasons_to_check.append(str(injury_year - 1))
-
-        # Always check current year
-        seasons_to_check.append(str(injury_year))
-
-        # For dates in Jul-Dec, also check next year
-        if injury_date.month >= 7:
-            seasons_to_check.append(str(injury_year + 1))
+        seasons_to_check = performance_seasons(injury_date)
 
         # Collect all matches from relevant seasons
         all_matches = []
@@ -228,18 +146,19 @@ class Performance30DayCollector:
 
         return before_stats, after_stats
 
-    def enhance_injury_dataset(
-        self,
-        input_csv: str = "mls_player_injuries.csv",
-        output_csv: str = "mls_player_injuries_30day_performance.csv"
-    ):
-        """
-        Enhance injury dataset with 30-day performance windows
+    def add_performance_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        logger.info(f"Loading injury data from {input_csv}")
-        df = pd.read_csv(input_csv)
+        Add 30-day before/after stats to injury rows
 
-        logger.info(f"Enhancing {len(df)} injury records with 30-day performance data")
+        Args:
+            df: Injury rows (player_url is resolved from the registry when missing)
+
+        Returns:
+            The rows with the before_*/after_* columns filled in
+        """
+        # ID-based datasets keep player URLs in the players dimension table
+        df = self.registry.attach_player_urls(self.registry.add_id_columns(df))
+        df = df.reset_index(drop=True)
 
         # Add new columns
         new_cols = [
@@ -255,7 +174,8 @@ class Performance30DayCollector:
             df[col] = None
 
         # Process each injury with progress bar
-        for idx in tqdm(range(len(df)), desc="Processing injuries"):
+        for idx in progress(range(len(df)), desc="Processing injuries", stage="performance_30day"):
+            METRICS.set_progress('performance_30day', idx, len(df))
             row = df.iloc[idx]
 
             before_stats, after_stats = self.calculate_30day_stats(
@@ -270,8 +190,25 @@ class Performance30DayCollector:
             for key, value in after_stats.items():
                 df.at[idx, key] = value
 
+        return df
+
+    def enhance_injury_dataset(
+        self,
+        input_csv: str = "mls_player_injuries.csv",
+        output_csv: str = "mls_player_injuries_30day_performance.csv"
+    ):
+        """
+        Enhance injury dataset with 30-day performance windows
+        """
+        logger.info(f"Loading injury data from {input_csv}")
+        df = pd.read_csv(input_csv)
+
+        logger.info(f"Enhancing {len(df)} injury records with 30-day performance data")
+        df = self.add_performance_columns(df)
+
         # Save enhanced dataset
         df.to_csv(output_csv, index=False)
+        METRICS.inc('rows_written_total', len(df), output=output_csv)
         logger.info(f"Saved enhanced dataset to {output_csv}")
 
         # Print summary
@@ -289,20 +226,71 @@ class Performance30DayCollector:
 
         return df
 
+    def follow_stream(
+        self,
+        stream: InjuryStream,
+        output_csv: str = "mls_player_injuries_30day_performance.csv",
+        stop_event=None
+    ) -> int:
+        """
+        Collect 30-day windows for injuries as the scraper publishes them
+
+        Enhanced rows are appended to output_csv (with injury_id, so a row
+        re-handled after a crash can be de-duplicated); runs until the
+        scraper closes the stream.
+
+        Returns:
+            Number of streamed injuries handled
+        """
+        def handle(batch: pd.DataFrame):
+            batch = register_stream_ids(self.registry, batch)
+            append_csv(self.add_performance_columns(batch), output_csv)
+
+        return follow(stream, "performance_30day", handle, stop_event=stop_event)
+
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description="30-day performance enhancement")
+    parser.add_argument('--status-file', default="performance_status.json")
+    parser.add_argument('--metrics-port', type=int, default=0)
+    parser.add_argument('--plan', action='store_true',
+                        help="Print the pages a run would fetch and its estimated runtime, then exit")
+    parser.add_argument('--follow', nargs='?', const="injury_stream", default='',
+                        help="Enhance injuries from the scraper's stream as they arrive, "
+                             "until the scrape finishes (default injury_stream)")
+    args = parser.parse_args()
+
+    collector = Performance30DayCollector(delay=3.0)
+    if args.follow:
+        # The injury file may not exist yet; there is nothing to plan
+        status_writer = start_monitoring(args.status_file or None, args.metrics_port)
+        handled = collector.follow_stream(InjuryStream(args.follow))
+        print(f"✓ Enhanced {handled:,} streamed injuries")
+        if status_writer:
+            status_writer.stop()
+        return
+
+    plan = build_plan([plan_performance_30day(collector.registry)], collector.fetcher.archive,
+                      collector.fetcher.reuse_hours, collector.delay)
+    if args.plan:
+        print(format_plan(plan))
+        return
+
+    status_writer = start_monitoring(args.status_file or None, args.metrics_port)
+
     print("="*70)
     print("MLS Injury Data - 30-Day Performance Enhancement")
     print("="*70)
     print("\nThis will collect player performance data for:")
     print("  - 30 days BEFORE each injury")
     print("  - 30 days AFTER each injury")
-    print("\nEstimated time: 6-10 hours (3 sec delay per injury)")
+    print(f"\nEstimated time: {summary_line(plan)}")
     print("="*70)
 
-    collector = Performance30DayCollector(delay=3.0)
     df = collector.enhance_injury_dataset()
+    if status_writer:
+        status_writer.stop()
 
 
 if __name__ == "__main__":
@@ -4,13 +4,20 @@ MLS Performance Data Collector
 Enhances injury data with player performance metrics before and after injury
 """
 
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
-import time
-from datetime import datetime, timedelta
-from typing import Dict, Optional, List
+from typing import Dict, Optional
 import logging
+import argparse
+
+from date_normalization import parse_date, transfermarkt_season
+from injury_stream import InjuryStream, append_csv, follow, register_stream_ids
+from mls_ids import IdRegistry
+from page_fetcher import PageFetcher
+from page_parsers import match_log_url, parse_match_log, season_totals
+from pipeline_metrics import METRICS
+from request_planner import build_plan, format_plan, plan_performance_season, summary_line
+from run_logging import progress
 
 logging.basicConfig(
     level=logging.INFO,
@@ -24,23 +31,17 @@ class PerformanceDataCollector:
 
     BASE_URL_TM = "https://www.transfermarkt.us"
 
-    def __init__(self, delay: float = 2.0):
+    def __init__(self, delay: float = 2.0, registry: IdRegistry = None):
         self.delay = delay
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        })
+        self.registry = registry or IdRegistry()
+        self.fetcher = PageFetcher(delay=delay)
+        self.session = self.fetcher.session
+        # Season totals by match-log URL
+        self.stats_cache: Dict[str, Dict] = {}
 
     def _get_page(self, url: str) -> Optional[BeautifulSoup]:
         """Fetch and parse a webpage with rate limiting"""
-        try:
-            time.sleep(self.delay)
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
-        except Exception as e:
-            logger.error(f"Failed to fetch {url}: {e}")
-            return None
+        return self.fetcher.get_page(url)
 
     def get_player_performance_stats(self, player_url: str, season: str) -> Dict:
         """
@@ -53,58 +54,20 @@ class PerformanceDataCollector:
         Returns:
             Dictionary with performance stats
         """
-        # Convert to performance data page
-        perf_url = player_url.replace('/profil/', '/leistungsdatendetails/')
-        perf_url += f"/saison/{season}"
+        # Same game-by-game page the 30-day collector uses, so the two
+        # stages share fetched/archived pages; totals are summed over matches
+        perf_url = match_log_url(player_url, season)
+        METRICS.record_cache('match_logs', perf_url in self.stats_cache)
+        if perf_url in self.stats_cache:
+            return self.stats_cache[perf_url]
 
         soup = self._get_page(perf_url)
 
         if not soup:
             return {}
 
-        stats = {
-            'games': 0,
-            'minutes': 0,
-            'goals': 0,
-            'assists': 0,
-            'yellow_cards': 0,
-            'red_cards': 0
-        }
-
-        # Find performance table
-        perf_table = soup.find('table', {'class': 'items'})
-        if perf_table:
-            # Look for summary row (usually last row)
-            rows = perf_table.find_all('tr', {'class': ['odd', 'even']})
-            if rows:
-                # Sum up stats from all competitions
-                for row in rows:
-                    cells = row.find_all('td')
-                    if len(cells) >= 10:
-                        try:
-                            # Parse appearances
-                            appearances = cells[3].text.strip()
-                            if appearances.isdigit():
-                                stats['games'] += int(appearances)
-
-                            # Parse minutes (remove thousands separator)
-                            minutes_text = cells[5].text.strip().replace('.', '').replace(',', '')
-                            if minutes_text.isdigit():
-                                stats['minutes'] += int(minutes_text)
-
-                            # Parse goals
-                            goals = cells[6].text.strip()
-                            if goals.isdigit():
-                                stats['goals'] += int(goals)
-
-                            # Parse assists
-                            assists = cells[7].text.strip()
-                            if assists.isdigit():
-                                stats['assists'] += int(assists)
-
-                        except (ValueError, IndexError) as e:
-                            logger.debug(f"Error parsing performance row: {e}")
-
+        stats = season_totals(parse_match_log(soup))
+        self.stats_cache[perf_url] = stats
         return stats
 
     def calculate_performance_window(
@@ -126,17 +89,12 @@ class PerformanceDataCollector:
         """
         try:
             # Parse injury date
-            injury_dt = pd.to_datetime(injury_date, errors='coerce')
-            if pd.isna(injury_dt):
+            injury_dt = parse_date(injury_date)
+            if injury_dt is None:
                 return {}, {}
 
-            # Determine season
-            injury_year = injury_dt.year
             # Soccer seasons typically span two years (e.g., 2023 season = 2023-2024)
-            if injury_dt.month < 7:  # Before July = previous season
-                season = str(injury_year - 1)
-            else:
-                season = str(injury_year)
+            season = str(transfermarkt_season(injury_dt))
 
             # Get season stats
             season_stats = self.get_player_performance_stats(player_url, season)
@@ -164,22 +122,19 @@ class PerformanceDataCollector:
             logger.error(f"Error calculating performance window: {e}")
             return {}, {}
 
-    def enhance_injury_data(
-        self,
-        injury_csv: str = "mls_player_injuries.csv",
-        output_csv: str = "mls_player_injuries_enhanced.csv"
-    ):
+    def add_performance_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        Enhance injury data with performance metrics
+        Add season performance metrics to injury rows
 
         Args:
-            injury_csv: Input CSV with injury data
-            output_csv: Output CSV with enhanced data
-        """
-        logger.info(f"Loading injury data from {injury_csv}")
-        df = pd.read_csv(injury_csv)
+            df: Injury rows (player_url is resolved from the registry when missing)
 
-        logger.info(f"Enhancing {len(df)} injury records with performance data")
+        Returns:
+            The rows with the performance columns filled in
+        """
+        # ID-based datasets keep player URLs in the players dimension table
+        df = self.registry.attach_player_urls(self.registry.add_id_columns(df))
+        df = df.reset_index(drop=True)
 
         # Add performance columns
         performance_cols = [
@@ -193,9 +148,9 @@ class PerformanceDataCollector:
                 df[col] = None
 
         # Process each injury
-        for idx, row in df.iterrows():
-            if idx % 10 == 0:
-                logger.info(f"Processing {idx}/{len(df)}")
+        for idx, row in progress(df.iterrows(), desc="Processing injuries",
+                                 stage="performance_season", total=len(df)):
+            METRICS.set_progress('performance_season', idx, len(df))
 
             before_stats, after_stats = self.calculate_performance_window(
                 row['injury_date'],
@@ -224,16 +179,78 @@ class PerformanceDataCollector:
                 )
                 df.at[idx, 'performance_after_injury'] = round(perf_after, 3)
 
+        return df
+
+    def enhance_injury_data(
+        self,
+        injury_csv: str = "mls_player_injuries.csv",
+        output_csv: str = "mls_player_injuries_enhanced.csv"
+    ):
+        """
+        Enhance injury data with performance metrics
+
+        Args:
+            injury_csv: Input CSV with injury data
+            output_csv: Output CSV with enhanced data
+        """
+        logger.info(f"Loading injury data from {injury_csv}")
+        df = pd.read_csv(injury_csv)
+
+        logger.info(f"Enhancing {len(df)} injury records with performance data")
+        df = self.add_performance_columns(df)
+
         # Save enhanced data
         df.to_csv(output_csv, index=False)
+        METRICS.inc('rows_written_total', len(df), output=output_csv)
         logger.info(f"Saved enhanced data to {output_csv}")
 
         return df
 
+    def follow_stream(
+        self,
+        stream: InjuryStream,
+        output_csv: str = "mls_player_injuries_enhanced.csv",
+        stop_event=None
+    ) -> int:
+        """
+        Collect season metrics for injuries as the scraper publishes them
+
+        Enhanced rows are appended to output_csv; runs until the scraper
+        closes the stream.
+
+        Returns:
+            Number of streamed injuries handled
+        """
+        def handle(batch: pd.DataFrame):
+            batch = register_stream_ids(self.registry, batch)
+            append_csv(self.add_performance_columns(batch), output_csv)
+
+        return follow(stream, "performance_season", handle, stop_event=stop_event)
+
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description="Season performance enhancement")
+    parser.add_argument('--plan', action='store_true',
+                        help="Print the pages a run would fetch and its estimated runtime, then exit")
+    parser.add_argument('--follow', nargs='?', const="injury_stream", default='',
+                        help="Enhance injuries from the scraper's stream as they arrive, "
+                             "until the scrape finishes (default injury_stream)")
+    args = parser.parse_args()
+
     collector = PerformanceDataCollector(delay=3.0)
+    if args.follow:
+        # The injury file may not exist yet; there is nothing to plan
+        handled = collector.follow_stream(InjuryStream(args.follow))
+        logger.info(f"Enhanced {handled} streamed injuries")
+        return
+
+    plan = build_plan([plan_performance_season(collector.registry)], collector.fetcher.archive,
+                      collector.fetcher.reuse_hours, collector.delay)
+    if args.plan:
+        print(format_plan(plan))
+        return
+    logger.info(f"Estimated time: {summary_line(plan)}")
 
     df = collector.enhance_injury_data(
         injury_csv="mls_player_injuries.csv",
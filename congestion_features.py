@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Schedule-congestion features from the stored fixture table
+For each injury: days since the team's last match, matches played in the
+prior 7, 14 and 28 days, and whether the team travelled for a midweek
+away match in the prior week. Computed for all injuries at once with
+sorted (team, date) arrays over mls_fixtures.csv; no pages are fetched.
+"""
+
+import os
+import argparse
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from date_normalization import calendar_lookup, parse_dates
+from enrichment_view import DEFAULT_FIXTURES, with_injury_ids
+from mls_ids import IdRegistry
+from pipeline_metrics import METRICS
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = "mls_injury_congestion.csv"
+DEFAULT_TEAM_DATES = "mls_team_congestion.csv"
+
+# Trailing windows (days, including the day itself) for match counts
+WINDOWS = [7, 14, 28]
+
+# Tuesday-Thursday; MLS plays its regular rounds on weekends
+MIDWEEK_DAYS = [1, 2, 3]
+
+# Days in the trailing window checked for midweek away matches
+TRAVEL_WINDOW = 7
+
+FEATURE_COLUMNS = (
+    ['days_since_last_match']
+    + [f'matches_prior_{n}d' for n in WINDOWS]
+    + ['midweek_away_prior_7d']
+)
+
+# Spacing between teams on the combined (team, day) key; larger than any day number
+_TEAM_STRIDE = 1_000_000
+
+
+def load_schedules(fixtures_csv: str = DEFAULT_FIXTURES) -> pd.DataFrame:
+    """
+    Team match dates from the fixture table, sorted by team and date
+
+    Returns:
+        team_id, team (its own name), season, day (days since epoch),
+        venue_team (the home side) and is_away per match; a team's own
+        name is the one appearing in every row of its schedule
+    """
+    columns = ['team_id', 'team', 'season', 'day', 'venue_team', 'is_away']
+    if not os.path.exists(fixtures_csv):
+        return pd.DataFrame(columns=columns)
+    fixtures = pd.read_csv(fixtures_csv, dtype={'season': str})
+    if fixtures.empty:
+        return pd.DataFrame(columns=columns)
+
+    # The team's own name: the most frequent name across home/away in its schedule
+    names = pd.concat([
+        fixtures[['team_id', 'home_team']].rename(columns={'home_team': 'name'}),
+        fixtures[['team_id', 'away_team']].rename(columns={'away_team': 'name'}),
+    ])
+    own = names.value_counts().reset_index().drop_duplicates('team_id').set_index('team_id')['name']
+
+    dates = parse_dates(fixtures['date']).dt.normalize()
+    schedules = pd.DataFrame({
+        'team_id': fixtures['team_id'].astype('int64'),
+        'team': fixtures['team_id'].map(own),
+        'season': fixtures['season'],
+        'day': (dates - pd.Timestamp('1970-01-01')).dt.days,
+        'venue_team': fixtures['home_team'],
+        'is_away': fixtures['away_team'].to_numpy() == fixtures['team_id'].map(own).to_numpy(),
+        'weekday': dates.dt.weekday,
+    }).dropna(subset=['day'])
+    schedules['day'] = schedules['day'].astype('int64')
+    schedules['midweek_away'] = schedules['is_away'] & schedules['weekday'].isin(MIDWEEK_DAYS)
+    return (schedules.drop(columns=['weekday'])
+            .drop_duplicates(['team_id', 'day'])
+            .sort_values(['team_id', 'day'])
+            .reset_index(drop=True))
+
+
+def window_sums(schedules: pd.DataFrame, values: np.ndarray, team_ids: np.ndarray,
+                days: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sum a per-match value over each query's trailing window
+
+    Args:
+        schedules: load_schedules() table
+        values: One number per schedule row (e.g. 1 per match, km travelled)
+        team_ids: Team ID per query (int64)
+        days: Day number per query (int64)
+        window: Days in the window, the query day included
+
+    Returns:
+        Sum of values over the team's matches in (day - window, day]
+    """
+    keys = schedules['team_id'].to_numpy('int64') * _TEAM_STRIDE + schedules['day'].to_numpy('int64')
+    running = np.concatenate([[0], np.cumsum(values)])
+    query = team_ids * _TEAM_STRIDE + days
+    end = np.searchsorted(keys, query, side='right')
+    start = np.searchsorted(keys, query - window, side='right')
+    return running[end] - running[start]
+
+
+def last_match_index(schedules: pd.DataFrame, team_ids: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """Row of each query team's last match on or before the query day (-1 if none)"""
+    keys = schedules['team_id'].to_numpy('int64') * _TEAM_STRIDE + schedules['day'].to_numpy('int64')
+    previous = np.searchsorted(keys, team_ids * _TEAM_STRIDE + days, side='right') - 1
+    if not len(keys):
+        return np.full(len(team_ids), -1)
+    same_team = schedules['team_id'].to_numpy('int64')[np.maximum(previous, 0)] == team_ids
+    return np.where((previous >= 0) & same_team, previous, -1)
+
+
+def congestion_at(schedules: pd.DataFrame, team_ids: np.ndarray, days: np.ndarray) -> pd.DataFrame:
+    """
+    Congestion features for many (team_id, day) queries in one pass
+
+    Every team's match days sit on one sorted key (team_id * stride + day),
+    so each window bound is a single searchsorted over all queries
+    (see window_sums).
+    Matches on the query day itself count as prior matches.
+
+    Args:
+        schedules: load_schedules() table
+        team_ids: Team ID per query (int64)
+        days: Day number per query (days since epoch, int64)
+
+    Returns:
+        FEATURE_COLUMNS aligned with the queries (days_since_last_match is
+        NaN when the team has no earlier stored match)
+    """
+    features: Dict[str, np.ndarray] = {}
+    previous = last_match_index(schedules, team_ids, days)
+    match_days = schedules['day'].to_numpy('int64')
+    last_days = match_days[np.maximum(previous, 0)] if len(match_days) else np.zeros(len(days), 'int64')
+    features['days_since_last_match'] = np.where(previous >= 0, days - last_days, np.nan)
+    ones = np.ones(len(schedules), dtype='int64')
+    for window in WINDOWS:
+        features[f'matches_prior_{window}d'] = window_sums(schedules, ones, team_ids, days, window)
+    midweek_away = schedules['midweek_away'].to_numpy(bool).astype('int64')
+    features['midweek_away_prior_7d'] = window_sums(schedules, midweek_away, team_ids, days, TRAVEL_WINDOW) > 0
+    return pd.DataFrame(features, columns=FEATURE_COLUMNS)
+
+
+def team_date_features(schedules: pd.DataFrame) -> pd.DataFrame:
+    """Congestion features on every team's match days (the day's match included)"""
+    features = congestion_at(
+        schedules, schedules['team_id'].to_numpy('int64'), schedules['day'].to_numpy('int64')
+    )
+    # On a match day the "last match" is the previous one
+    previous = schedules.groupby('team_id')['day'].diff()
+    features['days_since_last_match'] = pd.array(previous, dtype='Int64')
+    table = pd.concat([
+        schedules[['team_id', 'season']].reset_index(drop=True),
+        pd.DataFrame({'date': pd.Timestamp('1970-01-01') + pd.to_timedelta(schedules['day'].to_numpy(), unit='D'),
+                      'is_away': schedules['is_away'].to_numpy()}),
+        features,
+    ], axis=1)
+    return table
+
+
+def injury_congestion(injuries: pd.DataFrame, schedules: pd.DataFrame,
+                      registry: Optional[IdRegistry] = None) -> pd.DataFrame:
+    """
+    Congestion features for every injury at once
+
+    Injuries whose team-season schedule is not in the fixture table (the
+    current season, or teams never matched) get missing values rather
+    than zero counts.
+
+    Args:
+        injuries: Injury rows (team_id and injury_id derived when missing)
+        schedules: load_schedules() table
+
+    Returns:
+        injury_id plus FEATURE_COLUMNS, one row per injury
+    """
+    registry = registry or IdRegistry()
+    injuries = with_injury_ids(registry.add_id_columns(injuries.copy()), registry)
+    dates = parse_dates(injuries['injury_date']).dt.normalize()
+    seasons = calendar_lookup(dates)['mls_season'].astype('string')
+    team_ids = pd.to_numeric(injuries['team_id'], errors='coerce')
+
+    covered = pd.MultiIndex.from_frame(schedules[['team_id', 'season']].drop_duplicates().astype(str))
+    query_keys = pd.MultiIndex.from_arrays([team_ids.astype('Int64').astype(str), seasons.fillna('')])
+    known = query_keys.isin(covered) & dates.notna().to_numpy() & team_ids.notna().to_numpy()
+
+    features = pd.DataFrame(np.nan, index=injuries.index, columns=FEATURE_COLUMNS, dtype=object)
+    if known.any():
+        computed = congestion_at(
+            schedules,
+            team_ids[known].to_numpy('int64'),
+            (dates[known] - pd.Timestamp('1970-01-01')).dt.days.to_numpy('int64'),
+        )
+        computed.index = injuries.index[known]
+        features.loc[known] = computed.astype(object)
+
+    result = pd.concat([injuries[['injury_id']], features], axis=1)
+    for window in WINDOWS:
+        result[f'matches_prior_{window}d'] = result[f'matches_prior_{window}d'].astype('Int64')
+    result['days_since_last_match'] = result['days_since_last_match'].astype('Int64')
+    result['midweek_away_prior_7d'] = result['midweek_away_prior_7d'].astype('boolean')
+    METRICS.inc('rows_written_total', int(known.sum()), output='congestion')
+    logger.info(f"Congestion features for {int(known.sum()):,} of {len(result):,} injuries "
+                f"({len(result) - int(known.sum()):,} without a stored schedule)")
+    return result
+
+
+def read_with_congestion(injuries_csv: str = "mls_player_injuries.csv",
+                         congestion_csv: str = DEFAULT_OUTPUT) -> pd.DataFrame:
+    """Injury table joined with its congestion features"""
+    injuries = with_injury_ids(pd.read_csv(injuries_csv))
+    features = pd.read_csv(congestion_csv, dtype={'injury_id': str}).drop_duplicates('injury_id')
+    return injuries.merge(features, on='injury_id', how='left')
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Schedule-congestion features per injury")
+    parser.add_argument('--injuries', default="mls_player_injuries.csv")
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--team-dates', nargs='?', const=DEFAULT_TEAM_DATES, default='',
+                        help="Also write features for every team match day (default mls_team_congestion.csv)")
+    args = parser.parse_args()
+
+    schedules = load_schedules(args.fixtures)
+    if schedules.empty:
+        logger.error(f"No stored fixtures in {args.fixtures}; run match_injuries_to_fixtures.py first")
+        return
+
+    features = injury_congestion(pd.read_csv(args.injuries), schedules)
+    features.to_csv(args.output, index=False)
+
+    if args.team_dates:
+        team_dates = team_date_features(schedules)
+        team_dates.to_csv(args.team_dates, index=False)
+        logger.info(f"Saved {len(team_dates):,} team match days to {args.team_dates}")
+
+    covered = features.dropna(subset=['matches_prior_7d'])
+    print("="*70)
+    print("SCHEDULE CONGESTION SUMMARY")
+    print("="*70)
+    print(f"Injuries: {len(features):,} ({len(covered):,} with a stored schedule)")
+    if len(covered):
+        print(f"Median days since last match: {covered['days_since_last_match'].median():.0f}")
+        for window in WINDOWS:
+            print(f"Mean matches in prior {window} days: {covered[f'matches_prior_{window}d'].mean():.2f}")
+        print(f"After midweek away travel: {covered['midweek_away_prior_7d'].mean() * 100:.1f}%")
+    print(f"Saved to {args.output}")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Central date and season normalization
+Parses Transfermarkt date strings once (memoized), vectorizes over columns,
+and exposes a precomputed calendar mapping each date to an MLS season and phase
+"""
+
+import logging
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Transfermarkt's English site renders dates as "Jul 18, 2025"
+TRANSFERMARKT_DATE_FORMAT = '%b %d, %Y'
+
+# MLS calendar boundaries as (month, day). Dates on or after the offseason
+# start belong to the following season.
+PRESEASON_START = (1, 15)
+REGULAR_SEASON_START = (2, 21)
+PLAYOFFS_START = (10, 21)
+OFFSEASON_START = (12, 10)
+
+CALENDAR_START = '1990-01-01'
+CALENDAR_END = '2035-12-31'
+
+
+@lru_cache(maxsize=65536)
+def parse_date(date_str: str) -> Optional[datetime]:
+    """
+    Parse a single date string, memoized across all pipeline stages
+
+    Tries the Transfermarkt format first and falls back to pandas' parser.
+
+    Returns:
+        datetime or None if the string cannot be parsed
+    """
+    if not isinstance(date_str, str) or not date_str.strip() or date_str.strip() == '-':
+        return None
+    try:
+        return datetime.strptime(date_str.strip(), TRANSFERMARKT_DATE_FORMAT)
+    except ValueError:
+        try:
+            parsed = pd.to_datetime(date_str)
+            return None if pd.isna(parsed) else parsed.to_pydatetime()
+        except (ValueError, TypeError, OverflowError):
+            return None
+
+
+def parse_dates(values: Iterable) -> pd.Series:
+    """
+    Vectorized date parsing that touches each unique string once
+
+    Unique values are parsed with the Transfermarkt format in one pass;
+    only the leftovers go through the memoized scalar parser.
+
+    Args:
+        values: Series or iterable of date strings (or datetimes)
+
+    Returns:
+        datetime64 Series aligned with the input (NaT where unparseable)
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype='object')
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype='object')
+    parsed = pd.to_datetime(uniques, format=TRANSFERMARKT_DATE_FORMAT, errors='coerce')
+    leftover = parsed.isna()
+    if leftover.any():
+        parsed[leftover] = pd.to_datetime(
+            [parse_date(v) if isinstance(v, str) else None for v in uniques[leftover]]
+        )
+
+    result = np.full(len(series), np.datetime64('NaT'), dtype='datetime64[ns]')
+    found = codes >= 0
+    result[found] = parsed.to_numpy(dtype='datetime64[ns]')[codes[found]]
+    return pd.Series(result, index=series.index, name=series.name)
+
+
+@lru_cache(maxsize=512)
+def season_year_from_label(label: str) -> Optional[int]:
+    """
+    Convert a Transfermarkt season label to its starting year
+
+    "15/16" -> 2015, "98/99" -> 1998, "2023" -> 2023
+
+    Returns:
+        Year or None if the label is not a season
+    """
+    if not isinstance(label, str):
+        return None
+    label = label.strip()
+    head = label.split('/')[0] if '/' in label else label
+    if not head.isdigit():
+        return None
+    if len(head) == 2:
+        year = int(head)
+        return 2000 + year if year < 50 else 1900 + year
+    return int(head) if len(head) == 4 else None
+
+
+def _month_day_key(months: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """Encode (month, day) as a sortable integer MMDD"""
+    return months * 100 + days
+
+
+def _boundary(month_day: tuple) -> int:
+    return month_day[0] * 100 + month_day[1]
+
+
+def build_calendar(start: str = CALENDAR_START, end: str = CALENDAR_END) -> pd.DataFrame:
+    """
+    Precompute the MLS calendar for a date range
+
+    Returns:
+        DataFrame indexed by date with mls_season (int), season_phase
+        (offseason / preseason / regular_season / playoffs) and
+        transfermarkt_season (European-style start year used by
+        player performance pages)
+    """
+    dates = pd.date_range(start, end, freq='D')
+    years = dates.year.to_numpy()
+    key = _month_day_key(dates.month.to_numpy(), dates.day.to_numpy())
+
+    phase = np.select(
+        [
+            key >= _boundary(OFFSEASON_START),
+            key >= _boundary(PLAYOFFS_START),
+            key >= _boundary(REGULAR_SEASON_START),
+            key >= _boundary(PRESEASON_START),
+        ],
+        ['offseason', 'playoffs', 'regular_season', 'preseason'],
+        default='offseason'
+    )
+    mls_season = np.where(key >= _boundary(OFFSEASON_START), years + 1, years)
+    tm_season = np.where(dates.month.to_numpy() < 7, years - 1, years)
+
+    return pd.DataFrame({
+        'mls_season': mls_season,
+        'season_phase': pd.Categorical(
+            phase, categories=['offseason', 'preseason', 'regular_season', 'playoffs']
+        ),
+        'transfermarkt_season': tm_season,
+    }, index=pd.DatetimeIndex(dates, name='date'))
+
+
+@lru_cache(maxsize=1)
+def calendar() -> pd.DataFrame:
+    """Shared precomputed calendar table (built on first use)"""
+    return build_calendar()
+
+
+def calendar_lookup(dates: pd.Series) -> pd.DataFrame:
+    """
+    Map a column of dates to calendar attributes in one vectorized lookup
+
+    Args:
+        dates: Series of date strings or datetimes
+
+    Returns:
+        DataFrame aligned with the input with mls_season, season_phase and
+        transfermarkt_season (missing where the date is unparseable)
+    """
+    parsed = parse_dates(dates).dt.normalize()
+    table = calendar()
+    looked_up = table.reindex(pd.DatetimeIndex(parsed))
+    looked_up.index = parsed.index
+    looked_up['mls_season'] = looked_up['mls_season'].astype('Int64')
+    looked_up['transfermarkt_season'] = looked_up['transfermarkt_season'].astype('Int64')
+    return looked_up
+
+
+def mls_season(date: datetime) -> int:
+    """MLS season year a single date belongs to"""
+    key = date.month * 100 + date.day
+    return date.year + 1 if key >= _boundary(OFFSEASON_START) else date.year
+
+
+def season_phase(date: datetime) -> str:
+    """Season phase for a single date"""
+    return str(calendar().at[pd.Timestamp(date).normalize(), 'season_phase'])
+
+
+def transfermarkt_season(date: datetime) -> int:
+    """Transfermarkt saison_id for player performance pages (season start year)"""
+    return date.year - 1 if date.month < 7 else date.year
+
+
+def performance_seasons(date: datetime) -> List[str]:
+    """
+    Transfermarkt seasons whose match logs can contain games near a date
+
+    Season pages are keyed by start year, so a date in the first half of a
+    year also needs the previous season and one in the second half the next.
+    """
+    seasons = []
+    if date.month <= 6:
+        seasons.append(str(date.year - 1))
+    seasons.append(str(date.year))
+    if date.month >= 7:
+        seasons.append(str(date.year + 1))
+    return seasons
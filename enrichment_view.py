@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Materialized fixture/stadium enrichment keyed by injury ID
+The fixture match (match date, home/away team, opponent) and the home
+stadium's attributes are kept in a small view table next to the injury data
+instead of in a full copy of it. Refreshing re-matches only injuries that are
+new or whose date/team changed, recomputes stadium attributes when
+mls_stadiums.csv changes, and readers join the view on demand.
+"""
+
+import os
+import hashlib
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from date_normalization import calendar_lookup, parse_dates
+from injury_store import injury_ids
+from mls_ids import IdRegistry
+from pipeline_metrics import METRICS
+from rosters import season_is_complete
+from run_logging import progress
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VIEW = "mls_injury_enrichment.csv"
+DEFAULT_FIXTURES = "mls_fixtures.csv"
+
+FIXTURE_COLUMNS = [
+    'match_date', 'home_team', 'away_team', 'opponent',
+    'is_home_game', 'days_between_match_and_injury'
+]
+STADIUM_COLUMNS = ['stadium_name', 'surface_type', 'city', 'state', 'altitude_ft', 'climate_zone']
+VIEW_COLUMNS = ['injury_id', 'input_digest', 'stadiums_digest'] + FIXTURE_COLUMNS + STADIUM_COLUMNS
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """Content hash of a file ('' if it does not exist)"""
+    if not os.path.exists(path):
+        return ''
+    with open(path, 'rb') as f:
+        return _digest(f.read())
+
+
+def input_digests(injuries: pd.DataFrame) -> pd.Series:
+    """Hash of the fields a fixture match depends on (injury date and team)"""
+    return pd.Series(
+        [_digest(f"{date}|{team}".encode('utf-8'))
+         for date, team in zip(injuries['injury_date'], injuries['team'])],
+        index=injuries.index, dtype='object'
+    )
+
+
+def with_injury_ids(injuries: pd.DataFrame, registry: Optional[IdRegistry] = None) -> pd.DataFrame:
+    """Add an injury_id column when the table does not carry one yet"""
+    if 'injury_id' in injuries.columns and injuries['injury_id'].notna().all():
+        return injuries
+    ids = injury_ids((registry or IdRegistry()).add_id_columns(injuries.copy()))
+    injuries = injuries.copy()
+    injuries['injury_id'] = injuries['injury_id'].fillna(ids) if 'injury_id' in injuries.columns else ids
+    return injuries
+
+
+def stadium_attributes(rows: pd.DataFrame, stadiums: pd.DataFrame) -> pd.DataFrame:
+    """
+    Home stadium attributes for matched injuries
+
+    Args:
+        rows: injury_id, home_team and injury_year columns
+        stadiums: mls_stadiums.csv table (first row whose years cover the
+            injury year wins)
+
+    Returns:
+        STADIUM_COLUMNS indexed by injury_id (only rows with a stadium)
+    """
+    candidates = rows[['injury_id', 'home_team', 'injury_year']].merge(
+        stadiums.reset_index().rename(columns={'index': 'stadium_row', 'team': 'home_team'}),
+        on='home_team'
+    )
+    candidates = candidates[
+        (candidates['start_year'] <= candidates['injury_year'])
+        & (candidates['end_year'] >= candidates['injury_year'])
+    ]
+    candidates = candidates.sort_values('stadium_row').drop_duplicates('injury_id')
+    return candidates.set_index('injury_id')[STADIUM_COLUMNS]
+
+
+class EnrichmentView:
+    """Fixture and stadium columns per injury_id, refreshed incrementally"""
+
+    def __init__(self, path: str = DEFAULT_VIEW):
+        self.path = path
+
+    def load(self) -> pd.DataFrame:
+        """The view indexed by injury_id (empty if not built yet)"""
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=VIEW_COLUMNS).set_index('injury_id')
+        df = pd.read_csv(self.path, dtype={'input_digest': str, 'stadiums_digest': str, 'injury_id': str})
+        return df.reindex(columns=VIEW_COLUMNS).set_index('injury_id')
+
+    def stale(self, injuries: pd.DataFrame) -> pd.Series:
+        """Boolean mask of injuries (with injury_id) that need a fixture match"""
+        view = self.load()
+        known = view['input_digest'].reindex(injuries['injury_id']).to_numpy()
+        return pd.Series(known != input_digests(injuries).to_numpy(), index=injuries.index)
+
+    def refresh(self, injuries: pd.DataFrame,
+                match: Callable[[str, str, str], Optional[Dict]],
+                stadiums_csv: str = "mls_stadiums.csv", prune: bool = True) -> Dict[str, int]:
+        """
+        Bring the view up to date with an injury table
+
+        Args:
+            injuries: Injury rows (injury_id is derived when missing)
+            match: find_match_for_injury(injury_date, team, mls_season)
+            stadiums_csv: Stadium table; a content change recomputes the
+                stadium columns of every matched injury (no fetching)
+            prune: Drop view rows whose injury is not in the table; pass
+                False to refresh a batch of new rows (e.g. from the stream)
+
+        Returns:
+            Counts of 'matched' (re-matched injuries), 'reused', 'stadiums'
+            (rows whose stadium columns were recomputed) and 'dropped'
+        """
+        injuries = with_injury_ids(injuries).drop_duplicates('injury_id', keep='last')
+        injuries = injuries[injuries['injury_id'].notna()].set_index('injury_id', drop=False)
+        view = self.load()
+        others = view.index.difference(injuries.index)
+        kept = None if prune else view.loc[others]
+        dropped = len(others) if prune else 0
+        view = view.reindex(injuries.index)
+
+        digests = input_digests(injuries)
+        stale = view['input_digest'].to_numpy() != digests.to_numpy()
+        stale_ids = injuries.index[stale]
+        seasons = calendar_lookup(injuries['injury_date'])['mls_season'].astype('string')
+
+        # Clear the stale rows' fixture columns before re-matching them
+        view = view.astype(object)
+        view.loc[stale_ids, FIXTURE_COLUMNS + STADIUM_COLUMNS] = None
+        for i, iid in enumerate(progress(stale_ids, desc="Matching injuries to fixtures", stage="fixture_matching")):
+            METRICS.set_progress('fixture_matching', i, len(stale_ids))
+            row = injuries.loc[iid]
+            match_info = match(row['injury_date'], row['team'], seasons.loc[iid])
+            if match_info:
+                for key in FIXTURE_COLUMNS:
+                    view.at[iid, key] = match_info[key]
+        view.loc[stale_ids, 'input_digest'] = digests[stale].to_numpy()
+
+        # Stadium attributes: re-matched rows, and every row after a stadium table change
+        stadiums_digest = file_digest(stadiums_csv)
+        redo = stale | (view['stadiums_digest'].to_numpy() != stadiums_digest)
+        redo_ids = injuries.index[redo]
+        if len(redo_ids):
+            stadiums = pd.read_csv(stadiums_csv)
+            rows = pd.DataFrame({
+                'injury_id': redo_ids,
+                'home_team': view.loc[redo_ids, 'home_team'].to_numpy(),
+                'injury_year': parse_dates(injuries.loc[redo_ids, 'injury_date']).dt.year.to_numpy(),
+            })
+            rows = rows[rows['home_team'].notna()]
+            attributes = stadium_attributes(rows, stadiums)
+            view.loc[redo_ids, STADIUM_COLUMNS] = None
+            view.loc[attributes.index, STADIUM_COLUMNS] = attributes.to_numpy()
+            view.loc[redo_ids, 'stadiums_digest'] = stadiums_digest
+
+        if kept is not None and len(kept):
+            view = pd.concat([kept.astype(object), view])
+        tmp = self.path + ".tmp"
+        view.reset_index().reindex(columns=VIEW_COLUMNS).to_csv(tmp, index=False)
+        os.replace(tmp, self.path)
+        counts = {
+            'matched': int(stale.sum()),
+            'reused': int(len(injuries) - stale.sum()),
+            'stadiums': int(redo.sum()),
+            'dropped': dropped,
+        }
+        logger.info(f"Enrichment view refreshed: {counts}")
+        return counts
+
+    def join(self, injuries: pd.DataFrame) -> pd.DataFrame:
+        """Injury rows with the view's fixture and stadium columns attached"""
+        had_ids = 'injury_id' in injuries.columns
+        injuries = with_injury_ids(injuries)
+        view = self.load()[FIXTURE_COLUMNS + STADIUM_COLUMNS]
+        joined = injuries.drop(columns=[c for c in view.columns if c in injuries.columns])
+        joined = joined.join(view, on='injury_id')
+        return joined if had_ids else joined.drop(columns=['injury_id'])
+
+
+def read_enriched(injuries_csv: str = "mls_player_injuries.csv", view_csv: str = DEFAULT_VIEW) -> pd.DataFrame:
+    """Injury table joined with its fixture/stadium enrichment"""
+    return EnrichmentView(view_csv).join(pd.read_csv(injuries_csv))
+
+
+class FixtureStore:
+    """
+    Completed-season team schedules (parsed spielplan pages)
+
+    Stored per (team_id, season) with home and away team names; home/away
+    and opponent are derived for the team name a caller asks with, as
+    parse_fixtures does.
+    """
+
+    COLUMNS = ['team_id', 'season', 'date', 'home_team', 'away_team']
+
+    def __init__(self, path: str = DEFAULT_FIXTURES):
+        self.path = path
+        self.schedules: Dict[Tuple[int, str], List[Tuple]] = {}
+        self._dirty = False
+        if os.path.exists(path):
+            try:
+                df = pd.read_csv(path, dtype={'season': str}, parse_dates=['date'])
+                for team_id, season, date, home, away in df[self.COLUMNS].itertuples(index=False):
+                    self.schedules.setdefault((int(team_id), season), []).append(
+                        (date.to_pydatetime(), home, away)
+                    )
+            except Exception as e:
+                logger.warning(f"Could not load fixture table: {e}")
+
+    def get(self, team_id: int, season: str, team_name: str) -> Optional[List[Dict]]:
+        """Stored schedule in parse_fixtures form, or None"""
+        schedule = self.schedules.get((team_id, season))
+        if schedule is None:
+            return None
+        return [
+            {
+                'date': date,
+                'opponent': away if home == team_name else home,
+                'home_team': home,
+                'away_team': away,
+                'is_home_game': home == team_name
+            }
+            for date, home, away in schedule
+        ]
+
+    def put(self, team_id: int, season: str, fixtures: List[Dict]):
+        """Store a schedule if its season is over (later seasons can still change)"""
+        if not fixtures or not season_is_complete(season):
+            return
+        self.schedules[(team_id, season)] = [(f['date'], f['home_team'], f['away_team']) for f in fixtures]
+        self._dirty = True
+
+    def save(self):
+        """Persist the table (no-op when nothing changed)"""
+        if not self._dirty:
+            return
+        pd.DataFrame(
+            [(team_id, season, date, home, away)
+             for (team_id, season), schedule in self.schedules.items()
+             for date, home, away in schedule],
+            columns=self.COLUMNS
+        ).sort_values(['season', 'team_id', 'date']).to_csv(self.path, index=False)
+        self._dirty = False
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Exposure-normalized injury rates
+Minutes from the archived match logs (the pages the performance collectors
+fetch) are attributed to team, MLS season, position and pitch surface, and
+set against injury counts for the same groups. Rates are injuries per 1000
+hours of match exposure with Poisson confidence intervals, computed for
+every group of a table at once.
+"""
+
+import os
+import argparse
+import logging
+from statistics import NormalDist
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.stats import chi2
+except ImportError:  # optional; Byar's approximation is used without it
+    chi2 = None
+
+from date_normalization import calendar_lookup, parse_dates
+from enrichment_view import DEFAULT_FIXTURES, DEFAULT_VIEW, EnrichmentView, with_injury_ids
+from mls_ids import IdRegistry
+from page_archive import DEFAULT_ARCHIVE_DIR, reparse
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MATCH_LOGS = os.path.join("reparsed", "match_logs.csv")
+DEFAULT_CUBE = "mls_exposure_cube.csv"
+DIMENSIONS = ['team_id', 'season', 'position', 'surface']
+UNKNOWN = 'Unknown'
+
+
+def poisson_interval(counts: np.ndarray, confidence: float = 0.95):
+    """
+    Confidence bounds for Poisson counts (vectorized)
+
+    Exact (chi-square) bounds when scipy is installed, otherwise Byar's
+    approximation: the upper bound is within 1% of the exact one, the lower
+    bound is conservative for counts below about 5.
+
+    Returns:
+        (lower, upper) arrays of expected counts
+    """
+    k = np.asarray(counts, dtype=float)
+    alpha = 1 - confidence
+    if chi2 is not None:
+        lower = np.where(k > 0, chi2.ppf(alpha / 2, 2 * k) / 2, 0.0)
+        upper = chi2.ppf(1 - alpha / 2, 2 * k + 2) / 2
+        return lower, upper
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    safe = np.maximum(k, 1)
+    lower = np.where(k > 0, k * (1 - 1 / (9 * safe) - z / (3 * np.sqrt(safe))) ** 3, 0.0)
+    upper = (k + 1) * (1 - 1 / (9 * (k + 1)) + z / (3 * np.sqrt(k + 1))) ** 3
+    return lower, upper
+
+
+def load_match_logs(path: str = DEFAULT_MATCH_LOGS, archive: str = DEFAULT_ARCHIVE_DIR) -> pd.DataFrame:
+    """
+    Game-by-game minutes per player (player_id, date, minutes)
+
+    Read from a reparsed match-log table; when it does not exist yet it is
+    rebuilt from the page archive (no network).
+    """
+    if not os.path.exists(path):
+        logger.info(f"{path} not found - rebuilding match logs from {archive}")
+        written = reparse(archive, os.path.dirname(path) or ".", ['match_log'])
+        path = written['match_logs']
+    logs = pd.read_csv(path, usecols=lambda c: c in ('player_id', 'date', 'minutes'))
+    if logs.empty:
+        return pd.DataFrame(columns=['player_id', 'date', 'minutes'])
+    logs['date'] = parse_dates(logs['date']).dt.normalize()
+    logs = logs.dropna(subset=['player_id', 'date'])
+    logs['player_id'] = logs['player_id'].astype('int64')
+    # Adjacent season pages can list the same match
+    return logs.drop_duplicates(['player_id', 'date'])
+
+
+def surfaces_by_team_year(stadiums_csv: str = "mls_stadiums.csv") -> pd.DataFrame:
+    """Home surface per (team name, year); the first listed stadium wins, as in stadium_attributes"""
+    stadiums = pd.read_csv(stadiums_csv)
+    years = [np.arange(start, end + 1) for start, end in zip(stadiums['start_year'], stadiums['end_year'])]
+    expanded = stadiums.loc[stadiums.index.repeat([len(y) for y in years]), ['team', 'surface_type']]
+    expanded['year'] = np.concatenate(years) if years else []
+    return expanded.drop_duplicates(['team', 'year']).rename(columns={'team': 'venue_team'})
+
+
+def exposure_minutes(logs: pd.DataFrame, rosters_csv: str = "mls_rosters.csv",
+                     fixtures_csv: str = DEFAULT_FIXTURES,
+                     stadiums_csv: str = "mls_stadiums.csv") -> pd.DataFrame:
+    """
+    Attribute match minutes to team, season, position and surface
+
+    A player's team and position come from the stored squad rosters of the
+    match's MLS season. Where that team-season's schedule is stored, only
+    minutes on its match days count (cup, friendly and national-team games
+    on other days are dropped) and the venue gives the surface; otherwise
+    all of the player's minutes count with an unknown surface. A player on
+    two rosters in one season is credited to the team that played that day.
+
+    Returns:
+        Minutes summed by DIMENSIONS
+    """
+    logs = logs[logs['minutes'] > 0].copy()
+    logs['season'] = calendar_lookup(logs['date'])['mls_season'].astype('string')
+    rosters = pd.read_csv(rosters_csv, dtype={'season': 'string', 'position': str})
+    played = logs.merge(rosters, on=['player_id', 'season'])
+
+    fixtures = pd.read_csv(fixtures_csv, dtype={'season': 'string'}) if os.path.exists(fixtures_csv) \
+        else pd.DataFrame(columns=['team_id', 'season', 'date', 'home_team'])
+    fixtures['date'] = parse_dates(fixtures['date']).dt.normalize()
+    scheduled = fixtures[['team_id', 'season']].drop_duplicates().assign(has_schedule=True)
+    match_days = fixtures[['team_id', 'date', 'home_team']].drop_duplicates(['team_id', 'date'])
+
+    played = played.merge(scheduled, on=['team_id', 'season'], how='left')
+    played = played.merge(match_days.rename(columns={'home_team': 'venue_team'}),
+                          on=['team_id', 'date'], how='left')
+    has_schedule = played['has_schedule'].fillna(False).astype(bool)
+    keep = ~has_schedule | played['venue_team'].notna()
+    played = played[keep]
+    # One team per player and day: prefer the roster team that played that day
+    played = (played.assign(_matched=played['venue_team'].notna())
+              .sort_values('_matched', ascending=False)
+              .drop_duplicates(['player_id', 'date']))
+
+    played['year'] = played['date'].dt.year
+    played = played.merge(surfaces_by_team_year(stadiums_csv), on=['venue_team', 'year'], how='left')
+    played['surface'] = played['surface_type'].fillna(UNKNOWN)
+    played['position'] = played['position'].fillna(UNKNOWN)
+    dropped = len(logs) - len(played)
+    logger.info(f"Attributed {len(played):,} player-matches ({dropped:,} outside stored rosters or schedules)")
+    return played.groupby(DIMENSIONS, as_index=False)['minutes'].sum()
+
+
+def injury_counts(injuries: pd.DataFrame, view_csv: str = DEFAULT_VIEW,
+                  registry: Optional[IdRegistry] = None) -> pd.DataFrame:
+    """
+    Injuries counted by DIMENSIONS
+
+    The surface is that of the match the injury was linked to by fixture
+    matching (unknown for injuries not linked to a match).
+    """
+    registry = registry or IdRegistry()
+    injuries = with_injury_ids(registry.add_id_columns(injuries.copy()), registry)
+    injuries = injuries.drop_duplicates('injury_id')
+    if os.path.exists(view_csv):
+        injuries = EnrichmentView(view_csv).join(injuries)
+    else:
+        injuries['surface_type'] = None
+    injuries['season'] = calendar_lookup(injuries['injury_date'])['mls_season'].astype('string')
+    injuries['surface'] = injuries['surface_type'].fillna(UNKNOWN)
+    injuries['position'] = injuries['position'].fillna(UNKNOWN)
+    injuries['team_id'] = pd.to_numeric(injuries['team_id'], errors='coerce').astype('Int64')
+    injuries = injuries.dropna(subset=['team_id', 'season'])
+    return injuries.groupby(DIMENSIONS, as_index=False).size().rename(columns={'size': 'injuries'})
+
+
+def build_cube(minutes: pd.DataFrame, counts: pd.DataFrame) -> pd.DataFrame:
+    """Minutes and injury counts on the finest grain (outer join of both)"""
+    minutes = minutes.astype({'team_id': 'Int64', 'season': 'string'})
+    counts = counts.astype({'team_id': 'Int64', 'season': 'string'})
+    cube = minutes.merge(counts, on=DIMENSIONS, how='outer')
+    cube['minutes'] = cube['minutes'].fillna(0).astype('int64')
+    cube['injuries'] = cube['injuries'].fillna(0).astype('int64')
+    return cube.sort_values(DIMENSIONS).reset_index(drop=True)
+
+
+def rate_table(cube: pd.DataFrame, by: List[str], confidence: float = 0.95,
+               registry: Optional[IdRegistry] = None) -> pd.DataFrame:
+    """
+    Injuries per 1000 exposure hours for every group of the cube
+
+    Args:
+        cube: build_cube() table
+        by: Grouping dimensions (subset of DIMENSIONS)
+        confidence: Confidence level of the Poisson interval
+
+    Returns:
+        by columns (plus team name when grouping by team_id), injuries,
+        exposure_hours, rate_per_1000h and its lower/upper bounds (NaN
+        where there is no exposure)
+    """
+    table = cube.groupby(by, as_index=False)[['injuries', 'minutes']].sum()
+    hours = table['minutes'].to_numpy(float) / 60
+    lower, upper = poisson_interval(table['injuries'].to_numpy(), confidence)
+    scale = np.divide(1000, hours, out=np.full(len(hours), np.nan), where=hours > 0)
+    table['exposure_hours'] = hours.round(1)
+    table['rate_per_1000h'] = (table['injuries'] * scale).round(2)
+    table['rate_lower'] = (lower * scale).round(2)
+    table['rate_upper'] = (upper * scale).round(2)
+    if 'team_id' in by:
+        registry = registry or IdRegistry()
+        names = registry.canonical_team_names()
+        table.insert(by.index('team_id') + 1, 'team', table['team_id'].map(names))
+    return table.drop(columns=['minutes'])
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Injury rates per 1000 hours of match exposure")
+    parser.add_argument('--by', nargs='+', choices=DIMENSIONS, default=['season'],
+                        help="Grouping dimensions (default season)")
+    parser.add_argument('--injuries', default="mls_player_injuries.csv")
+    parser.add_argument('--match-logs', default=DEFAULT_MATCH_LOGS,
+                        help="Reparsed match-log table (rebuilt from the page archive if missing)")
+    parser.add_argument('--archive', default=DEFAULT_ARCHIVE_DIR)
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--cube', default=DEFAULT_CUBE, help="Where the finest-grain table is written")
+    parser.add_argument('--output', default='', help="CSV for the rate table (default: print only)")
+    args = parser.parse_args()
+
+    logs = load_match_logs(args.match_logs, args.archive)
+    cube = build_cube(exposure_minutes(logs), injury_counts(pd.read_csv(args.injuries)))
+    cube.to_csv(args.cube, index=False)
+    table = rate_table(cube, args.by, args.confidence)
+    if args.output:
+        table.to_csv(args.output, index=False)
+
+    print("="*70)
+    print(f"INJURY RATES PER 1000 MATCH HOURS by {', '.join(args.by)} "
+          f"({args.confidence:.0%} {'exact' if chi2 is not None else 'Byar'} Poisson intervals)")
+    print("="*70)
+    with pd.option_context('display.width', 200, 'display.max_rows', 200):
+        print(table.to_string(index=False))
+    print("="*70)
+    covered = cube[cube['minutes'] > 0]['injuries'].sum()
+    print(f"Injuries with matching exposure: {covered:,} of {cube['injuries'].sum():,}")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+"""
+Fault-injecting local stand-in for transfermarkt.us
+Synthesizes league, squad, injury, transfer, fixture and match-log pages for a
+deterministic fake league of any size, and injects latency, 429s with
+Retry-After, 5xx bursts, hung responses and malformed HTML on demand
+"""
+
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import logging
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from mls_ids import KNOWN_TEAM_IDS
+
+logger = logging.getLogger(__name__)
+
+# Named fault profiles; CLI flags override individual settings
+PROFILES = {
+    'clean': {},
+    'slow': {'latency': 'lognormal', 'latency_ms': 400, 'latency_sigma': 0.6},
+    'throttled': {'rate_limit_rps': 2.0, 'retry_after': 5},
+    'flaky': {
+        'latency': 'lognormal', 'latency_ms': 150, 'latency_sigma': 0.5,
+        'error_rate': 0.02, 'burst_length': 5, 'timeout_rate': 0.005,
+        'truncate_rate': 0.01, 'malformed_rate': 0.01,
+    },
+    'hostile': {
+        'latency': 'lognormal', 'latency_ms': 800, 'latency_sigma': 0.8,
+        'rate_limit_rps': 1.0, 'retry_after': 30, 'error_rate': 0.05,
+        'burst_length': 20, 'timeout_rate': 0.02, 'truncate_rate': 0.05,
+        'malformed_rate': 0.05,
+    },
+}
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+POSITIONS = ['Goalkeeper', 'Centre-Back', 'Left-Back', 'Right-Back', 'Defensive Midfield',
+             'Central Midfield', 'Attacking Midfield', 'Left Winger', 'Right Winger', 'Centre-Forward']
+INJURY_TYPES = ['Hamstring injury', 'Knee injury', 'Ankle injury', 'Muscle injury', 'Groin injury',
+                'Calf injury', 'Cruciate ligament tear', 'Concussion', 'Thigh problems', 'Illness']
+
+# First synthetic IDs; kept well clear of real Transfermarkt ID ranges in tests
+SYNTHETIC_TEAM_ID = 9_000_000
+SYNTHETIC_PLAYER_ID = 90_000_000
+FOREIGN_CLUB_ID = 8_000_000
+
+ROUTES = [
+    ('league', re.compile(r'^/[^/]+/startseite/wettbewerb/\w+/plus/\?saison_id=(?P<season>\d{4})$')),
+    ('squad', re.compile(r'^/[^/]+/kader/verein/(?P<team>\d+)/saison_id/(?P<season>\d{4})')),
+    ('fixtures', re.compile(r'^/[^/]+/spielplan/verein/(?P<team>\d+)/saison_id/(?P<season>\d{4})')),
+    ('injuries', re.compile(r'^/[^/]+/verletzungen/spieler/(?P<player>\d+)')),
+    ('transfers', re.compile(r'^/[^/]+/transfers/spieler/(?P<player>\d+)')),
+    ('match_log', re.compile(r'^/[^/]+/leistungsdatendetails/spieler/(?P<player>\d+)/saison/(?P<season>\d{4})')),
+]
+
+
+def _rng(*parts) -> random.Random:
+    """Deterministic RNG for an entity, independent of request order"""
+    digest = hashlib.sha1(':'.join(str(p) for p in parts).encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+
+def _fmt(d: date) -> str:
+    return f"{MONTHS[d.month - 1]} {d.day}, {d.year}"
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def _table(rows: List[str]) -> str:
+    return ('<html><body><div class="responsive-table"><table class="items"><tbody>'
+            + ''.join(rows) + '</tbody></table></div></body></html>')
+
+
+class FakeLeague:
+    """
+    Deterministic synthetic league
+
+    Nothing is materialized: every page is derived from (seed, entity id), so
+    thousands of teams cost no memory and repeated requests return identical
+    HTML.
+    """
+
+    def __init__(self, teams: int = 29, players_per_team: int = 28, roster_pool: int = 40,
+                 max_injuries: int = 12, first_season: int = 2010, seed: int = 0):
+        """
+        Args:
+            teams: Number of league teams (the first ones reuse real MLS names/IDs)
+            players_per_team: Squad size per season
+            roster_pool: Players a team cycles through across seasons (turnover)
+            max_injuries: Upper bound on injuries per player history
+            first_season: Earliest season players have history for
+            seed: Changes every generated value
+        """
+        self.num_teams = teams
+        self.players_per_team = players_per_team
+        self.roster_pool = max(roster_pool, players_per_team)
+        self.max_injuries = max_injuries
+        self.first_season = first_season
+        self.seed = seed
+
+        real = {}
+        for name, team_id in KNOWN_TEAM_IDS.items():
+            real.setdefault(team_id, name)  # first (canonical) name per ID
+        real_teams = list(real.items())
+        self.teams: List[Tuple[int, str]] = [
+            real_teams[i] if i < len(real_teams) else (SYNTHETIC_TEAM_ID + i, f"Synthetic FC {i}")
+            for i in range(teams)
+        ]
+        self.team_index = {team_id: i for i, (team_id, _) in enumerate(self.teams)}
+
+    # --- entities -------------------------------------------------------
+
+    def team_url(self, team_index: int, page: str = 'startseite') -> str:
+        team_id, name = self.teams[team_index]
+        return f"/{_slug(name)}/{page}/verein/{team_id}"
+
+    def player_id(self, team_index: int, slot: int) -> int:
+        return SYNTHETIC_PLAYER_ID + team_index * self.roster_pool + slot
+
+    def player_team(self, player_id: int) -> Optional[int]:
+        offset = player_id - SYNTHETIC_PLAYER_ID
+        team_index = offset // self.roster_pool
+        return team_index if 0 <= team_index < self.num_teams else None
+
+    def player_name(self, player_id: int) -> str:
+        return f"Player {player_id - SYNTHETIC_PLAYER_ID}"
+
+    def player_path(self, player_id: int, page: str = 'profil') -> str:
+        return f"/player-{player_id - SYNTHETIC_PLAYER_ID}/{page}/spieler/{player_id}"
+
+    def squad(self, team_index: int, season: int) -> List[int]:
+        """Players on a team's roster in a season (rotates through the pool)"""
+        shift = (season - self.first_season) * 3
+        return [self.player_id(team_index, (shift + j) % self.roster_pool)
+                for j in range(self.players_per_team)]
+
+    def injuries(self, player_id: int) -> List[Dict]:
+        """Career injury history, newest first (as Transfermarkt lists it)"""
+        rng = _rng(self.seed, 'injuries', player_id)
+        found = []
+        for _ in range(rng.randint(0, self.max_injuries)):
+            start = date(rng.randint(self.first_season, 2025), rng.randint(1, 12), rng.randint(1, 28))
+            days = int(rng.expovariate(1 / 21)) + 1
+            found.append({
+                'start': start,
+                'end': start + timedelta(days=days),
+                'days': days,
+                'games': days // 7,
+                'type': rng.choice(INJURY_TYPES),
+            })
+        return sorted(found, key=lambda i: i['start'], reverse=True)
+
+    # --- pages ----------------------------------------------------------
+
+    def league_page(self, season: int) -> str:
+        rows = [
+            f'<tr class="{"odd" if i % 2 == 0 else "even"}"><td class="zentriert">{i + 1}</td>'
+            f'<td class="hauptlink no-border-links"><a href="{self.team_url(i)}" title="{name}">{name}</a></td>'
+            f'<td class="zentriert">{self.players_per_team}</td></tr>'
+            for i, (_, name) in enumerate(self.teams)
+        ]
+        return _table(rows)
+
+    def squad_page(self, team_index: int, season: int) -> str:
+        rows = []
+        for n, player_id in enumerate(self.squad(team_index, season)):
+            position = POSITIONS[_rng(self.seed, 'position', player_id).randrange(len(POSITIONS))]
+            rows.append(
+                f'<tr class="{"odd" if n % 2 == 0 else "even"}"><td class="posrela">{position}</td>'
+                f'<td class="hauptlink"><a href="{self.player_path(player_id)}">{self.player_name(player_id)}</a></td>'
+                f'<td class="zentriert">{n + 1}</td></tr>'
+            )
+        return _table(rows)
+
+    def injury_page(self, player_id: int) -> str:
+        team_index = self.player_team(player_id)
+        team_id, team_name = self.teams[team_index]
+        rows = []
+        for n, injury in enumerate(self.injuries(player_id)):
+            start = injury['start']
+            season = f"{start.year % 100:02d}/{(start.year + 1) % 100:02d}"
+            rows.append(
+                f'<tr class="{"odd" if n % 2 == 0 else "even"}"><td class="zentriert">{season}</td>'
+                f'<td class="hauptlink">{injury["type"]}</td>'
+                f'<td class="zentriert">{_fmt(start)}</td><td class="zentriert">{_fmt(injury["end"])}</td>'
+                f'<td class="rechts">{injury["days"]} days</td>'
+                f'<td class="rechts hauptlink"><a href="{self.team_url(team_index)}" title="{team_name}">'
+                f'<img src="/wappen/{team_id}.png" title="{team_name}" class="tiny_wappen"/></a>'
+                f'<span>{injury["games"]}</span></td></tr>'
+            )
+        return _table(rows)
+
+    def transfer_page(self, player_id: int) -> str:
+        rng = _rng(self.seed, 'transfers', player_id)
+        team_index = self.player_team(player_id)
+        team_id, team_name = self.teams[team_index]
+        joined = date(rng.randint(self.first_season - 2, 2024), rng.randint(1, 12), rng.randint(1, 28))
+        clubs = [(FOREIGN_CLUB_ID + rng.randrange(500), None) for _ in range(rng.randint(0, 3))]
+        clubs = [(cid, f"Foreign Club {cid - FOREIGN_CLUB_ID}") for cid, _ in clubs] + [(team_id, team_name)]
+
+        rows = []
+        when = joined - timedelta(days=365 * (len(clubs) - 1))
+        previous = (FOREIGN_CLUB_ID + 999, "Youth Academy")
+        for n, club in enumerate(clubs):
+            rows.append(
+                f'<tr class="{"odd" if n % 2 == 0 else "even"}"><td class="zentriert">{_fmt(when)}</td>'
+                f'<td><a href="/{_slug(previous[1])}/startseite/verein/{previous[0]}">'
+                f'<img class="tiny_wappen" title="{previous[1]}"/></a></td>'
+                f'<td><a href="/{_slug(club[1])}/startseite/verein/{club[0]}">'
+                f'<img class="tiny_wappen" title="{club[1]}"/></a></td>'
+                f'<td class="rechts">free transfer</td></tr>'
+            )
+            previous = club
+            when += timedelta(days=365)
+        return _table(list(reversed(rows)))
+
+    def fixtures_page(self, team_index: int, season: int) -> str:
+        """Double round-robin-style schedule: matchday d pairs i with (d - i) mod N"""
+        n = self.num_teams
+        opening = date(season, 2, 24)
+        rows = []
+        for matchday in range(34):
+            opponent = (matchday - team_index) % n
+            if opponent == team_index:
+                continue  # bye
+            home_index, away_index = (team_index, opponent)
+            if (team_index < opponent) == (matchday % 2 == 1):
+                home_index, away_index = opponent, team_index
+            home_id, home_name = self.teams[home_index]
+            away_id, away_name = self.teams[away_index]
+            match_date = opening + timedelta(days=7 * matchday)
+            rows.append(
+                f'<tr class="{"odd" if matchday % 2 == 0 else "even"}"><td class="zentriert">{matchday + 1}</td>'
+                f'<td class="zentriert">{_fmt(match_date)}</td><td class="zentriert">7:30 PM</td>'
+                f'<td class="zentriert">{"H" if home_index == team_index else "A"}</td>'
+                f'<td><a class="vereinprofil_tooltip" href="/x/startseite/verein/{home_id}" title="{home_name}">{home_name}</a></td>'
+                f'<td class="zentriert">-:-</td>'
+                f'<td><a class="vereinprofil_tooltip" href="/x/startseite/verein/{away_id}" title="{away_name}">{away_name}</a></td>'
+                f'<td class="zentriert">Regular Season</td></tr>'
+            )
+        return _table(rows)
+
+    def match_log_page(self, player_id: int, season: int) -> str:
+        rng = _rng(self.seed, 'matches', player_id, season)
+        opening = date(season, 2, 24)
+        rows = []
+        for matchday in range(34):
+            if rng.random() < 0.35:
+                continue  # not in the squad
+            started = rng.random() < 0.6
+            minutes = 90 if started and rng.random() < 0.7 else rng.randint(1, 89)
+            rows.append(
+                f'<tr class="{"odd" if matchday % 2 == 0 else "even"}"><td>{matchday + 1}</td><td>MLS</td>'
+                f'<td class="zentriert">{_fmt(opening + timedelta(days=7 * matchday))}</td>'
+                f'<td class="zentriert">{"<span class=hauptposition>S</span>" if started else "1"}</td>'
+                f'<td class="zentriert">W 2:1</td>'
+                f'<td class="rechts">{minutes}\'</td>'
+                f'<td class="zentriert">{1 if rng.random() < 0.1 else ""}</td>'
+                f'<td class="zentriert">{1 if rng.random() < 0.08 else ""}</td>'
+                f'<td class="zentriert">{"<div class=yellow-card></div>" if rng.random() < 0.12 else ""}</td>'
+                f'<td class="zentriert">{"<div class=red-card></div>" if rng.random() < 0.01 else ""}</td></tr>'
+            )
+        return _table(rows)
+
+    def render(self, path: str) -> Optional[Tuple[str, str]]:
+        """(page_type, html) for a request path, or None for unknown pages"""
+        for page_type, pattern in ROUTES:
+            match = pattern.match(path)
+            if not match:
+                continue
+            params = match.groupdict()
+            season = int(params['season']) if 'season' in params else None
+            if 'team' in params:
+                team_index = self.team_index.get(int(params['team']))
+                if team_index is None:
+                    return None
+                if page_type == 'squad':
+                    return page_type, self.squad_page(team_index, season)
+                return page_type, self.fixtures_page(team_index, season)
+            if 'player' in params:
+                player_id = int(params['player'])
+                if self.player_team(player_id) is None:
+                    return None
+                if page_type == 'injuries':
+                    return page_type, self.injury_page(player_id)
+                if page_type == 'transfers':
+                    return page_type, self.transfer_page(player_id)
+                return page_type, self.match_log_page(player_id, season)
+            return page_type, self.league_page(season)
+        return None
+
+
+class FaultProfile:
+    """Fault injection settings (all rates are per request, 0 disables)"""
+
+    def __init__(self, latency: str = 'fixed', latency_ms: float = 0.0, latency_sigma: float = 0.5,
+                 rate_limit_rps: float = 0.0, retry_after: int = 5, error_rate: float = 0.0,
+                 burst_length: int = 1, timeout_rate: float = 0.0, hang_seconds: float = 30.0,
+                 truncate_rate: float = 0.0, malformed_rate: float = 0.0, seed: int = 0):
+        """
+        Args:
+            latency: 'fixed', 'uniform' (0..2x latency_ms) or 'lognormal' (median latency_ms)
+            latency_ms: Typical response latency
+            latency_sigma: Spread of the lognormal distribution
+            rate_limit_rps: Token-bucket rate above which requests get 429
+            retry_after: Retry-After seconds sent with 429/503 responses
+            error_rate: Probability a request starts a 5xx burst
+            burst_length: Consecutive requests failing once a burst starts
+            timeout_rate: Probability the server hangs for hang_seconds
+            hang_seconds: How long a hung request waits before answering
+            truncate_rate: Probability the body is cut off mid-table
+            malformed_rate: Probability table markup is mangled
+            seed: Fault decisions are derived from (seed, path, attempt)
+        """
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.rate_limit_rps = rate_limit_rps
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.burst_length = burst_length
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.truncate_rate = truncate_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+
+    @classmethod
+    def named(cls, name: str, **overrides) -> 'FaultProfile':
+        settings = dict(PROFILES[name])
+        settings.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**settings)
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Latency in seconds"""
+        if self.latency_ms <= 0:
+            return 0.0
+        if self.latency == 'uniform':
+            return rng.uniform(0, 2 * self.latency_ms) / 1000
+        if self.latency == 'lognormal':
+            return rng.lognormvariate(math.log(self.latency_ms), self.latency_sigma) / 1000
+        return self.latency_ms / 1000
+
+
+class FakeTransfermarktServer:
+    """Local HTTP server serving a FakeLeague through a FaultProfile"""
+
+    def __init__(self, league: FakeLeague, faults: Optional[FaultProfile] = None, port: int = 0):
+        """
+        Args:
+            league: Synthetic data source
+            faults: Fault injection settings (no faults when omitted)
+            port: Localhost port (0 picks a free one)
+        """
+        self.league = league
+        self.faults = faults or FaultProfile()
+        self.status_counts: Dict[int, int] = {}
+        self.fault_counts: Dict[str, int] = {}
+        self._attempts: Dict[str, int] = {}
+        self._burst_remaining = 0
+        self._tokens = self.faults.rate_limit_rps
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._make_handler())
+        self.server.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _count(self, status: int, fault: Optional[str] = None):
+        with self._lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if fault:
+                self.fault_counts[fault] = self.fault_counts.get(fault, 0) + 1
+
+    def _take_token(self) -> bool:
+        """Token bucket with capacity of one second of traffic"""
+        rate = self.faults.rate_limit_rps
+        if rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(rate, self._tokens + (now - self._last_refill) * rate)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def plan(self, path: str) -> Dict:
+        """
+        Decide how to answer a request
+
+        Decisions depend only on (seed, path, attempt number for the path)
+        plus the shared burst/rate-limit state, so a single-threaded client
+        sees the same faults on every run.
+        """
+        with self._lock:
+            attempt = self._attempts.get(path, 0)
+            self._attempts[path] = attempt + 1
+        rng = _rng(self.faults.seed, path, attempt)
+        decision = {'latency': self.faults.sample_latency(rng), 'fault': None}
+
+        if not self._take_token():
+            decision['fault'] = 'rate_limited'
+            return decision
+        with self._lock:
+            if self._burst_remaining > 0:
+                self._burst_remaining -= 1
+                decision['fault'] = 'server_error'
+            elif rng.random() < self.faults.error_rate:
+                self._burst_remaining = self.faults.burst_length - 1
+                decision['fault'] = 'server_error'
+        if decision['fault']:
+            decision['status'] = rng.choice([500, 502, 503])
+            return decision
+        roll = rng.random()
+        for fault, rate in (('timeout', self.faults.timeout_rate),
+                            ('truncated', self.faults.truncate_rate),
+                            ('malformed', self.faults.malformed_rate)):
+            if roll < rate:
+                decision['fault'] = fault
+                decision['cut'] = rng.uniform(0.2, 0.9)
+                break
+            roll -= rate
+        return decision
+
+    @staticmethod
+    def _mangle(html: str, fault: str, cut: float) -> str:
+        if fault == 'truncated':
+            return html[:int(len(html) * cut)]
+        # Malformed: drop the table class (parsers find nothing) or strip cells
+        if cut < 0.5:
+            return html.replace('class="items"', 'class="items-broken"')
+        return re.sub(r'(<tr class="(?:odd|even)">)(<td[^>]*>.*?</td>){2}', r'\1', html)
+
+    def _make_handler(self):
+        fake = self
+
+        class FakeHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/__stats':
+                    self._send(200, json.dumps(fake.stats()).encode(), 'application/json')
+                    return
+                decision = fake.plan(self.path)
+                fault = decision['fault']
+                if decision['latency']:
+                    time.sleep(decision['latency'])
+
+                if fault == 'rate_limited':
+                    fake._count(429, fault)
+                    self._send(429, b'Too Many Requests', retry_after=fake.faults.retry_after)
+                    return
+                if fault == 'server_error':
+                    status = decision['status']
+                    fake._count(status, fault)
+                    retry_after = fake.faults.retry_after if status == 503 else None
+                    self._send(status, b'Server Error', retry_after=retry_after)
+                    return
+                if fault == 'timeout':
+                    time.sleep(fake.faults.hang_seconds)
+
+                page = fake.league.render(self.path.split('#')[0])
+                if page is None:
+                    fake._count(404)
+                    self._send(404, b'Not Found')
+                    return
+                _, html = page
+                if fault in ('truncated', 'malformed'):
+                    html = fake._mangle(html, fault, decision['cut'])
+                fake._count(200, fault)
+                self._send(200, html.encode())
+
+            def _send(self, status: int, body: bytes, content_type: str = 'text/html; charset=utf-8',
+                      retry_after: Optional[int] = None):
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', content_type)
+                    self.send_header('Content-Length', str(len(body)))
+                    if retry_after is not None:
+                        self.send_header('Retry-After', str(retry_after))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client gave up (e.g. its timeout fired during a hang)
+
+            def log_message(self, format, *args):
+                logger.debug(f"fake transfermarkt: {format % args}")
+
+        return FakeHandler
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': sum(self.status_counts.values()),
+                'status_counts': {str(k): v for k, v in sorted(self.status_counts.items())},
+                'faults': dict(self.fault_counts),
+            }
+
+    def start(self) -> 'FakeTransfermarktServer':
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fake-transfermarkt', daemon=True)
+        self.thread.start()
+        logger.info(f"Fake Transfermarkt ({self.league.num_teams} teams) at {self.base_url}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """League and fault flags shared by this CLI and benchmark_pipeline"""
+    parser.add_argument('--teams', type=int, default=29)
+    parser.add_argument('--players-per-team', type=int, default=28)
+    parser.add_argument('--max-injuries', type=int, default=12)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='clean')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float)
+    parser.add_argument('--rate-limit-rps', type=float)
+    parser.add_argument('--retry-after', type=int)
+    parser.add_argument('--error-rate', type=float)
+    parser.add_argument('--burst-length', type=int)
+    parser.add_argument('--timeout-rate', type=float)
+    parser.add_argument('--truncate-rate', type=float)
+    parser.add_argument('--malformed-rate', type=float)
+
+
+def server_from_args(args, port: int = 0) -> FakeTransfermarktServer:
+    league = FakeLeague(teams=args.teams, players_per_team=args.players_per_team,
+                        max_injuries=args.max_injuries, seed=args.seed)
+    faults = FaultProfile.named(
+        args.profile, latency_ms=args.latency_ms, rate_limit_rps=args.rate_limit_rps,
+        retry_after=args.retry_after, error_rate=args.error_rate, burst_length=args.burst_length,
+        timeout_rate=args.timeout_rate, truncate_rate=args.truncate_rate,
+        malformed_rate=args.malformed_rate, seed=args.seed
+    )
+    return FakeTransfermarktServer(league, faults, port)
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Fault-injecting local Transfermarkt stand-in")
+    parser.add_argument('--port', type=int, default=8766)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_args(args, args.port).start()
+    print(f"export TRANSFERMARKT_BASE_URL={server.base_url}")
+    print(f"Stats: curl -s {server.base_url}/__stats")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Partitioned injury store with stable injury IDs
+Injury rows are kept in one CSV partition per MLS season and applied in
+batches by upsert: new injuries are inserted, re-scraped ones with changed
+fields (team re-attribution, return date, days out) are updated in place,
+and only the partitions a batch touches are rewritten. Every insert and
+update is recorded in changes.jsonl.
+"""
+
+import io
+import os
+import json
+import hashlib
+import argparse
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from date_normalization import calendar_lookup, parse_dates
+from mls_ids import IdRegistry
+from scrape_mls_injuries import INJURY_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = "injury_store"
+CHANGES_FILE = "changes.jsonl"
+MANIFEST_FILE = "manifest.json"
+UNKNOWN_PARTITION = "unknown"
+
+STORE_COLUMNS = ['injury_id'] + INJURY_COLUMNS
+
+# Columns whose change makes a re-scraped injury an update
+# (data_collection_date changes on every scrape)
+TRACKED_COLUMNS = [c for c in INJURY_COLUMNS if c not in ('player_id', 'data_collection_date')]
+
+
+def injury_id(player_id, injury_date, injury_type) -> str:
+    """
+    Stable ID of an injury: hash of (player_id, injury date, injury type)
+
+    Dates are normalized to ISO form and injury types to casefolded,
+    single-spaced text, so formatting differences do not change the ID.
+    """
+    key = f"{int(player_id)}|{injury_date}|{' '.join(str(injury_type).split()).casefold()}"
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def injury_ids(df: pd.DataFrame) -> pd.Series:
+    """injury_id for every row of an injury table (None where player_id is missing)"""
+    dates = parse_dates(df['injury_date'])
+    iso = dates.dt.strftime('%Y-%m-%d').where(dates.notna(), df['injury_date'].astype(str).str.strip())
+    return pd.Series(
+        [
+            injury_id(player_id, date, injury_type) if pd.notna(player_id) else None
+            for player_id, date, injury_type in zip(df['player_id'], iso, df['injury_type'])
+        ],
+        index=df.index, dtype='object'
+    )
+
+
+def _as_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Canonical string form of a table (as its CSV cells read back), '' for missing"""
+    out = pd.DataFrame(index=df.index)
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+            values = values.astype('Int64')
+        out[col] = values.astype('string').fillna('').astype(object)
+    return out
+
+
+class InjuryStore:
+    """Injury rows partitioned by MLS season, keyed by injury_id"""
+
+    def __init__(self, path: str = DEFAULT_STORE_DIR, registry: Optional[IdRegistry] = None):
+        """
+        Args:
+            path: Store directory
+            registry: Derives player/team IDs for legacy (URL/name based) batches
+        """
+        self.path = path
+        self.registry = registry or IdRegistry()
+
+    def partition_path(self, partition: str) -> str:
+        return os.path.join(self.path, f"season={partition}.csv")
+
+    def partitions(self) -> List[str]:
+        """Partition names present in the store, sorted"""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            name[len("season="):-len(".csv")] for name in os.listdir(self.path)
+            if name.startswith("season=") and name.endswith(".csv")
+        )
+
+    def is_empty(self) -> bool:
+        return not self.partitions()
+
+    def read_partition(self, partition: str) -> pd.DataFrame:
+        """One partition as text columns indexed by injury_id (empty if missing)"""
+        path = self.partition_path(partition)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=STORE_COLUMNS).set_index('injury_id')
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        return df.reindex(columns=STORE_COLUMNS, fill_value='').set_index('injury_id')
+
+    def read(self) -> pd.DataFrame:
+        """The whole store as one table (typed as pandas reads the CSVs)"""
+        frames = [pd.read_csv(self.partition_path(p)) for p in self.partitions()]
+        if not frames:
+            return pd.DataFrame(columns=STORE_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def _write_partition(self, partition: str, df: pd.DataFrame):
+        """Atomically replace a partition file"""
+        path = self.partition_path(partition)
+        tmp = path + ".tmp"
+        df.reset_index().reindex(columns=STORE_COLUMNS).to_csv(tmp, index=False)
+        os.replace(tmp, path)
+
+    def _prepare(self, batch: pd.DataFrame) -> pd.DataFrame:
+        """Batch in store layout with injury_id and partition columns"""
+        batch = batch.copy()
+        if 'player_url' in batch.columns:
+            # Player URLs live in the players dimension table, not the store
+            self.registry.register_from_dataset(batch)
+            self.registry.save()
+        batch = self.registry.add_id_columns(batch)
+        for col in INJURY_COLUMNS:
+            if col not in batch.columns:
+                batch[col] = None
+        batch['injury_id'] = injury_ids(batch)
+        seasons = calendar_lookup(batch['injury_date'])['mls_season']
+        batch['partition'] = seasons.astype('string').fillna(UNKNOWN_PARTITION).astype(object)
+        return batch
+
+    def upsert(self, batch: pd.DataFrame, source: str = '') -> Dict:
+        """
+        Apply a batch of new or re-scraped injury rows
+
+        Rows without a player_id cannot get a stable ID and are skipped.
+        Within a batch the last row per injury_id wins. Empty cells in the
+        batch do not erase stored values.
+
+        Args:
+            batch: Injury rows (current or legacy column layout)
+            source: Label recorded with each change (e.g. the batch file)
+
+        Returns:
+            Counts of inserted, updated, unchanged and skipped rows, and the
+            partitions rewritten
+        """
+        batch = self._prepare(batch)
+        skipped = int(batch['injury_id'].isna().sum())
+        if skipped:
+            logger.warning(f"Skipping {skipped} rows without a player_id")
+        batch = batch[batch['injury_id'].notna()].drop_duplicates('injury_id', keep='last')
+
+        result = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped': skipped, 'partitions': []}
+        changes = []
+        stamp = datetime.now().isoformat(timespec='seconds')
+        os.makedirs(self.path, exist_ok=True)
+
+        for partition, rows in batch.groupby('partition', sort=True):
+            new = _as_text(rows[STORE_COLUMNS]).set_index('injury_id')
+            old = self.read_partition(partition)
+
+            inserted = new.index.difference(old.index, sort=False)
+            common = new.index.intersection(old.index, sort=False)
+            old_common = old.loc[common, TRACKED_COLUMNS]
+            new_common = new.loc[common, TRACKED_COLUMNS]
+            new_common = new_common.where(new_common != '', old_common)
+            diff = old_common != new_common
+            updated = common[diff.any(axis=1).to_numpy()]
+
+            result['inserted'] += len(inserted)
+            result['updated'] += len(updated)
+            result['unchanged'] += len(common) - len(updated)
+            if not len(inserted) and not len(updated):
+                continue
+
+            for iid in updated:
+                fields = diff.columns[diff.loc[iid].to_numpy()]
+                changes.append({
+                    'at': stamp, 'source': source, 'op': 'update', 'injury_id': iid,
+                    'partition': partition,
+                    'changes': {c: [old_common.at[iid, c], new_common.at[iid, c]] for c in fields}
+                })
+                old.loc[iid, TRACKED_COLUMNS] = new_common.loc[iid]
+                old.at[iid, 'data_collection_date'] = new.at[iid, 'data_collection_date']
+            for iid in inserted:
+                changes.append({'at': stamp, 'source': source, 'op': 'insert',
+                                'injury_id': iid, 'partition': partition})
+
+            self._write_partition(partition, pd.concat([old, new.loc[inserted]]))
+            result['partitions'].append(partition)
+
+        if changes:
+            with open(os.path.join(self.path, CHANGES_FILE), 'a') as f:
+                for change in changes:
+                    f.write(json.dumps(change) + '\n')
+        logger.info(f"Upserted {source or 'batch'}: {result['inserted']} inserted, "
+                    f"{result['updated']} updated, {result['unchanged']} unchanged, "
+                    f"{len(result['partitions'])} partitions rewritten")
+        return result
+
+    def changes(self, last: Optional[int] = None) -> List[Dict]:
+        """Recorded changes, oldest first (only the last N when given)"""
+        path = os.path.join(self.path, CHANGES_FILE)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            lines = f.readlines()
+        if last is not None:
+            lines = lines[-last:]
+        return [json.loads(line) for line in lines if line.strip()]
+
+    # -- flat file -----------------------------------------------------------
+
+    def _manifest(self) -> Dict:
+        path = os.path.join(self.path, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest: Dict):
+        with open(os.path.join(self.path, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    def export(self, csv_path: str = "mls_player_injuries.csv") -> int:
+        """
+        Write the flat injury CSV the other stages read
+
+        Partition files are concatenated as text (no parsing or dedupe).
+
+        Returns:
+            Bytes written
+        """
+        tmp = csv_path + ".tmp"
+        with open(tmp, 'wb') as out:
+            out.write((','.join(STORE_COLUMNS) + '\n').encode('utf-8'))
+            for partition in self.partitions():
+                with open(self.partition_path(partition), 'rb') as f:
+                    f.readline()
+                    for chunk in iter(lambda: f.read(1 << 20), b''):
+                        out.write(chunk)
+        os.replace(tmp, csv_path)
+        size = os.path.getsize(csv_path)
+        manifest = self._manifest()
+        manifest['export'] = {'path': os.path.abspath(csv_path), 'size': size}
+        self._save_manifest(manifest)
+        return size
+
+    def sync_flat(self, csv_path: str = "mls_player_injuries.csv") -> Optional[Dict]:
+        """
+        Upsert rows appended to the flat CSV since the last export
+
+        The main scraper appends to mls_player_injuries.csv directly. When the
+        file only grew, just the appended tail is read; any other change
+        (or no export yet) upserts the whole file. The synced size is
+        recorded, so the next call reads only rows appended after this one.
+
+        Returns:
+            upsert result, or None when the file is unchanged or missing
+        """
+        if not os.path.exists(csv_path):
+            return None
+        size = os.path.getsize(csv_path)
+        exported = self._manifest().get('export', {})
+        if exported.get('path') != os.path.abspath(csv_path) or size < exported.get('size', 0):
+            result = self.upsert(pd.read_csv(csv_path), source=csv_path)
+        elif size == exported['size']:
+            return None
+        else:
+            with open(csv_path, 'rb') as f:
+                header = f.readline()
+                f.seek(exported['size'])
+                tail = f.read()
+            result = self.upsert(pd.read_csv(io.BytesIO(header + tail)), source=f"{csv_path} (appended rows)")
+        manifest = self._manifest()
+        manifest['export'] = {'path': os.path.abspath(csv_path), 'size': size}
+        self._save_manifest(manifest)
+        return result
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Partitioned injury store")
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    upsert = sub.add_parser('upsert', help="Apply a CSV of new or re-scraped injuries")
+    upsert.add_argument('batch')
+    upsert.add_argument('--export', default="mls_player_injuries.csv",
+                        help="Flat CSV to refresh afterwards ('' to skip)")
+
+    export = sub.add_parser('export', help="Write the flat injury CSV")
+    export.add_argument('output', nargs='?', default="mls_player_injuries.csv")
+
+    changes = sub.add_parser('changes', help="Show recorded changes")
+    changes.add_argument('--last', type=int, default=20)
+
+    sub.add_parser('info', help="Rows per partition")
+    args = parser.parse_args()
+
+    store = InjuryStore(args.store)
+    if args.command == 'upsert':
+        if args.export:
+            store.sync_flat(args.export)
+        result = store.upsert(pd.read_csv(args.batch), source=args.batch)
+        if args.export:
+            store.export(args.export)
+        print(json.dumps(result))
+    elif args.command == 'export':
+        store.sync_flat(args.output)
+        print(f"{store.export(args.output):,} bytes written to {args.output}")
+    elif args.command == 'changes':
+        for change in store.changes(args.last):
+            detail = ', '.join(f"{c}: {o!r} -> {n!r}" for c, (o, n) in change.get('changes', {}).items())
+            print(f"{change['at']}  {change['op']:<6} {change['injury_id']}  season={change['partition']}  {detail}")
+    else:
+        for partition in store.partitions():
+            with open(store.partition_path(partition)) as f:
+                rows = sum(1 for _ in f) - 1
+            print(f"season={partition}: {rows:,} rows")
+
+
+if __name__ == "__main__":
+    main()
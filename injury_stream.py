@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Append-only injury stream between the scraper and enrichment stages
+The scraper publishes each batch of newly parsed injury rows to a segment
+log (injury_stream/segment-NNNNNN.jsonl). Fixture matching and the
+performance collectors follow it with their own committed offsets, so
+enrichment trails the scrape by minutes instead of waiting for the whole
+run to finish, and a restarted consumer resumes where it stopped.
+"""
+
+import os
+import json
+import time
+import argparse
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from injury_store import injury_ids
+from mls_ids import IdRegistry
+from pipeline_metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STREAM = "injury_stream"
+
+# A new segment is started once the current one reaches this size
+SEGMENT_BYTES = 4 * 1024 * 1024
+
+# Team URLs in stream records use the canonical host so the registry can
+# read slug and ID from them (fetches may go to a mirror or replay server)
+CANONICAL_HOST = "https://www.transfermarkt.us"
+
+
+def _json_default(value):
+    """JSON encoding for numpy scalars and timestamps"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class InjuryStream:
+    """Segment log of published injury rows (one JSON object per line)"""
+
+    CLOSED_MARKER = "CLOSED"
+
+    def __init__(self, path: str = DEFAULT_STREAM, segment_bytes: int = SEGMENT_BYTES):
+        """
+        Args:
+            path: Stream directory (segments plus consumer offsets)
+            segment_bytes: Size at which the producer starts a new segment
+        """
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+
+    def segment_path(self, number: int) -> str:
+        return os.path.join(self.path, f"segment-{number:06d}.jsonl")
+
+    def segments(self) -> List[int]:
+        """Segment numbers in order"""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            int(name[len("segment-"):-len(".jsonl")])
+            for name in os.listdir(self.path)
+            if name.startswith("segment-") and name.endswith(".jsonl")
+        )
+
+    @property
+    def closed(self) -> bool:
+        """True once the producer has finished its run"""
+        return os.path.exists(os.path.join(self.path, self.CLOSED_MARKER))
+
+    def open(self):
+        """Start (or resume) producing; followers wait for rows until close()"""
+        os.makedirs(self.path, exist_ok=True)
+        marker = os.path.join(self.path, self.CLOSED_MARKER)
+        if os.path.exists(marker):
+            os.remove(marker)
+
+    def close(self):
+        """Mark the producer's run finished; followers exit once caught up"""
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, self.CLOSED_MARKER), 'w') as f:
+            f.write(time.strftime('%Y-%m-%dT%H:%M:%S'))
+
+    def publish(self, rows: pd.DataFrame) -> int:
+        """
+        Append rows to the current segment
+
+        Each batch is written with a single write, so followers never see
+        part of a row. Missing values are published as null.
+
+        Returns:
+            Number of rows published
+        """
+        if rows.empty:
+            return 0
+        records = rows.astype(object).where(rows.notna(), None).to_dict('records')
+        data = ''.join(json.dumps(r, default=_json_default) + '\n' for r in records).encode('utf-8')
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            segments = self.segments()
+            number = segments[-1] if segments else 1
+            path = self.segment_path(number)
+            if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+                path = self.segment_path(number + 1)
+            with open(path, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        METRICS.inc('stream_rows_published_total', len(records))
+        return len(records)
+
+    def size(self) -> int:
+        """Total bytes in all segments"""
+        return sum(os.path.getsize(self.segment_path(n)) for n in self.segments())
+
+    def consumers(self) -> List[str]:
+        """Names of consumers with a committed offset"""
+        offsets = os.path.join(self.path, "offsets")
+        if not os.path.isdir(offsets):
+            return []
+        return sorted(name[:-len(".json")] for name in os.listdir(offsets) if name.endswith(".json"))
+
+
+class StreamConsumer:
+    """A named reader of an InjuryStream with a committed (segment, byte) offset"""
+
+    def __init__(self, stream: InjuryStream, name: str):
+        self.stream = stream
+        self.name = name
+        self.offset_file = os.path.join(stream.path, "offsets", f"{name}.json")
+        self.segment, self.position = 1, 0
+        if os.path.exists(self.offset_file):
+            with open(self.offset_file) as f:
+                saved = json.load(f)
+            self.segment, self.position = saved['segment'], saved['position']
+        # Read ahead of the committed offset until commit()
+        self._next = (self.segment, self.position)
+
+    def poll(self, max_rows: int = 100) -> List[Dict]:
+        """
+        Rows after the last poll (up to max_rows)
+
+        Only complete lines are returned; the read position advances but is
+        not persisted until commit().
+        """
+        rows: List[Dict] = []
+        segment, position = self._next
+        while len(rows) < max_rows:
+            path = self.stream.segment_path(segment)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    f.seek(position)
+                    while len(rows) < max_rows:
+                        line = f.readline()
+                        if not line.endswith(b'\n'):
+                            # End of segment, or a row still being written
+                            break
+                        rows.append(json.loads(line))
+                        position += len(line)
+            if len(rows) >= max_rows:
+                break
+            later = [n for n in self.stream.segments() if n > segment]
+            if not later:
+                break
+            # Segments are never appended to after the producer moves on
+            if os.path.exists(path) and os.path.getsize(path) > position:
+                break
+            segment, position = later[0], 0
+        self._next = (segment, position)
+        return rows
+
+    def commit(self):
+        """Persist the read position (rows polled so far are done)"""
+        self.segment, self.position = self._next
+        os.makedirs(os.path.dirname(self.offset_file), exist_ok=True)
+        tmp = self.offset_file + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'segment': self.segment, 'position': self.position}, f)
+        os.replace(tmp, self.offset_file)
+
+    def lag_bytes(self) -> int:
+        """Bytes published after the committed offset"""
+        lag = 0
+        for number in self.stream.segments():
+            if number > self.segment:
+                lag += os.path.getsize(self.stream.segment_path(number))
+            elif number == self.segment:
+                lag += os.path.getsize(self.stream.segment_path(number)) - self.position
+        return lag
+
+
+def register_stream_ids(registry: IdRegistry, batch: pd.DataFrame) -> pd.DataFrame:
+    """
+    Teach a consumer's registry the players and teams a stream batch refers to
+
+    Returns:
+        The batch as injury rows (without the stream-only team_url column)
+    """
+    if 'player_url' in batch.columns:
+        for url, name in batch[['player_url', 'player_name']].dropna().itertuples(index=False):
+            registry.register_player(url, name)
+    if 'team_url' in batch.columns:
+        for name, url in batch[['team', 'team_url']].dropna().drop_duplicates().itertuples(index=False):
+            registry.register_team(name, url)
+    return batch.drop(columns=['team_url'], errors='ignore')
+
+
+def stream_rows(rows: List[Dict], registry: IdRegistry) -> pd.DataFrame:
+    """
+    Scraper rows in stream form: injury_id, player_url and team_url added
+
+    Consumers may start before the dimension tables on disk know a new
+    player or team, so records carry the URLs themselves.
+    """
+    batch = pd.DataFrame(rows)
+    batch['injury_id'] = injury_ids(batch)
+    batch = registry.attach_player_urls(batch)
+    if 'team_id' in batch.columns:
+        batch['team_url'] = [
+            f"{CANONICAL_HOST}/{registry.team_slug(int(tid), name)}/startseite/verein/{int(tid)}"
+            if pd.notna(tid) else None
+            for tid, name in zip(batch['team_id'], batch['team'])
+        ]
+    return batch
+
+
+def append_csv(df: pd.DataFrame, path: str):
+    """Append rows to a CSV, keeping an existing file's header"""
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        header = list(pd.read_csv(path, nrows=0).columns)
+        df.reindex(columns=header).to_csv(path, mode='a', header=False, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def follow(stream: InjuryStream, name: str, handle: Callable[[pd.DataFrame], None],
+           batch_rows: int = 50, poll_interval: float = 5.0,
+           stop_event: Optional[threading.Event] = None) -> int:
+    """
+    Feed stream rows to a handler until the producer closes the stream
+
+    The offset is committed after each handled batch, so a consumer that
+    is stopped or crashes resumes with the first unhandled batch (a batch
+    interrupted mid-way is handled again).
+
+    Args:
+        stream: Stream to follow
+        name: Consumer name (its offset is kept under the stream directory)
+        handle: Called with each batch as a DataFrame
+        batch_rows: Maximum rows per batch
+        poll_interval: Seconds to wait when caught up with an open stream
+        stop_event: When set, return after the current batch
+
+    Returns:
+        Number of rows handled
+    """
+    consumer = StreamConsumer(stream, name)
+    handled = 0
+    logger.info(f"Following {stream.path} as '{name}' ({consumer.lag_bytes():,} bytes behind)")
+    while stop_event is None or not stop_event.is_set():
+        # Check before polling so rows published just before close() are read
+        closed = stream.closed
+        rows = consumer.poll(batch_rows)
+        if rows:
+            handle(pd.DataFrame(rows))
+            consumer.commit()
+            handled += len(rows)
+            METRICS.inc('stream_rows_consumed_total', len(rows), consumer=name)
+            logger.info(f"[{name}] handled {handled:,} streamed rows")
+            continue
+        if closed:
+            logger.info(f"[{name}] stream closed and fully consumed ({handled:,} rows)")
+            break
+        if stop_event is not None:
+            stop_event.wait(poll_interval)
+        else:
+            time.sleep(poll_interval)
+    return handled
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description="Inspect the scraper's injury stream")
+    parser.add_argument('--stream', default=DEFAULT_STREAM)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('info', help="Segments, size and per-consumer lag")
+    reset = sub.add_parser('reset', help="Move a consumer back to the start of the stream")
+    reset.add_argument('consumer')
+    args = parser.parse_args()
+
+    stream = InjuryStream(args.stream)
+    if args.command == 'info':
+        print("="*70)
+        print(f"Injury stream: {stream.path} ({'closed' if stream.closed else 'open'})")
+        print("="*70)
+        print(f"Segments: {len(stream.segments())}  Size: {stream.size():,} bytes")
+        for name in stream.consumers():
+            print(f"  {name:<24} {StreamConsumer(stream, name).lag_bytes():>12,} bytes behind")
+        print("="*70)
+    elif args.command == 'reset':
+        offset_file = StreamConsumer(stream, args.consumer).offset_file
+        if os.path.exists(offset_file):
+            os.remove(offset_file)
+        print(f"{args.consumer} will re-read {stream.path} from the start")
+
+
+if __name__ == "__main__":
+    main()
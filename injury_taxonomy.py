@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Injury taxonomy
+Maps Transfermarkt's free-text injury types ("Hamstring strain", "Torn
+muscle bundle", "Cruciate ligament tear", ...) to a body region and an
+injury category with ordered keyword rules. Rules run once per distinct
+type and the result is mapped back onto the column, so classifying the
+whole dataset costs a few hundred regex checks.
+"""
+
+import argparse
+import logging
+import re
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Region for types that name no body part ("Muscle injury", "Knock", ...);
+# recurrence matching never pairs these
+UNSPECIFIED = 'Unspecified'
+
+# (pattern, region); the first matching rule wins
+REGION_RULES: List[Tuple[str, str]] = [
+    (r'hamstring', 'Hamstring'),
+    (r'adductor|groin|pubalgia|pubic|inguinal', 'Groin'),
+    (r'achilles', 'Achilles'),
+    (r'calf|soleus', 'Calf'),
+    (r'thigh|quadricep|\bquad\b', 'Thigh'),
+    (r'cruciate|\bacl\b|\bmcl\b|menisc|knee|patella|collateral|inner ligament|internal ligament', 'Knee'),
+    (r'ankle|syndesmo', 'Ankle'),
+    (r'tibia|fibula|shin|lower leg', 'Lower leg'),
+    (r'metatars|foot|toe\b|heel|plantar', 'Foot'),
+    (r'\bhip\b|hip flexor', 'Hip'),
+    (r'\bback\b|lumbago|spine|spinal|vertebra|disc\b|lumbar', 'Back'),
+    (r'shoulder|collarbone|clavicle|acromio', 'Shoulder'),
+    (r'head|concussion|facial|face|\bnose\b|nasal|\bjaw\b|cheekbone|eye|skull|orbital', 'Head'),
+    (r'abdom|\brib|chest|torso|sternum', 'Trunk'),
+    (r'\barm\b|wrist|hand|finger|elbow|thumb|forearm', 'Arm'),
+    (r'\bneck\b', 'Neck'),
+    (r'\bleg\b', 'Leg'),
+]
+
+# (pattern, category); the first matching rule wins
+CATEGORY_RULES: List[Tuple[str, str]] = [
+    (r'fractur|broken|\bbreak|crack', 'Fracture'),
+    (r'surgery|operation', 'Surgery'),
+    (r'concussion', 'Concussion'),
+    (r'tendon|achilles|tendin|patellar', 'Tendon'),
+    (r'ligament|cruciate|sprain|syndesmo|menisc|dislocat|\bacl\b|\bmcl\b|collateral', 'Ligament/joint'),
+    (r'muscl|strain|hamstring|adductor|calf|thigh|fib(?:re|er)|pulled|tear|torn|pubalgia', 'Muscle'),
+    (r'bruise|knock|contusion|laceration|\bcut\b|blow|dead leg', 'Contusion'),
+    (r'\bill\b|illness|flu\b|influenza|virus|corona|covid|infection|fever|cold\b|quarantine|stomach|sick'
+     r'|malaria|bronch|pneumonia|tonsil', 'Illness'),
+    (r'rest\b|fitness|personal|suspen|family', 'Non-injury'),
+    (r'unknown', 'Unknown'),
+]
+
+TAXONOMY_COLUMNS = ['body_region', 'injury_category']
+
+# Absences that are not physical injuries
+NON_PHYSICAL = ['Illness', 'Non-injury', 'Unknown']
+
+
+def _first_match(values: pd.Series, rules: List[Tuple[str, str]], default: str) -> pd.Series:
+    """Label of the first rule whose pattern matches each value"""
+    labels = pd.Series(default, index=values.index, dtype=object)
+    unassigned = pd.Series(True, index=values.index)
+    for pattern, label in rules:
+        hit = unassigned & values.str.contains(pattern, flags=re.IGNORECASE, regex=True, na=False)
+        labels[hit] = label
+        unassigned &= ~hit
+    return labels
+
+
+def classify(injury_types: pd.Series) -> pd.DataFrame:
+    """
+    Body region and injury category for a column of injury types
+
+    Args:
+        injury_types: Transfermarkt injury descriptions
+
+    Returns:
+        body_region and injury_category aligned with the input; types naming
+        no body part get UNSPECIFIED, unmatched categories 'Other'
+    """
+    text = injury_types.fillna('').astype(str).str.strip()
+    distinct = pd.Series(text.unique(), dtype=object)
+    regions = _first_match(distinct, REGION_RULES, UNSPECIFIED).to_numpy()
+    categories = _first_match(distinct, CATEGORY_RULES, 'Other').to_numpy()
+    # Illnesses and non-injury absences have no body region
+    regions = np.where(np.isin(categories, NON_PHYSICAL), UNSPECIFIED, regions)
+    table = pd.DataFrame({'body_region': regions, 'injury_category': categories}, index=distinct.to_numpy())
+    return table.reindex(text.to_numpy()).set_index(injury_types.index)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Classify injury types by body region and category")
+    parser.add_argument('--injuries', default="mls_player_injuries.csv")
+    parser.add_argument('--unmapped', action='store_true',
+                        help="List the most common types with no region or category")
+    args = parser.parse_args()
+
+    injuries = pd.read_csv(args.injuries)
+    labels = classify(injuries['injury_type'])
+
+    print("="*70)
+    print("INJURY TAXONOMY")
+    print("="*70)
+    print("By body region:")
+    print(labels['body_region'].value_counts().to_string())
+    print("\nBy category:")
+    print(labels['injury_category'].value_counts().to_string())
+    if args.unmapped:
+        unmapped = injuries.loc[
+            (labels['body_region'] == UNSPECIFIED) | (labels['injury_category'] == 'Other'), 'injury_type'
+        ]
+        print("\nMost common types without a region or category:")
+        print(unmapped.value_counts().head(30).to_string())
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency timeline from a run log
+Reads JSON progress events (see run_logging.py) and, for older logs, tqdm
+redraw lines, and prints one row per event or per time bucket
+"""
+
+import re
+import sys
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from run_logging import parse_events
+
+# tqdm redraw, e.g. "Matching injuries to fixtures:   2%|▏  | 193/8497 [05:30<5:42:07,  2.47s/it]"
+TQDM_PATTERN = re.compile(
+    r'(?P<desc>[^\r\n|\x1b]+?):\s+\d+%\|[^|]*\|\s*(?P<done>\d+)/(?P<total>\d+)\s+'
+    r'\[(?P<elapsed>[\d:]+)<(?P<eta>[\d:?]+),\s*(?P<rate>[\d.?]+)(?P<unit>s/it|it/s)'
+)
+
+
+def _clock_seconds(text: str) -> Optional[float]:
+    """'1:02:03' / '02:03' -> seconds"""
+    if not text or '?' in text:
+        return None
+    seconds = 0.0
+    for part in text.split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def tqdm_events(text: str) -> List[Dict]:
+    """
+    Recover progress samples from tqdm redraws in a legacy log
+
+    Only the last redraw per second of elapsed time is kept. There is no
+    wall-clock timestamp or timing breakdown in these lines.
+    """
+    samples: Dict = {}
+    for match in TQDM_PATTERN.finditer(text):
+        elapsed = _clock_seconds(match.group('elapsed'))
+        if elapsed is None:
+            continue
+        rate = float(match.group('rate')) if match.group('rate') != '?' else None
+        if rate and match.group('unit') == 's/it':
+            rate = 1.0 / rate
+        stage = match.group('desc').strip()
+        samples[(stage, elapsed)] = {
+            'event': 'progress',
+            'stage': stage,
+            'done': int(match.group('done')),
+            'total': int(match.group('total')),
+            'elapsed_s': elapsed,
+            'interval_rate': rate,
+            'eta_s': _clock_seconds(match.group('eta')),
+        }
+    return list(samples.values())
+
+
+def load_timeline(path: str) -> pd.DataFrame:
+    """All progress events in a log as a DataFrame"""
+    with open(path, errors='replace') as f:
+        text = f.read()
+    events = list(parse_events(text.splitlines()))
+    source = 'events'
+    if not events:
+        events = tqdm_events(text)
+        source = 'tqdm'
+
+    df = pd.json_normalize(events)
+    if df.empty:
+        return df
+    df['source'] = source
+    if 'ts' in df.columns:
+        df['time'] = pd.to_datetime(df['ts'].map(datetime.fromtimestamp))
+    return df
+
+
+def bucket_timeline(df: pd.DataFrame, minutes: int) -> pd.DataFrame:
+    """Aggregate interval events into fixed wall-clock buckets per stage"""
+    df = df[df['event'] == 'progress'].copy()
+    if df.empty or 'time' not in df.columns:
+        return df
+    df['bucket'] = df['time'].dt.floor(f'{minutes}min')
+    df['interval_done'] = df['interval_rate'].fillna(0) * df['interval_s']
+    sums = ['interval_s', 'interval_done', 'requests', 'errors', 'rows',
+            'timing.fetch_s', 'timing.parse_s', 'timing.sleep_s', 'timing.other_s']
+    grouped = df.groupby(['stage', 'bucket'])
+    out = grouped[[c for c in sums if c in df.columns]].sum()
+    out['done'] = grouped['done'].max()
+    out['total'] = grouped['total'].max()
+    out['eta_s'] = grouped['eta_s'].last()
+    out['interval_rate'] = out['interval_done'] / out['interval_s']
+    if 'requests' in out.columns:
+        out['mean_latency_s'] = (out['timing.fetch_s'] / out['requests']).where(out['requests'] > 0)
+    return out.reset_index().rename(columns={'bucket': 'time'})
+
+
+def format_timeline(df: pd.DataFrame) -> str:
+    """Human-readable timeline table"""
+    rows = []
+    header = f"{'time':<19} {'stage':<24} {'done':>12} {'items/min':>9} {'req':>5} {'err':>4} {'lat(s)':>7} {'fetch':>6} {'parse':>6} {'sleep':>6} {'other':>6} {'eta(min)':>8}"
+    rows.append(header)
+    rows.append('-' * len(header))
+    for _, r in df.iterrows():
+        when = r['time'].strftime('%Y-%m-%d %H:%M:%S') if 'time' in r and pd.notna(r.get('time')) else f"+{r['elapsed_s']:.0f}s"
+        total = f"/{int(r['total'])}" if pd.notna(r.get('total')) else ''
+        rate = r.get('interval_rate')
+        window = r.get('interval_s') or 0
+
+        def share(key):
+            value = r.get(f'timing.{key}')
+            return f"{value / window:>6.0%}" if pd.notna(value) and window else f"{'':>6}"
+
+        latency = r.get('mean_latency_s')
+        eta = r.get('eta_s')
+        stage = str(r['stage'])[:24]
+        if r.get('event') == 'stage_end':
+            stage = f"{stage[:16]} (total)"
+        rows.append(
+            f"{when:<19} {stage:<24} {str(int(r['done'])) + total:>12} "
+            f"{(rate * 60 if pd.notna(rate) else float('nan')):>9.1f} "
+            f"{int(r.get('requests', 0) or 0):>5} {int(r.get('errors', 0) or 0):>4} "
+            f"{(f'{latency:.3f}' if pd.notna(latency) else ''):>7} "
+            f"{share('fetch_s')} {share('parse_s')} {share('sleep_s')} {share('other_s')} "
+            f"{(f'{eta / 60:.0f}' if pd.notna(eta) else ''):>8}"
+        )
+    return '\n'.join(rows)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Throughput/latency timeline from a run log")
+    parser.add_argument('log', help="Log file (e.g. scraper_output.log)")
+    parser.add_argument('--stage', help="Only show this stage")
+    parser.add_argument('--bucket', type=int, default=0, help="Aggregate into N-minute buckets")
+    parser.add_argument('--every', type=int, default=1, help="Show every Nth row")
+    parser.add_argument('--csv', help="Also write the timeline to this CSV")
+    args = parser.parse_args()
+
+    df = load_timeline(args.log)
+    if df.empty:
+        print(f"No progress events found in {args.log}")
+        sys.exit(1)
+    if args.stage:
+        df = df[df['stage'] == args.stage]
+    if args.bucket:
+        df = bucket_timeline(df, args.bucket)
+    else:
+        df = df[df['event'] != 'stage_start']
+    df = df.iloc[::max(args.every, 1)]
+
+    print(format_timeline(df))
+    if args.csv:
+        df.to_csv(args.csv, index=False)
+        print(f"\nTimeline written to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,19 @@ Match injuries to actual match fixtures to determine stadium location
 Cross-references injury date with team's schedule to find if home/away
 """
 
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
-import time
-from datetime import datetime, timedelta
 import logging
-from tqdm import tqdm
+import argparse
+from typing import Optional
+
+from date_normalization import calendar_lookup, parse_date, parse_dates
+from enrichment_view import DEFAULT_VIEW, EnrichmentView, FixtureStore
+from injury_stream import InjuryStream, follow, register_stream_ids
+from mls_ids import IdRegistry
+from page_fetcher import PageFetcher
+from page_parsers import parse_fixtures
+from pipeline_metrics import METRICS, start_monitoring
+from request_planner import build_plan, format_plan, plan_fixtures, summary_line
 
 logging.basicConfig(
     level=logging.INFO,
@@ -24,23 +30,20 @@ class FixtureMatchingService:
 
     BASE_URL = "https://www.transfermarkt.us"
 
-    def __init__(self, delay: float = 3.0):
+    def __init__(self, delay: float = 3.0, registry: IdRegistry = None,
+                 fixture_store: FixtureStore = None):
         self.delay = delay
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        })
+        self.registry = registry or IdRegistry()
+        self.fetcher = PageFetcher(delay=delay)
+        self.session = self.fetcher.session
+        # Parsed schedules by URL; every injury of a team-season shares one page
+        self.fixtures_cache = {}
+        # Completed-season schedules persisted across runs (mls_fixtures.csv)
+        self.fixture_store = fixture_store or FixtureStore()
 
     def _get_page(self, url: str):
         """Fetch page with rate limiting"""
-        try:
-            time.sleep(self.delay)
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
-        except Exception as e:
-            logger.error(f"Failed to fetch {url}: {e}")
-            return None
+        return self.fetcher.get_page(url)
 
     def get_team_fixtures(self, team_name: str, season: str):
         """
@@ -60,130 +63,39 @@ class FixtureMatchingService:
         if not team_id:
             return []
 
-        fixtures_url = f"{self.BASE_URL}/{team_name.lower().replace(' ', '-')}/spielplan/verein/{team_id}/saison_id/{season}"
+        fixtures_url = self.fixtures_url(team_id, team_name, season)
+        if fixtures_url not in self.fixtures_cache:
+            stored = self.fixture_store.get(team_id, season, team_name)
+            if stored is not None:
+                self.fixtures_cache[fixtures_url] = stored
+        METRICS.record_cache('fixtures', fixtures_url in self.fixtures_cache)
+        if fixtures_url in self.fixtures_cache:
+            return self.fixtures_cache[fixtures_url]
 
         soup = self._get_page(fixtures_url)
         if not soup:
             return []
 
-        fixtures = []
-
-        # Find fixture table
-        fixture_table = soup.find('table', {'class': 'items'})
-        if not fixture_table:
-            return []
-
-        rows = fixture_table.find_all('tr', {'class': ['odd', 'even']})
-
-        for row in rows:
-            try:
-                cells = row.find_all('td')
-                if len(cells) < 8:
-                    continue
-
-                # Extract date
-                date_cell = cells[1]
-                date_str = date_cell.text.strip()
-                match_date = self._parse_date(date_str)
-
-                if not match_date:
-                    continue
-
-                # Extract opponent and home/away status
-                home_team_cell = cells[4]
-                away_team_cell = cells[6]
-
-                home_team = home_team_cell.find('a', {'class': 'vereinprofil_tooltip'})
-                away_team = away_team_cell.find('a', {'class': 'vereinprofil_tooltip'})
-
-                if not home_team or not away_team:
-                    continue
-
-                home_team_name = home_team['title']
-                away_team_name = away_team['title']
-
-                # Determine if our team was home or away
-                is_home = (home_team_name == team_name)
-                opponent = away_team_name if is_home else home_team_name
-
-                fixtures.append({
-                    'date': match_date,
-                    'opponent': opponent,
-                    'home_team': home_team_name,
-                    'away_team': away_team_name,
-                    'is_home_game': is_home
-                })
-
-            except Exception as e:
-                logger.debug(f"Error parsing fixture row: {e}")
-                continue
-
+        fixtures = parse_fixtures(soup, team_name)
+        self.fixtures_cache[fixtures_url] = fixtures
+        self.fixture_store.put(team_id, season, fixtures)
         return fixtures
 
+    def fixtures_url(self, team_id: int, team_name: str, season: str) -> str:
+        """Season schedule (spielplan) URL for a team"""
+        team_slug = self.registry.team_slug(team_id, team_name)
+        return f"{self.BASE_URL}/{team_slug}/spielplan/verein/{team_id}/saison_id/{season}"
+
     def _get_team_id(self, team_name: str):
         """Get Transfermarkt team ID from team name"""
-        team_ids = {
-            # Current MLS Teams (2025)
-            'Atlanta United FC': '37326',
-            'Austin FC': '77715',
-            'Charlotte FC': '91117',
-            'Chicago Fire FC': '3962',
-            'FC Cincinnati': '41012',
-            'Colorado Rapids': '3963',
-            'Columbus Crew': '3966',
-            'D.C. United': '3967',
-            'FC Dallas': '3969',
-            'Houston Dynamo FC': '8006',
-            'Inter Miami CF': '69220',
-            'LA Galaxy': '3964',
-            'Los Angeles FC': '51923',
-            'Minnesota United FC': '31614',
-            'CF Montréal': '3976',
-            'Nashville SC': '70869',
-            'New England Revolution': '3977',
-            'New York City FC': '28171',
-            'New York Red Bulls': '3979',
-            'Orlando City SC': '22309',
-            'Philadelphia Union': '10316',
-            'Portland Timbers': '9721',
-            'Real Salt Lake': '3982',
-            'San Jose Earthquakes': '3983',
-            'Seattle Sounders FC': '9726',
-            'Sporting Kansas City': '3984',
-            'St. Louis City SC': '105220',
-            'Toronto FC': '5204',
-            'Vancouver Whitecaps FC': '10139',
-
-            # Defunct/Relocated MLS Teams
-            'Chivas USA': '4021',
-
-            # Alternative name variations and historical names
-            'Montréal Impact': '3976',  # Same as CF Montréal
-            'Montreal Impact': '3976',
-            'Sporting KC': '3984',  # Same as Sporting Kansas City
-            'Real Salt Lake City': '3982',  # Same as Real Salt Lake
-            'St. Louis CITY SC': '105220',  # Same as St. Louis City SC
-            'Chicago Fire': '3962',  # Old name for Chicago Fire FC
-            'Columbus Crew SC': '3966',  # Old name for Columbus Crew
-            'Houston Dynamo': '8006',  # Old name for Houston Dynamo FC
-            'FC Montréal': '3976',  # Another variation
-        }
-
-        # Try to match, if not found log warning
-        team_id = team_ids.get(team_name)
+        team_id = self.registry.team_id(team_name)
         if not team_id:
             logger.debug(f"No team ID found for: {team_name}")
         return team_id
 
     def _parse_date(self, date_str: str):
-        """Parse various date formats"""
-        try:
-            return datetime.strptime(date_str, '%b %d, %Y')
-        except:
-            try:
-                return pd.to_datetime(date_str)
-            except:
-                return None
+        """Parse various date formats (memoized in date_normalization)"""
+        return parse_date(date_str)
 
     def find_match_for_injury(self, injury_date_str: str, team_name: str, season: str):
         """
@@ -235,108 +147,113 @@ class FixtureMatchingService:
         self,
         input_csv: str = "mls_player_injuries.csv",
         stadiums_csv: str = "mls_stadiums.csv",
-        output_csv: str = "mls_injuries_fixture_matched.csv"
+        output_csv: Optional[str] = "mls_injuries_fixture_matched.csv",
+        view_csv: str = DEFAULT_VIEW
     ):
         """
         Enhance injury data by matching to actual fixtures
         Determines where injury occurred based on home team
+
+        Fixture and stadium columns are kept in the enrichment view
+        (view_csv) keyed by injury_id; only new or changed injuries are
+        matched again. output_csv, when given, receives the joined table.
         """
         logger.info(f"Loading injury data from {input_csv}")
         injuries = pd.read_csv(input_csv)
 
-        logger.info(f"Loading stadium data from {stadiums_csv}")
-        stadiums = pd.read_csv(stadiums_csv)
-
-        # Add fixture-based columns
-        new_cols = [
-            'match_date', 'home_team', 'away_team', 'opponent',
-            'is_home_game', 'days_between_match_and_injury',
-            'stadium_name', 'surface_type', 'city', 'state',
-            'altitude_ft', 'climate_zone'
-        ]
-
-        for col in new_cols:
-            injuries[col] = None
-
-        # Extract injury year for season lookup
-        injuries['injury_year'] = pd.to_datetime(injuries['injury_date']).dt.year
-        injuries['injury_month'] = pd.to_datetime(injuries['injury_date']).dt.month
-
-        # Determine season (MLS season year)
-        def get_season(year, month):
-            # MLS season runs Feb-Oct
-            # Jan-Jun injuries = current year's season
-            # Jul-Dec injuries = current year's season
-            # Exception: Nov-Jan = next year's season (offseason)
-            if month in [11, 12, 1]:
-                return str(year + 1) if month in [11, 12] else str(year)
-            return str(year)
-
-        injuries['season'] = injuries.apply(
-            lambda row: get_season(row['injury_year'], row['injury_month']),
-            axis=1
-        )
-
-        # Process each injury
-        matched_count = 0
-
-        for idx in tqdm(range(len(injuries)), desc="Matching injuries to fixtures"):
-            row = injuries.iloc[idx]
-
-            # Find the match where injury occurred
-            match_info = self.find_match_for_injury(
-                row['injury_date'],
-                row['team'],
-                row['season']
-            )
-
-            if match_info:
-                # Update fixture info
-                for key, value in match_info.items():
-                    injuries.at[idx, key] = value
-
-                # Now match to stadium based on HOME TEAM (not player's team!)
-                home_team = match_info['home_team']
-                injury_year = row['injury_year']
-
-                # Find stadium where home team played
-                stadium_match = stadiums[
-                    (stadiums['team'] == home_team) &
-                    (stadiums['start_year'] <= injury_year) &
-                    (stadiums['end_year'] >= injury_year)
-                ]
-
-                if len(stadium_match) > 0:
-                    stadium_info = stadium_match.iloc[0]
-                    injuries.at[idx, 'stadium_name'] = stadium_info['stadium_name']
-                    injuries.at[idx, 'surface_type'] = stadium_info['surface_type']
-                    injuries.at[idx, 'city'] = stadium_info['city']
-                    injuries.at[idx, 'state'] = stadium_info['state']
-                    injuries.at[idx, 'altitude_ft'] = stadium_info['altitude_ft']
-                    injuries.at[idx, 'climate_zone'] = stadium_info['climate_zone']
-                    matched_count += 1
-
-        # Save enhanced dataset
-        injuries.to_csv(output_csv, index=False)
-        logger.info(f"Saved fixture-matched data to {output_csv}")
+        view = EnrichmentView(view_csv)
+        counts = view.refresh(injuries, self.find_match_for_injury, stadiums_csv)
+        self.fixture_store.save()
+        injuries = view.join(injuries)
+
+        # Extract injury year and MLS season from the shared calendar
+        injury_dates = parse_dates(injuries['injury_date'])
+        injuries['injury_year'] = injury_dates.dt.year
+        injuries['season'] = calendar_lookup(injury_dates)['mls_season'].astype('string')
+        matched_count = int(injuries['stadium_name'].notna().sum())
+
+        if output_csv:
+            injuries.to_csv(output_csv, index=False)
+            METRICS.inc('rows_written_total', len(injuries), output=output_csv)
+            logger.info(f"Saved fixture-matched data to {output_csv}")
 
         # Summary
         print("\n" + "="*70)
         print("FIXTURE MATCHING SUMMARY")
         print("="*70)
         print(f"Total injuries: {len(injuries):,}")
+        print(f"Matched this run: {counts['matched']:,} (reused {counts['reused']:,} from {view_csv})")
         print(f"Matched to fixtures: {matched_count:,} ({matched_count/len(injuries)*100:.1f}%)")
-        print(f"Home games: {injuries['is_home_game'].sum():,}")
-        print(f"Away games: {(~injuries['is_home_game']).sum():,}")
+        print(f"Home games: {(injuries['is_home_game'] == True).sum():,}")
+        print(f"Away games: {(injuries['is_home_game'] == False).sum():,}")
         print("\nTop stadiums by injury count:")
         print(injuries['stadium_name'].value_counts().head(10))
         print("="*70)
 
         return injuries
 
+    def follow_stream(
+        self,
+        stream: InjuryStream,
+        stadiums_csv: str = "mls_stadiums.csv",
+        view_csv: str = DEFAULT_VIEW,
+        stop_event=None
+    ) -> int:
+        """
+        Match injuries as the scraper publishes them
+
+        Each streamed batch is added to the enrichment view without touching
+        its other rows; runs until the scraper closes the stream.
+
+        Returns:
+            Number of streamed injuries handled
+        """
+        view = EnrichmentView(view_csv)
+
+        def handle(batch: pd.DataFrame):
+            batch = register_stream_ids(self.registry, batch)
+            view.refresh(batch, self.find_match_for_injury, stadiums_csv, prune=False)
+            self.fixture_store.save()
+
+        return follow(stream, "fixtures", handle, stop_event=stop_event)
+
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description="Fixture-based stadium matching")
+    parser.add_argument('--status-file', default="fixture_matching_status.json")
+    parser.add_argument('--metrics-port', type=int, default=0)
+    parser.add_argument('--plan', action='store_true',
+                        help="Print the pages a run would fetch and its estimated runtime, then exit")
+    parser.add_argument('--export', default='',
+                        help="Also write the joined injury + enrichment table here "
+                             "(e.g. mls_injuries_fixture_matched.csv)")
+    parser.add_argument('--follow', nargs='?', const="injury_stream", default='',
+                        help="Match injuries from the scraper's stream as they arrive, "
+                             "until the scrape finishes (default injury_stream)")
+    args = parser.parse_args()
+
+    matcher = FixtureMatchingService(delay=3.0)
+    if args.follow:
+        # The injury file may not exist yet; there is nothing to plan
+        status_writer = start_monitoring(args.status_file or None, args.metrics_port)
+        handled = matcher.follow_stream(InjuryStream(args.follow))
+        print(f"\n✓ Matched {handled:,} streamed injuries into {DEFAULT_VIEW}")
+        if args.export:
+            # Also matches any rows the stream did not carry
+            matcher.enhance_injuries_with_fixtures(output_csv=args.export)
+        if status_writer:
+            status_writer.stop()
+        return
+
+    plan = build_plan([plan_fixtures(matcher)], matcher.fetcher.archive,
+                      matcher.fetcher.reuse_hours, matcher.delay)
+    if args.plan:
+        print(format_plan(plan))
+        return
+
+    status_writer = start_monitoring(args.status_file or None, args.metrics_port)
+
     print("="*70)
     print("MLS Injury Data - Fixture-Based Stadium Matching")
     print("="*70)
@@ -344,11 +261,13 @@ def main():
     print("  1. Cross-reference each injury date with team fixtures")
     print("  2. Determine if it was a home or away game")
     print("  3. Match to the HOME TEAM's stadium (actual location)")
-    print("\nEstimated time: 8-12 hours (need to fetch fixtures for each injury)")
+    print(f"\nOnly new or changed injuries are matched; results are kept in {DEFAULT_VIEW}")
+    print(f"\nEstimated time: {summary_line(plan)}")
     print("="*70)
 
-    matcher = FixtureMatchingService(delay=3.0)
-    df = matcher.enhance_injuries_with_fixtures()
+    df = matcher.enhance_injuries_with_fixtures(output_csv=args.export or None)
+    if status_writer:
+        status_writer.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Compact integer ID layer for players and teams
+Extracts Transfermarkt spieler/verein IDs once and keeps names/URLs in small dimension tables
+"""
+
+import os
+import re
+import logging
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://www.transfermarkt.us"
+
+PLAYER_ID_PATTERN = re.compile(r'/spieler/(\d+)')
+TEAM_ID_PATTERN = re.compile(r'/verein/(\d+)')
+SLUG_PATTERN = re.compile(r'transfermarkt\.[a-z.]+/([^/]+)/')
+
+# Seed mapping of display names to Transfermarkt verein IDs. Names scraped at
+# runtime are added to the teams dimension table on top of these.
+KNOWN_TEAM_IDS = {
+    # Current MLS Teams (2025)
+    'Atlanta United FC': 37326,
+    'Austin FC': 77715,
+    'Charlotte FC': 91117,
+    'Chicago Fire FC': 3962,
+    'FC Cincinnati': 41012,
+    'Colorado Rapids': 3963,
+    'Columbus Crew': 3966,
+    'D.C. United': 3967,
+    'FC Dallas': 3969,
+    'Houston Dynamo FC': 8006,
+    'Inter Miami CF': 69220,
+    'LA Galaxy': 3964,
+    'Los Angeles FC': 51923,
+    'Minnesota United FC': 31614,
+    'CF Montréal': 3976,
+    'Nashville SC': 70869,
+    'New England Revolution': 3977,
+    'New York City FC': 28171,
+    'New York Red Bulls': 3979,
+    'Orlando City SC': 22309,
+    'Philadelphia Union': 10316,
+    'Portland Timbers': 9721,
+    'Real Salt Lake': 3982,
+    'San Jose Earthquakes': 3983,
+    'Seattle Sounders FC': 9726,
+    'Sporting Kansas City': 3984,
+    'St. Louis City SC': 105220,
+    'Toronto FC': 5204,
+    'Vancouver Whitecaps FC': 10139,
+
+    # Defunct/Relocated MLS Teams
+    'Chivas USA': 4021,
+
+    # Alternative name variations and historical names
+    'Montréal Impact': 3976,  # Same as CF Montréal
+    'Montreal Impact': 3976,
+    'Sporting KC': 3984,  # Same as Sporting Kansas City
+    'Real Salt Lake City': 3982,  # Same as Real Salt Lake
+    'St. Louis CITY SC': 105220,  # Same as St. Louis City SC
+    'Chicago Fire': 3962,  # Old name for Chicago Fire FC
+    'Columbus Crew SC': 3966,  # Old name for Columbus Crew
+    'Houston Dynamo': 8006,  # Old name for Houston Dynamo FC
+    'FC Montréal': 3976,  # Another variation
+}
+
+
+def extract_player_id(url: Optional[str]) -> Optional[int]:
+    """
+    Extract the integer spieler ID from a Transfermarkt player URL
+
+    Args:
+        url: Any player page URL (profil, verletzungen, transfers, ...)
+
+    Returns:
+        Player ID or None if the URL has no spieler segment
+    """
+    if not isinstance(url, str):
+        return None
+    match = PLAYER_ID_PATTERN.search(url)
+    return int(match.group(1)) if match else None
+
+
+def extract_team_id(url: Optional[str]) -> Optional[int]:
+    """
+    Extract the integer verein ID from a Transfermarkt team URL
+
+    Args:
+        url: Any team page URL (startseite, kader, spielplan, ...)
+
+    Returns:
+        Team ID or None if the URL has no verein segment
+    """
+    if not isinstance(url, str):
+        return None
+    match = TEAM_ID_PATTERN.search(url)
+    return int(match.group(1)) if match else None
+
+
+def player_ids_from_urls(urls: pd.Series) -> pd.Series:
+    """Vectorized spieler ID extraction for a column of player URLs"""
+    return urls.astype('string').str.extract(PLAYER_ID_PATTERN, expand=False).astype('Int64')
+
+
+def _slug_from_url(url: Optional[str]) -> Optional[str]:
+    """Return the URL slug (e.g. 'seattle-sounders-fc') or None"""
+    if not isinstance(url, str):
+        return None
+    match = SLUG_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+class IdRegistry:
+    """Dimension tables mapping integer player/team IDs to names and URLs"""
+
+    PLAYER_COLUMNS = ['player_id', 'player_name', 'player_url']
+    TEAM_COLUMNS = ['team_id', 'team_name', 'team_slug']
+
+    def __init__(self, players_file: str = "mls_players.csv", teams_file: str = "mls_teams.csv"):
+        """
+        Initialize registry and load existing dimension tables
+
+        Args:
+            players_file: CSV with player_id, player_name, player_url
+            teams_file: CSV with team_id, team_name, team_slug (one row per name variant)
+        """
+        self.players_file = players_file
+        self.teams_file = teams_file
+        self.players: Dict[int, Dict[str, str]] = {}
+        self.team_names: Dict[str, int] = dict(KNOWN_TEAM_IDS)
+        self.team_slugs: Dict[int, str] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        """Load dimension tables from disk if they exist"""
+        if os.path.exists(self.players_file):
+            try:
+                df = pd.read_csv(self.players_file)
+                for player_id, name, url in df[self.PLAYER_COLUMNS].itertuples(index=False):
+                    self.players[int(player_id)] = {'player_name': name, 'player_url': url}
+            except Exception as e:
+                logger.warning(f"Could not load player dimension table: {e}")
+
+        if os.path.exists(self.teams_file):
+            try:
+                df = pd.read_csv(self.teams_file)
+                for team_id, name, slug in df[self.TEAM_COLUMNS].itertuples(index=False):
+                    self.team_names[name] = int(team_id)
+                    if isinstance(slug, str):
+                        self.team_slugs[int(team_id)] = slug
+            except Exception as e:
+                logger.warning(f"Could not load team dimension table: {e}")
+
+    def save(self):
+        """Persist dimension tables (no-op when nothing changed)"""
+        if not self._dirty:
+            return
+        players = pd.DataFrame(
+            [(pid, p['player_name'], p['player_url']) for pid, p in self.players.items()],
+            columns=self.PLAYER_COLUMNS
+        ).sort_values('player_id')
+        teams = pd.DataFrame(
+            [(tid, name, self.team_slugs.get(tid)) for name, tid in self.team_names.items()],
+            columns=self.TEAM_COLUMNS
+        ).sort_values(['team_id', 'team_name'])
+        players.to_csv(self.players_file, index=False)
+        teams.to_csv(self.teams_file, index=False)
+        self._dirty = False
+
+    def register_player(self, player_url: str, player_name: str) -> Optional[int]:
+        """
+        Record a player in the dimension table
+
+        Returns:
+            Player ID or None if the URL carries no spieler ID
+        """
+        player_id = extract_player_id(player_url)
+        if player_id is None:
+            return None
+        if player_id not in self.players:
+            self.players[player_id] = {'player_name': player_name, 'player_url': player_url}
+            self._dirty = True
+        return player_id
+
+    def register_team(self, team_name: Optional[str], team_url: Optional[str] = None) -> Optional[int]:
+        """
+        Record a team name (and optionally its URL) in the dimension table
+
+        Returns:
+            Team ID from the URL, or the known ID for the name, or None
+        """
+        team_id = extract_team_id(team_url)
+        if team_id is None:
+            return self.team_id(team_name)
+        if team_name and self.team_names.get(team_name) != team_id:
+            self.team_names[team_name] = team_id
+            self._dirty = True
+        slug = _slug_from_url(team_url)
+        if slug and team_id not in self.team_slugs:
+            self.team_slugs[team_id] = slug
+            self._dirty = True
+        return team_id
+
+    def team_id(self, team_name: Optional[str]) -> Optional[int]:
+        """Look up a team ID by display name"""
+        if not team_name:
+            return None
+        return self.team_names.get(team_name)
+
+    def canonical_team_names(self) -> Dict[int, str]:
+        """
+        Team ID -> canonical display name
+
+        Returns:
+            The first name registered per ID: the KNOWN_TEAM_IDS name where
+            there is one, never a later alias (e.g. 3962 -> 'Chicago Fire FC',
+            not 'Chicago Fire')
+        """
+        names: Dict[int, str] = {}
+        for name, team_id in self.team_names.items():
+            names.setdefault(team_id, name)
+        return names
+
+    def team_slug(self, team_id: int, team_name: Optional[str] = None) -> Optional[str]:
+        """URL slug for a team, falling back to a slugified display name"""
+        slug = self.team_slugs.get(team_id)
+        if slug is None and team_name:
+            slug = team_name.lower().replace(' ', '-')
+        return slug
+
+    def player_url(self, player_id: int) -> Optional[str]:
+        """Profile URL for a player ID"""
+        player = self.players.get(int(player_id))
+        return player['player_url'] if player else None
+
+    def add_id_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Ensure player_id/team_id columns exist on an injury table
+
+        Legacy files only carry player_url and team names; IDs are derived
+        from them in one vectorized pass.
+        """
+        if 'player_id' not in df.columns and 'player_url' in df.columns:
+            df['player_id'] = player_ids_from_urls(df['player_url'])
+        if 'team_id' not in df.columns and 'team' in df.columns:
+            df['team_id'] = df['team'].map(self.team_names).astype('Int64')
+        return df
+
+    def attach_player_urls(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Fill a player_url column from the dimension table for ID-only datasets"""
+        if 'player_url' in df.columns and df['player_url'].notna().all():
+            return df
+        urls = pd.Series(
+            {pid: p['player_url'] for pid, p in self.players.items()}, dtype='object'
+        )
+        resolved = df['player_id'].map(urls)
+        df['player_url'] = df['player_url'].fillna(resolved) if 'player_url' in df.columns else resolved
+        return df
+
+    def merge(self, other: 'IdRegistry'):
+        """Fold another registry (e.g. a worker shard's) into this one"""
+        for player_id, player in other.players.items():
+            if player_id not in self.players:
+                self.players[player_id] = player
+                self._dirty = True
+        for name, team_id in other.team_names.items():
+            if self.team_names.get(name) != team_id:
+                self.team_names[name] = team_id
+                self._dirty = True
+        for team_id, slug in other.team_slugs.items():
+            if team_id not in self.team_slugs:
+                self.team_slugs[team_id] = slug
+                self._dirty = True
+
+    def register_from_dataset(self, df: pd.DataFrame):
+        """Populate dimension tables from a legacy injury table with player_url columns"""
+        if 'player_url' not in df.columns:
+            return
+        players = df[['player_url', 'player_name']].drop_duplicates('player_url')
+        for url, name in players.itertuples(index=False):
+            self.register_player(url, name)
+
+
+def migrate_dataset(input_csv: str, output_csv: str, registry: Optional[IdRegistry] = None) -> pd.DataFrame:
+    """
+    Rewrite a legacy injury CSV to the ID-based layout
+
+    player_url is moved to the players dimension table and player_id/team_id
+    columns are added.
+    """
+    registry = registry or IdRegistry()
+    df = pd.read_csv(input_csv)
+    registry.register_from_dataset(df)
+    registry.add_id_columns(df)
+    registry.save()
+
+    df = df.drop(columns=['player_url'], errors='ignore')
+    leading = [c for c in ('player_id', 'team_id') if c in df.columns]
+    df = df[leading + [c for c in df.columns if c not in leading]]
+    df.to_csv(output_csv, index=False)
+    logger.info(f"Migrated {len(df)} rows from {input_csv} to {output_csv}")
+    return df
+
+
+def processed_keys_from_legacy(keys: Iterable[str]) -> Dict[str, set]:
+    """
+    Convert legacy 'url_season' checkpoint keys to {season: {player_id}}
+
+    Args:
+        keys: Strings like 'https://.../profil/spieler/995642_2023'
+
+    Returns:
+        Mapping of season to a set of integer player IDs
+    """
+    processed: Dict[str, set] = {}
+    for key in keys:
+        url, _, season = key.rpartition('_')
+        player_id = extract_player_id(url)
+        if player_id is not None:
+            processed.setdefault(season, set()).add(player_id)
+    return processed
@@ -28,6 +28,15 @@ else
     echo "No update file yet"
 fi
 
+echo ""
+echo "Live status (scraper_2025_status.txt):"
+echo "-----------------------------------------------------------------------"
+if [ -f "scraper_2025_status.txt" ]; then
+    sed 's/^/  /' scraper_2025_status.txt
+else
+    echo "  No status file yet (scraper_2025_status.txt)"
+fi
+
 echo "-----------------------------------------------------------------------"
 echo "Commands: tail -f scraper_2025_update.log"
 echo "======================================================================="
@@ -7,11 +7,11 @@ echo "======================================================================="
 echo ""
 
 # Check if scraper is running
-if ps aux | grep -v grep | grep scrape_mls_injuries.py > /dev/null; then
+if ps aux | grep -v grep | grep -E "scrape_mls_injuries.py|scraper_supervisor.py" > /dev/null; then
     echo "✓ Scraper is RUNNING"
     echo ""
     echo "Process info:"
-    ps aux | grep -v grep | grep scrape_mls_injuries.py | awk '{print "  PID: " $2 "  CPU: " $3"%  MEM: " $4"%  TIME: " $10}'
+    ps aux | grep -v grep | grep -E "scrape_mls_injuries.py|scraper_supervisor.py" | awk '{print "  PID: " $2 "  CPU: " $3"%  MEM: " $4"%  TIME: " $10}'
 else
     echo "✗ Scraper is NOT running"
 fi
@@ -36,10 +36,20 @@ else
     echo "  No data file yet (mls_player_injuries.csv)"
 fi
 
+echo ""
+echo "Live status (scraper_status.txt):"
+echo "-----------------------------------------------------------------------"
+if [ -f "scraper_status.txt" ]; then
+    sed 's/^/  /' scraper_status.txt
+else
+    echo "  No status file yet (scraper_status.txt)"
+fi
+
 echo ""
 echo "-----------------------------------------------------------------------"
 echo "Commands:"
 echo "  Watch live: tail -f scraper_output.log"
 echo "  Stop scraper: pkill -f scrape_mls_injuries.py"
+echo "  Metrics endpoint (with --metrics-port 9108): curl -s localhost:9108/metrics"
 echo "  Re-run monitor: bash monitor_scraper.sh"
 echo "======================================================================="
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Append-only raw page archive and offline reparse
+Every response PageFetcher receives is stored as a compressed WARC-style
+record (zstd when the zstandard package is installed, gzip otherwise) in
+segment files, with a JSON-lines index keyed by URL and fetch time. The
+reparse command rebuilds the injury, transfer, fixture and match-log tables
+from the archive alone, in parallel, so a parser fix needs no re-scrape.
+"""
+
+import os
+import io
+import re
+import gzip
+import json
+import uuid
+import base64
+import hashlib
+import argparse
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from http import HTTPStatus
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional; records fall back to gzip members
+    zstandard = None
+
+from page_fixtures import fixture_key
+from pipeline_metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Archive location for PageFetcher ('' disables archiving)
+ARCHIVE_DIR_ENV = "TRANSFERMARKT_ARCHIVE_DIR"
+DEFAULT_ARCHIVE_DIR = "page_archive"
+
+# Serve pages archived within this many hours instead of refetching them
+# (0, the default, always fetches)
+ARCHIVE_REUSE_ENV = "TRANSFERMARKT_ARCHIVE_REUSE_HOURS"
+
+INDEX_FILE = "index.jsonl"
+SEGMENTS_DIR = "segments"
+
+# Start a new segment file once the current one reaches this size
+SEGMENT_BYTES = 256 * 1024 * 1024
+
+# Pages reparse knows how to turn into tables, in the order they are parsed
+REPARSE_TYPES = ['injuries', 'transfers', 'fixtures', 'match_log']
+
+
+def _http_reason(status: int) -> str:
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return 'Unknown'
+
+
+def warc_record(url: str, status: int, body: bytes, content_type: str,
+                fetched_at: datetime) -> Tuple[bytes, str]:
+    """
+    Serialize one response as a WARC/1.0 'response' record
+
+    Returns:
+        (record bytes, payload digest)
+    """
+    digest = 'sha1:' + base64.b32encode(hashlib.sha1(body).digest()).decode()
+    http_block = (
+        f"HTTP/1.1 {status} {_http_reason(status)}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode() + body
+    headers = (
+        "WARC/1.0\r\n"
+        "WARC-Type: response\r\n"
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+        f"WARC-Date: {fetched_at.strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+        f"WARC-Target-URI: {url}\r\n"
+        f"WARC-Payload-Digest: {digest}\r\n"
+        "Content-Type: application/http; msgtype=response\r\n"
+        f"Content-Length: {len(http_block)}\r\n\r\n"
+    ).encode()
+    return headers + http_block + b"\r\n\r\n", digest
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == 'zst':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == 'zst':
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .warc.zst segments (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class PageArchive:
+    """
+    Segmented, per-record compressed response archive
+
+    Each record is an independent zstd frame / gzip member, so a segment is
+    also a valid .warc.zst / .warc.gz file and any record can be read by
+    seeking to its index offset. Each process writes its own segment; the
+    index is shared and append-only.
+    """
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_DIR, codec: Optional[str] = None,
+                 segment_bytes: int = SEGMENT_BYTES):
+        """
+        Args:
+            path: Archive directory (created on first write)
+            codec: 'zst' or 'gz' for new records (default zst if available)
+            segment_bytes: Size at which a new segment file is started
+        """
+        self.path = path
+        self.codec = codec or ('zst' if zstandard is not None else 'gz')
+        self.segment_bytes = segment_bytes
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._segment: Optional[str] = None
+        self._segment_size = 0
+        self._lock = threading.Lock()
+
+    # -- reading ---------------------------------------------------------
+
+    def index(self) -> Iterable[Dict]:
+        """Every index entry, oldest first"""
+        index = os.path.join(self.path, INDEX_FILE)
+        if not os.path.exists(index):
+            return
+        with open(index) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # torn last line from an interrupted run
+
+    @property
+    def entries(self) -> Dict[str, Dict]:
+        """Latest index entry per fixture key (loaded on first use)"""
+        if self._entries is None:
+            entries = {}
+            for entry in self.index():
+                entries[entry['key']] = entry
+            self._entries = entries
+        return self._entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, url: str) -> bool:
+        return fixture_key(url) in self.entries
+
+    def read(self, entry: Dict, handles: Optional[Dict[str, io.BufferedReader]] = None) -> bytes:
+        """
+        Response body of an index entry
+
+        Args:
+            entry: Index entry
+            handles: Optional cache of open segment files (for bulk reads)
+        """
+        segment = os.path.join(self.path, SEGMENTS_DIR, entry['segment'])
+        if handles is None:
+            with open(segment, 'rb') as f:
+                f.seek(entry['offset'])
+                data = f.read(entry['length'])
+        else:
+            if segment not in handles:
+                handles[segment] = open(segment, 'rb')
+            handles[segment].seek(entry['offset'])
+            data = handles[segment].read(entry['length'])
+        record = _decompress(data, entry['segment'].rsplit('.', 1)[-1])
+        # Skip the WARC header block, then the HTTP header block
+        block = record.split(b"\r\n\r\n", 1)[1]
+        return block.split(b"\r\n\r\n", 1)[1][:entry['bytes']]
+
+    def fresh_entry(self, url: str, max_age_hours: float) -> Optional[Dict]:
+        """Latest entry for a URL if it is a 200 fetched within max_age_hours"""
+        fetched = self.last_fetched(url)
+        if fetched is None:
+            return None
+        age = datetime.now(timezone.utc) - fetched
+        return self.entries[fixture_key(url)] if age.total_seconds() <= max_age_hours * 3600 else None
+
+    def last_fetched(self, url: str) -> Optional[datetime]:
+        """UTC time of the latest successful fetch of a URL, or None"""
+        entry = self.entries.get(fixture_key(url))
+        if entry is None or entry['status'] != 200:
+            return None
+        return datetime.fromisoformat(entry['fetched_at'])
+
+    def lookup(self, key: str) -> Optional[Tuple[Dict, bytes]]:
+        """(index entry, body) of the latest fetch of a key (ReplayServer interface)"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        return entry, self.read(entry)
+
+    # -- writing ---------------------------------------------------------
+
+    def _open_segment(self):
+        os.makedirs(os.path.join(self.path, SEGMENTS_DIR), exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+        self._segment = f"{stamp}-{os.getpid()}-{uuid.uuid4().hex[:6]}.warc.{self.codec}"
+        self._segment_size = 0
+
+    def record(self, url: str, status: int, body: bytes, content_type: str = 'text/html'):
+        """Append one response"""
+        from page_fetcher import page_type_for_url
+
+        fetched_at = datetime.now(timezone.utc)
+        raw, digest = warc_record(url, status, body, content_type, fetched_at)
+        data = _compress(raw, self.codec)
+        with self._lock:
+            if self._segment is None or self._segment_size >= self.segment_bytes:
+                self._open_segment()
+            with open(os.path.join(self.path, SEGMENTS_DIR, self._segment), 'ab') as f:
+                offset = f.tell()
+                f.write(data)
+            self._segment_size = offset + len(data)
+            entry = {
+                'key': fixture_key(url),
+                'url': url,
+                'page_type': page_type_for_url(url),
+                'fetched_at': fetched_at.isoformat(timespec='seconds'),
+                'status': status,
+                'content_type': content_type,
+                'digest': digest,
+                'bytes': len(body),
+                'segment': self._segment,
+                'offset': offset,
+                'length': len(data),
+            }
+            with open(os.path.join(self.path, INDEX_FILE), 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+            if self._entries is not None:
+                self._entries[entry['key']] = entry
+        METRICS.inc('archive_bytes_total', len(data))
+
+
+_archives: Dict[str, PageArchive] = {}
+_archives_lock = threading.Lock()
+
+
+def archive_reuse_hours() -> float:
+    """Archive reuse window from $TRANSFERMARKT_ARCHIVE_REUSE_HOURS (0 = off)"""
+    return float(os.environ.get(ARCHIVE_REUSE_ENV) or 0)
+
+
+def archive_from_env() -> Optional[PageArchive]:
+    """
+    Process-wide archive for PageFetcher: $TRANSFERMARKT_ARCHIVE_DIR, or
+    page_archive/ when unset (set it to '' to disable archiving)
+    """
+    path = os.environ.get(ARCHIVE_DIR_ENV, DEFAULT_ARCHIVE_DIR)
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    with _archives_lock:
+        if path not in _archives:
+            _archives[path] = PageArchive(path)
+        return _archives[path]
+
+
+# -- reparse ---------------------------------------------------------------
+
+def _url_season(url: str) -> Optional[str]:
+    match = re.search(r'saison(?:_id)?[=/](\d{4})', url)
+    return match.group(1) if match else None
+
+
+def _parse_entries(archive_path: str, page_type: str, entries: List[Dict],
+                   team_names: Dict[int, str]) -> List[Dict]:
+    """Parse a batch of archived pages of one type (runs in a worker process)"""
+    from bs4 import BeautifulSoup
+
+    import page_parsers
+    from mls_ids import extract_player_id, extract_team_id
+
+    archive = PageArchive(archive_path)
+    handles: Dict[str, io.BufferedReader] = {}
+    rows = []
+    try:
+        for entry in entries:
+            soup = BeautifulSoup(archive.read(entry, handles), 'html.parser')
+            url = entry['url']
+            context: Dict = {}
+            if page_type == 'league':
+                parsed = page_parsers.parse_league_teams(soup)
+                context['season'] = _url_season(url)
+            elif page_type == 'squad':
+                parsed = page_parsers.parse_squad_players(soup)
+                context.update(team_id=extract_team_id(url), season=_url_season(url))
+            elif page_type == 'injuries':
+                parsed = page_parsers.parse_injuries(soup)
+                context['player_id'] = extract_player_id(url)
+            elif page_type == 'transfers':
+                parsed = page_parsers.parse_transfers(soup)
+                context['player_id'] = extract_player_id(url)
+            elif page_type == 'fixtures':
+                team_id = extract_team_id(url)
+                parsed = page_parsers.parse_fixtures(soup, team_names.get(team_id, ''))
+                context.update(team_id=team_id, season=_url_season(url))
+            else:
+                parsed = page_parsers.parse_match_log(soup)
+                context.update(player_id=extract_player_id(url), season=_url_season(url))
+            rows.extend({**context, **row, 'fetched_at': entry['fetched_at']} for row in parsed)
+    finally:
+        for handle in handles.values():
+            handle.close()
+    return rows
+
+
+def _parse_parallel(archive: PageArchive, page_type: str, entries: List[Dict],
+                    team_names: Dict[int, str], pool: ProcessPoolExecutor,
+                    chunk_size: int) -> List[Dict]:
+    from run_logging import progress
+
+    chunks = [entries[i:i + chunk_size] for i in range(0, len(entries), chunk_size)]
+    futures = [
+        pool.submit(_parse_entries, archive.path, page_type, chunk, team_names)
+        for chunk in chunks
+    ]
+    rows = []
+    for future in progress(as_completed(futures), desc=f"Reparse {page_type}",
+                           stage=f"reparse_{page_type}", total=len(futures)):
+        rows.extend(future.result())
+    METRICS.inc('reparsed_pages_total', len(entries), page_type=page_type)
+    return rows
+
+
+def reparse(archive_path: str = DEFAULT_ARCHIVE_DIR, out_dir: str = "reparsed",
+            page_types: Optional[List[str]] = None, workers: Optional[int] = None,
+            chunk_size: int = 200) -> Dict[str, str]:
+    """
+    Rebuild the collected tables from archived pages, with no network access
+
+    Uses the latest successful fetch of each URL. League and squad pages are
+    parsed first: they supply team names (for home/away on fixtures) and the
+    player names, positions and teams attached to injury rows.
+
+    Args:
+        archive_path: Archive directory
+        out_dir: Directory for the rebuilt CSVs
+        page_types: Subset of REPARSE_TYPES (default all)
+        workers: Parser processes (default: CPU count)
+        chunk_size: Pages per worker task
+
+    Returns:
+        Mapping of table name -> CSV path written
+    """
+    import pandas as pd
+
+    from mls_ids import IdRegistry, extract_player_id, extract_team_id
+    from scrape_mls_injuries import INJURY_COLUMNS, injury_row
+
+    archive = PageArchive(archive_path)
+    latest: Dict[str, Dict] = {}
+    for entry in archive.index():
+        if entry['status'] == 200:
+            latest[entry['key']] = entry
+    by_type: Dict[str, List[Dict]] = defaultdict(list)
+    for entry in latest.values():
+        by_type[entry['page_type']].append(entry)
+    logger.info("Archive pages by type: " + ', '.join(f"{t}={len(e)}" for t, e in sorted(by_type.items())))
+
+    page_types = page_types or REPARSE_TYPES
+    registry = IdRegistry()
+    os.makedirs(out_dir, exist_ok=True)
+    written = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def parse(page_type: str, team_names: Dict[int, str]) -> List[Dict]:
+            return _parse_parallel(archive, page_type, by_type.get(page_type, []),
+                                   team_names, pool, chunk_size)
+
+        # Team names: registry first, league pages win
+        team_names = registry.canonical_team_names()
+        for team in parse('league', {}):
+            team_id = extract_team_id(team['url'])
+            if team_id is not None:
+                team_names[team_id] = team['name']
+
+        squads = pd.DataFrame(parse('squad', team_names))
+        if not squads.empty:
+            squads['player_id'] = squads['url'].map(extract_player_id)
+            squads['team'] = squads['team_id'].map(team_names)
+            squads = squads.sort_values(['season', 'fetched_at'])
+            path = os.path.join(out_dir, "squads.csv")
+            squads[['season', 'team_id', 'team', 'player_id', 'name', 'position', 'url']].to_csv(path, index=False)
+            written['squads'] = path
+            # Most recent squad listing per player supplies name/position/team
+            known_players = squads.drop_duplicates('player_id', keep='last').set_index('player_id')
+        else:
+            known_players = pd.DataFrame(columns=['name', 'position', 'team', 'url'])
+
+        if 'injuries' in page_types:
+            rows = []
+            for injury in parse('injuries', team_names):
+                player_id = injury['player_id']
+                known = known_players.loc[player_id] if player_id in known_players.index else None
+                fallback_team = known['team'] if known is not None else None
+                if injury['team'] is None:
+                    injury['team'] = fallback_team
+                name = known['name'] if known is not None else registry.players.get(player_id, {}).get('player_name')
+                team_id = extract_team_id(injury['team_href']) or registry.team_id(injury['team'])
+                rows.append(injury_row(injury, player_id, name,
+                                       known['position'] if known is not None else 'Unknown',
+                                       injury['fetched_at'][:10], team_id))
+            path = os.path.join(out_dir, "injuries.csv")
+            pd.DataFrame(rows, columns=INJURY_COLUMNS).to_csv(path, index=False)
+            written['injuries'] = path
+
+        if 'transfers' in page_types:
+            transfers = pd.DataFrame(parse('transfers', team_names))
+            if not transfers.empty:
+                transfers['to_team_id'] = [
+                    extract_team_id(href) or registry.team_id(name)
+                    for href, name in zip(transfers['to_team_href'], transfers['to_team'])
+                ]
+                transfers = transfers.drop(columns=['to_team_href'])
+            path = os.path.join(out_dir, "transfers.csv")
+            transfers.to_csv(path, index=False)
+            written['transfers'] = path
+
+        if 'fixtures' in page_types:
+            fixtures = pd.DataFrame(parse('fixtures', team_names))
+            if not fixtures.empty:
+                fixtures.insert(1, 'team', fixtures['team_id'].map(team_names))  # after team_id
+            path = os.path.join(out_dir, "fixtures.csv")
+            fixtures.to_csv(path, index=False)
+            written['fixtures'] = path
+
+        if 'match_log' in page_types:
+            path = os.path.join(out_dir, "match_logs.csv")
+            pd.DataFrame(parse('match_log', team_names)).to_csv(path, index=False)
+            written['match_logs'] = path
+
+    for table, path in written.items():
+        logger.info(f"Wrote {table} to {path}")
+    return written
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Raw Transfermarkt page archive")
+    parser.add_argument('--archive', default=os.environ.get(ARCHIVE_DIR_ENV) or DEFAULT_ARCHIVE_DIR)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rebuild = sub.add_parser('reparse', help="Rebuild tables from archived pages (no network)")
+    rebuild.add_argument('--out', default="reparsed", help="Output directory for the CSVs")
+    rebuild.add_argument('--types', nargs='+', choices=REPARSE_TYPES, default=REPARSE_TYPES)
+    rebuild.add_argument('--workers', type=int, default=None, help="Parser processes (default: all cores)")
+
+    sub.add_parser('info', help="Summarize the archive")
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        archive = PageArchive(args.archive)
+        records, stored, raw = 0, 0, 0
+        counts: Dict[str, int] = defaultdict(int)
+        for entry in archive.index():
+            records += 1
+            stored += entry['length']
+            raw += entry['bytes']
+        for entry in archive.entries.values():
+            counts[entry['page_type']] += 1
+        print(f"{records} records, {len(archive)} distinct URLs in {args.archive}")
+        if raw:
+            print(f"{raw / 1e6:.1f} MB of pages stored in {stored / 1e6:.1f} MB ({raw / max(stored, 1):.1f}x)")
+        for page_type, count in sorted(counts.items()):
+            print(f"  {page_type:<10} {count:>6}")
+        return
+
+    print("="*70)
+    print("Reparse from page archive")
+    print("="*70)
+    written = reparse(args.archive, args.out, args.types, args.workers)
+    for table, path in written.items():
+        print(f"✓ {table}: {path}")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
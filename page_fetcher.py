@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Shared Transfermarkt page fetcher
+Single fetch path for all collectors: adaptive rate limiting, session reuse
+and request/parse metrics
+"""
+
+import os
+import time
+import logging
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from bs4 import BeautifulSoup
+
+from page_archive import PageArchive, archive_from_env, archive_reuse_hours
+from page_fixtures import FixtureArchive, recorder_from_env
+from pipeline_metrics import METRICS, MetricsRegistry
+from rate_control import RateController, THROTTLE_STATUSES, parse_retry_after, shared_controller
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+
+# Point every Transfermarkt request at another host (e.g. a local replay server)
+BASE_URL_ENV = "TRANSFERMARKT_BASE_URL"
+
+# URL path segment -> page type label used in metrics and archives
+PAGE_TYPES = [
+    ('/verletzungen/', 'injuries'),
+    ('/transfers/', 'transfers'),
+    ('/leistungsdatendetails/', 'match_log'),
+    ('/spielplan/', 'fixtures'),
+    ('/kader/', 'squad'),
+    ('/wettbewerb/', 'league'),
+]
+
+
+def page_type_for_url(url: str) -> str:
+    """Classify a Transfermarkt URL by page type"""
+    for segment, page_type in PAGE_TYPES:
+        if segment in url:
+            return page_type
+    return 'other'
+
+
+def status_label(error: Exception) -> str:
+    """Metrics label for a failed request: HTTP status code or error class"""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return str(error.response.status_code)
+    if isinstance(error, requests.Timeout):
+        return 'timeout'
+    if isinstance(error, requests.ConnectionError):
+        return 'connection'
+    return 'error'
+
+
+class PageFetcher:
+    """Fetches and parses pages, paced by a shared adaptive rate controller"""
+
+    def __init__(self, delay: float = 3.0, timeout: float = 10.0,
+                 metrics: MetricsRegistry = METRICS, base_url: Optional[str] = None,
+                 recorder: Optional[FixtureArchive] = None,
+                 archive: Optional[PageArchive] = None,
+                 controller: Optional[RateController] = None,
+                 max_rpm: Optional[float] = None, throttle_retries: int = 3,
+                 reuse_hours: Optional[float] = None):
+        """
+        Args:
+            delay: Starting seconds between requests; the controller adapts
+                it from there
+            timeout: Per-request timeout in seconds
+            metrics: Registry receiving request/parse metrics
+            base_url: Scheme and host replacing transfermarkt.us in requested
+                URLs (defaults to $TRANSFERMARKT_BASE_URL); stored URLs are
+                unaffected
+            recorder: Fixture archive receiving every response (defaults to
+                $TRANSFERMARKT_RECORD_DIR)
+            archive: Raw page archive receiving every response (defaults to
+                $TRANSFERMARKT_ARCHIVE_DIR or page_archive/)
+            controller: Rate controller (defaults to the process-wide one
+                for the target host, shared by all collectors)
+            max_rpm: Requests-per-minute ceiling for a newly created controller
+            throttle_retries: Times a 429/503 page is retried after waiting
+                out Retry-After before giving up on it
+            reuse_hours: Serve pages archived within this many hours without
+                a request (defaults to $TRANSFERMARKT_ARCHIVE_REUSE_HOURS or 0)
+        """
+        self.delay = delay
+        self.timeout = timeout
+        self.metrics = metrics
+        self.base_url = (base_url or os.environ.get(BASE_URL_ENV) or '').rstrip('/')
+        self.recorder = recorder if recorder is not None else recorder_from_env()
+        self.archive = archive if archive is not None else archive_from_env()
+        # Status label of the most recent failed get_page (None after a success)
+        self.last_error: Optional[str] = None
+        self.controller = controller or shared_controller(
+            urlsplit(self.base_url).netloc or 'transfermarkt', initial_delay=delay, max_rpm=max_rpm
+        )
+        self.throttle_retries = throttle_retries
+        self.reuse_hours = archive_reuse_hours() if reuse_hours is None else reuse_hours
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': USER_AGENT})
+
+    def get_page(self, url: str) -> Optional[BeautifulSoup]:
+        """
+        Fetch and parse a webpage with rate limiting
+
+        Args:
+            url: URL to fetch
+
+        Returns:
+            BeautifulSoup object or None if failed
+        """
+        page_type = page_type_for_url(url)
+        self.last_error = None
+        if self.archive is not None and self.reuse_hours > 0:
+            entry = self.archive.fresh_entry(url, self.reuse_hours)
+            self.metrics.record_cache('archive', entry is not None)
+            if entry is not None:
+                return self._parse(self.archive.read(entry), page_type)
+        for attempt in range(self.throttle_retries + 1):
+            self.metrics.inc('sleep_seconds_total', self.controller.wait())  # Rate limiting
+
+            start = time.perf_counter()
+            try:
+                response = self.session.get(self.request_url(url), timeout=self.timeout)
+            except Exception as e:
+                latency = time.perf_counter() - start
+                self.controller.record(None, latency)
+                self._record_failure(url, page_type, e, latency)
+                return None
+            latency = time.perf_counter() - start
+            self.metrics.record_request(page_type, str(response.status_code), latency)
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.controller.record(response.status_code, latency, retry_after)
+            if response.status_code not in THROTTLE_STATUSES or attempt == self.throttle_retries:
+                break
+            logger.info(f"Throttled ({response.status_code}) on {url}; retrying")
+
+        content_type = response.headers.get('Content-Type', 'text/html')
+        if self.recorder is not None:
+            self.recorder.record(url, response.status_code, response.content, content_type)
+        if self.archive is not None:
+            try:
+                self.archive.record(url, response.status_code, response.content, content_type)
+            except OSError as e:
+                # A full disk should not stop the scrape
+                logger.warning(f"Could not archive {url}: {e}")
+
+        try:
+            response.raise_for_status()
+        except Exception as e:
+            self._record_failure(url, page_type, e)
+            return None
+
+        return self._parse(response.content, page_type)
+
+    def _parse(self, content: bytes, page_type: str) -> BeautifulSoup:
+        start = time.perf_counter()
+        soup = BeautifulSoup(content, 'html.parser')
+        self.metrics.observe('parse_seconds', time.perf_counter() - start, page_type=page_type)
+        return soup
+
+    def request_url(self, url: str) -> str:
+        """URL actually requested, with the host swapped when base_url is set"""
+        if not self.base_url:
+            return url
+        parts = urlsplit(url)
+        if 'transfermarkt' not in parts.netloc:
+            return url
+        return self.base_url + parts.path + (f"?{parts.query}" if parts.query else '')
+
+    def _record_failure(self, url: str, page_type: str, error: Exception, latency: Optional[float] = None):
+        """Count a failed fetch by status code / error class and log it"""
+        label = status_label(error)
+        self.last_error = label
+        if latency is not None:
+            # No response object, so the request was not recorded yet
+            self.metrics.record_request(page_type, label, latency)
+        self.metrics.inc('http_errors_total', page_type=page_type, status=label)
+        logger.error(f"Failed to fetch {url}: {error}")
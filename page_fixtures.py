@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Record/replay of Transfermarkt pages for offline runs
+Pages fetched during a run are saved to a fixture archive (set
+TRANSFERMARKT_RECORD_DIR); ReplayServer serves them back on localhost so the
+collectors can run against it via TRANSFERMARKT_BASE_URL
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import argparse
+import logging
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Environment variable enabling recording in PageFetcher
+RECORD_DIR_ENV = "TRANSFERMARKT_RECORD_DIR"
+
+INDEX_FILE = "index.jsonl"
+PAGES_DIR = "pages"
+
+
+def fixture_key(url: str) -> str:
+    """Host-independent key for a URL: path plus query string"""
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else '')
+
+
+class FixtureArchive:
+    """
+    Directory of gzip-compressed page bodies with an append-only JSON-lines index
+
+    Later recordings of the same URL replace earlier ones on load.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Archive directory (created on first write)
+        """
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        index = os.path.join(self.path, INDEX_FILE)
+        if not os.path.exists(index):
+            return
+        with open(index) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from an interrupted run
+                self.entries[entry['key']] = entry
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, url: str) -> bool:
+        return fixture_key(url) in self.entries
+
+    def record(self, url: str, status: int, body: bytes, content_type: str = 'text/html'):
+        """Save one response"""
+        key = fixture_key(url)
+        name = hashlib.sha1(key.encode()).hexdigest() + '.html.gz'
+        entry = {
+            'key': key,
+            'status': status,
+            'content_type': content_type,
+            'file': name,
+            'bytes': len(body),
+            'recorded': datetime.now().isoformat(timespec='seconds'),
+        }
+        with self._lock:
+            os.makedirs(os.path.join(self.path, PAGES_DIR), exist_ok=True)
+            with gzip.open(os.path.join(self.path, PAGES_DIR, name), 'wb') as f:
+                f.write(body)
+            with open(os.path.join(self.path, INDEX_FILE), 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+            self.entries[key] = entry
+
+    def lookup(self, key: str) -> Optional[Tuple[Dict, bytes]]:
+        """(index entry, body) for a fixture key, or None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        with gzip.open(os.path.join(self.path, PAGES_DIR, entry['file']), 'rb') as f:
+            return entry, f.read()
+
+
+def recorder_from_env() -> Optional[FixtureArchive]:
+    """Archive to record into when TRANSFERMARKT_RECORD_DIR is set"""
+    path = os.environ.get(RECORD_DIR_ENV)
+    return FixtureArchive(path) if path else None
+
+
+class ReplayServer:
+    """Local HTTP stand-in for transfermarkt.us serving archived pages"""
+
+    def __init__(self, archive: FixtureArchive, port: int = 0):
+        """
+        Args:
+            archive: Recorded pages to serve
+            port: Localhost port (0 picks a free one)
+        """
+        self.archive = archive
+        self.hits = 0
+        self.misses: Dict[str, int] = {}
+        self.status_counts: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._make_handler())
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _make_handler(self):
+        replay = self
+
+        class ReplayHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                found = replay.archive.lookup(self.path)
+                status = found[0]['status'] if found else 404
+                with replay._lock:
+                    replay.status_counts[status] = replay.status_counts.get(status, 0) + 1
+                    if found is None:
+                        replay.misses[self.path] = replay.misses.get(self.path, 0) + 1
+                    else:
+                        replay.hits += 1
+                if found is None:
+                    self.send_error(404, "Not in fixture archive")
+                    return
+                entry, body = found
+                self.send_response(entry['status'])
+                self.send_header('Content-Type', entry['content_type'])
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"replay: {format % args}")
+
+        return ReplayHandler
+
+    def start(self) -> 'ReplayServer':
+        self.thread = threading.Thread(target=self.server.serve_forever, name='replay-server', daemon=True)
+        self.thread.start()
+        logger.info(f"Replaying {len(self.archive)} pages at {self.base_url}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Transfermarkt fixture archive tools")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve = sub.add_parser('serve', help="Serve an archive on localhost")
+    serve.add_argument('archive')
+    serve.add_argument('--port', type=int, default=8765)
+
+    info = sub.add_parser('info', help="Summarize an archive")
+    info.add_argument('archive')
+
+    args = parser.parse_args()
+    archive = FixtureArchive(args.archive)
+
+    if args.command == 'serve':
+        server = ReplayServer(archive, args.port).start()
+        print(f"export TRANSFERMARKT_BASE_URL={server.base_url}")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            server.stop()
+    else:
+        from page_fetcher import page_type_for_url
+        counts: Dict[str, int] = {}
+        for key in archive.entries:
+            page_type = page_type_for_url(key)
+            counts[page_type] = counts.get(page_type, 0) + 1
+        print(f"{len(archive)} pages in {args.archive}")
+        for page_type, count in sorted(counts.items()):
+            print(f"  {page_type:<10} {count:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Transfermarkt page parsers
+Pure functions turning a parsed page into row dicts (plus the URL builders
+for those pages), shared by the live collectors and by page_archive reparse.
+They do no fetching and no ID registration; callers attach player/team IDs
+from the returned hrefs.
+"""
+
+import re
+import logging
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from date_normalization import parse_date
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://www.transfermarkt.us"
+MLS_LEAGUE_URL = f"{BASE_URL}/major-league-soccer/startseite/wettbewerb/MLS1"
+
+
+def _item_rows(soup: BeautifulSoup) -> List:
+    """Data rows of the page's main 'items' table"""
+    table = soup.find('table', {'class': 'items'})
+    if not table:
+        return []
+    return table.find_all('tr', {'class': ['odd', 'even']})
+
+
+def parse_league_teams(soup: BeautifulSoup, base_url: str = BASE_URL) -> List[Dict[str, str]]:
+    """
+    Teams listed on a league overview page
+
+    Returns:
+        List of {'name', 'url'} dicts
+    """
+    teams = []
+    for row in _item_rows(soup):
+        team_cell = row.find('td', {'class': 'hauptlink'})
+        if team_cell and team_cell.find('a'):
+            team_link = team_cell.find('a')
+            teams.append({
+                'name': team_link.text.strip(),
+                'url': base_url + team_link['href']
+            })
+    return teams
+
+
+def parse_squad_players(soup: BeautifulSoup, base_url: str = BASE_URL) -> List[Dict[str, str]]:
+    """
+    Players listed on a squad (kader) page
+
+    Returns:
+        List of {'name', 'url', 'position'} dicts
+    """
+    players = []
+    for row in _item_rows(soup):
+        # Get player name and URL from the positionCell
+        cells = row.find_all('td')
+        if len(cells) > 1:
+            # Position might be in a nested table or div
+            pos_text = cells[0].get_text(strip=True)
+            position = pos_text if pos_text else "Unknown"
+
+            # Player name is in hauptlink cell
+            name_cell = row.find('td', {'class': 'hauptlink'})
+            if name_cell:
+                for link in name_cell.find_all('a'):
+                    if '/profil/spieler/' in link.get('href', ''):
+                        players.append({
+                            'name': link.text.strip(),
+                            'url': base_url + link['href'],
+                            'position': position
+                        })
+                        break
+    return players
+
+
+def _club_name(cell) -> Optional[str]:
+    """Club name from a crest image title, else the cell's link text"""
+    img = cell.find('img', {'class': 'tiny_wappen'})
+    if img and 'title' in img.attrs:
+        return img['title']
+    link = cell.find('a')
+    return link.get_text(strip=True) if link else None
+
+
+def parse_transfers(soup: BeautifulSoup) -> List[Dict]:
+    """
+    Rows of a player's transfer history page
+
+    Returns:
+        List of {'date', 'from_team', 'to_team', 'to_team_href'} dicts
+    """
+    transfers = []
+    for row in _item_rows(soup):
+        cells = row.find_all('td')
+        if len(cells) >= 4:
+            try:
+                date_text = cells[0].get_text(strip=True)
+                left_club = _club_name(cells[1])
+                joined_club = _club_name(cells[2])
+
+                if date_text and joined_club:
+                    joined_href = cells[2].find('a', href=re.compile(r'/verein/'))
+                    transfers.append({
+                        'date': date_text,
+                        'from_team': left_club,
+                        'to_team': joined_club,
+                        'to_team_href': joined_href['href'] if joined_href else None
+                    })
+            except Exception as e:
+                logger.debug(f"Error parsing transfer row: {e}")
+                continue
+    return transfers
+
+
+def parse_injuries(soup: BeautifulSoup, team: Optional[str] = None,
+                   player_name: str = '') -> List[Dict]:
+    """
+    Rows of a player's injury history page
+
+    The club column (games missed) names the team the player was at when
+    injured; team is the fallback when it has no crest or link.
+
+    Args:
+        soup: Parsed verletzungen page
+        team: Fallback team name
+        player_name: Only used in log messages
+
+    Returns:
+        List of dicts with season, injury_type, injury_date, return_date,
+        days_out, games_missed, team and team_href
+    """
+    injuries = []
+    for row in _item_rows(soup):
+        cells = row.find_all('td')
+        if len(cells) >= 5:
+            try:
+                days_out = cells[4].text.strip()
+                games_missed_cell = cells[5] if len(cells) > 5 else None
+
+                # Extract numeric days
+                days_match = re.search(r'(\d+)', days_out)
+                days_numeric = int(days_match.group(1)) if days_match else None
+
+                # Extract numeric games and team from games_missed cell
+                games_numeric = None
+                injury_team = team  # Default to current team
+                injury_team_url = None
+
+                if games_missed_cell:
+                    games_match = re.search(r'(\d+)', games_missed_cell.text.strip())
+                    games_numeric = int(games_match.group(1)) if games_match else None
+
+                    # The team link (when present) carries the verein ID
+                    team_link = games_missed_cell.find('a', href=re.compile(r'/verein/'))
+                    if team_link:
+                        injury_team_url = team_link['href']
+
+                    # Extract team from image in the games_missed cell
+                    team_img = games_missed_cell.find('img')
+                    if team_img and 'title' in team_img.attrs:
+                        injury_team = team_img['title']
+                    elif team_link:
+                        injury_team = team_link.get('title', team_link.text.strip())
+
+                injuries.append({
+                    'season': cells[0].text.strip(),
+                    'injury_type': cells[1].text.strip(),
+                    'injury_date': cells[2].text.strip(),
+                    'return_date': cells[3].text.strip(),
+                    'days_out': days_numeric,
+                    'games_missed': games_numeric,
+                    'team': injury_team,
+                    'team_href': injury_team_url
+                })
+            except Exception as e:
+                logger.warning(f"Error parsing injury row for {player_name}: {e}")
+    return injuries
+
+
+def parse_fixtures(soup: BeautifulSoup, team_name: str) -> List[Dict]:
+    """
+    Matches on a team's season schedule (spielplan) page
+
+    Args:
+        soup: Parsed spielplan page
+        team_name: The team whose schedule it is (decides home/away)
+
+    Returns:
+        List of {'date', 'opponent', 'home_team', 'away_team', 'is_home_game'}
+    """
+    fixtures = []
+    for row in _item_rows(soup):
+        try:
+            cells = row.find_all('td')
+            if len(cells) < 8:
+                continue
+
+            match_date = parse_date(cells[1].text.strip())
+            if not match_date:
+                continue
+
+            home_team = cells[4].find('a', {'class': 'vereinprofil_tooltip'})
+            away_team = cells[6].find('a', {'class': 'vereinprofil_tooltip'})
+            if not home_team or not away_team:
+                continue
+
+            home_team_name = home_team['title']
+            away_team_name = away_team['title']
+
+            # Determine if our team was home or away
+            is_home = (home_team_name == team_name)
+            fixtures.append({
+                'date': match_date,
+                'opponent': away_team_name if is_home else home_team_name,
+                'home_team': home_team_name,
+                'away_team': away_team_name,
+                'is_home_game': is_home
+            })
+        except Exception as e:
+            logger.debug(f"Error parsing fixture row: {e}")
+            continue
+    return fixtures
+
+
+def parse_match_log(soup: BeautifulSoup) -> List[Dict]:
+    """
+    Game-by-game rows of a player's performance detail page
+
+    Returns:
+        List of {'date', 'started', 'minutes', 'goals', 'assists',
+        'yellow_cards', 'red_cards'} dicts
+    """
+    matches = []
+    for row in _item_rows(soup):
+        cells = row.find_all('td')
+        if len(cells) < 10:
+            continue
+
+        try:
+            match_date = parse_date(cells[2].text.strip())
+            if not match_date:
+                continue
+
+            # Position in lineup (started/sub)
+            position_cell = cells[3]
+            started = 'Startaufstellung' in position_cell.get('title', '') or \
+                position_cell.find('span', {'class': 'hauptposition'}) is not None
+
+            minutes_text = cells[5].text.strip().replace("'", "")
+            goals_text = cells[6].text.strip()
+            assists_text = cells[7].text.strip()
+
+            matches.append({
+                'date': match_date,
+                'started': started,
+                'minutes': int(minutes_text) if minutes_text.isdigit() else 0,
+                'goals': int(goals_text) if goals_text.isdigit() else 0,
+                'assists': int(assists_text) if assists_text.isdigit() else 0,
+                'yellow_cards': 1 if cells[8].find('div', {'class': 'yellow-card'}) else 0,
+                'red_cards': 1 if cells[9].find('div', {'class': 'red-card'}) else 0
+            })
+        except Exception as e:
+            logger.debug(f"Error parsing match row: {e}")
+            continue
+    return matches
+
+
+def season_totals(matches: List[Dict]) -> Dict[str, int]:
+    """
+    Season totals from parse_match_log rows
+
+    Returns:
+        Dict of games, minutes, goals, assists, yellow_cards, red_cards
+    """
+    return {
+        'games': len(matches),
+        'minutes': sum(m['minutes'] for m in matches),
+        'goals': sum(m['goals'] for m in matches),
+        'assists': sum(m['assists'] for m in matches),
+        'yellow_cards': sum(m['yellow_cards'] for m in matches),
+        'red_cards': sum(m['red_cards'] for m in matches)
+    }
+
+
+def league_url(season: str) -> str:
+    """MLS overview page listing a season's teams"""
+    return f"{MLS_LEAGUE_URL}/plus/?saison_id={season}"
+
+
+def squad_url(team_url: str, season: str) -> str:
+    """Squad (kader) page for a team's homepage URL"""
+    # /inter-miami-cf/startseite/verein/69012 -> /inter-miami-cf/kader/verein/69012/saison_id/2024/plus/1
+    return team_url.replace('/startseite/', '/kader/') + f"/saison_id/{season}/plus/1"
+
+
+def injury_url(player_url: str) -> str:
+    """Injury history (verletzungen) page for a player profile URL"""
+    return player_url.replace('/profil/', '/verletzungen/')
+
+
+def match_log_url(player_url: str, season: str) -> str:
+    """Game-by-game performance page of a player for a Transfermarkt season"""
+    # plus/1 gives the detailed match view
+    return player_url.replace('/profil/', '/leistungsdatendetails/') + f"/saison/{season}/plus/1"
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+MLS injury pipeline orchestrator
+Runs the collection scripts as a DAG of stages with declared input and
+output files. A stage is skipped when its inputs, parameters and code
+(the script plus every local module it imports) hash the same as on its
+last successful run; independent stages run concurrently.
+"""
+
+import os
+import ast
+import sys
+import json
+import time
+import hashlib
+import argparse
+import logging
+import subprocess
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from rate_control import DEFAULT_MAX_RPM
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STATE = "pipeline_state.json"
+DEFAULT_LOG_DIR = "pipeline_logs"
+
+
+class Stage:
+    """One pipeline step: a script with declared input and output files"""
+
+    def __init__(self, name: str, script: str, inputs: List[str], outputs: List[str],
+                 args: Optional[List[str]] = None, network: bool = True, source: bool = False):
+        """
+        Args:
+            name: Stage name used on the command line
+            script: Script run as `python script args...`
+            inputs: Files the stage reads
+            outputs: Files the stage writes (a missing one makes it stale)
+            args: Command line arguments (part of the stage's fingerprint)
+            network: Fetches from Transfermarkt (shares the rate budget)
+            source: Collects new data from the site; input changes alone do
+                not rerun it (scrapes resume from their checkpoints when run)
+        """
+        self.name = name
+        self.script = script
+        self.inputs = inputs
+        self.outputs = outputs
+        self.args = args or []
+        self.network = network
+        self.source = source
+        self.deps: Set[str] = set()
+
+
+def default_stages(seasons: List[str]) -> List[Stage]:
+    """The collection workflow, in dependency order"""
+    return [
+        Stage('scrape', 'scrape_mls_injuries.py', [],
+              ['mls_player_injuries.csv', 'mls_players.csv', 'mls_teams.csv'],
+              args=['--seasons', *seasons], source=True),
+        Stage('update', 'scrape_2025_update.py', ['mls_player_injuries.csv'],
+              ['mls_player_injuries.csv', 'mls_injuries_2025_update.csv'],
+              args=['--export-flat'], source=True),
+        Stage('fixtures', 'match_injuries_to_fixtures.py',
+              ['mls_player_injuries.csv', 'mls_stadiums.csv', 'mls_teams.csv'],
+              ['mls_injury_enrichment.csv', 'mls_injuries_fixture_matched.csv', 'mls_fixtures.csv'],
+              args=['--export', 'mls_injuries_fixture_matched.csv']),
+        Stage('congestion', 'congestion_features.py',
+              ['mls_player_injuries.csv', 'mls_fixtures.csv', 'mls_teams.csv'],
+              ['mls_injury_congestion.csv'], network=False),
+        Stage('travel', 'stadium_geo.py',
+              ['mls_player_injuries.csv', 'mls_fixtures.csv', 'mls_stadiums.csv',
+               'mls_stadium_geo.csv', 'mls_teams.csv'],
+              ['mls_injury_travel.csv'], network=False),
+        Stage('recurrence', 'recurrence.py',
+              ['mls_player_injuries.csv', 'mls_teams.csv'],
+              ['mls_injury_recurrence.csv'], network=False),
+        Stage('cube', 'analysis_cube.py',
+              ['mls_player_injuries.csv', 'mls_injury_enrichment.csv', 'mls_teams.csv'],
+              ['mls_analysis_cube.csv', 'mls_analysis_cube_rows.csv'],
+              args=['refresh'], network=False),
+        Stage('performance_30day', 'collect_30day_performance.py',
+              ['mls_player_injuries.csv', 'mls_players.csv'],
+              ['mls_player_injuries_30day_performance.csv']),
+        Stage('performance_season', 'collect_performance_data.py',
+              ['mls_player_injuries.csv', 'mls_players.csv'],
+              ['mls_player_injuries_enhanced.csv']),
+        Stage('validate', 'validate_injury_data.py',
+              ['mls_player_injuries_enhanced.csv', 'injury_recovery_timelines.csv'],
+              ['validation_report.txt'], network=False),
+    ]
+
+
+def link_stages(stages: List[Stage]) -> Dict[str, Stage]:
+    """Derive dependencies: each input comes from the last earlier stage writing it"""
+    producers: Dict[str, str] = {}
+    for stage in stages:
+        stage.deps = {producers[path] for path in stage.inputs if path in producers}
+        for path in stage.outputs:
+            producers[path] = stage.name
+    return {stage.name: stage for stage in stages}
+
+
+def downstream(stages: Dict[str, Stage], names: List[str]) -> Set[str]:
+    """The named stages and everything that depends on them"""
+    selected = set(names)
+    changed = True
+    while changed:
+        changed = False
+        for stage in stages.values():
+            if stage.name not in selected and stage.deps & selected:
+                selected.add(stage.name)
+                changed = True
+    return selected
+
+
+def upstream(stages: Dict[str, Stage], names: List[str]) -> Set[str]:
+    """The named stages and everything they depend on"""
+    selected, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo.extend(stages[name].deps)
+    return selected
+
+
+def file_digest(path: str) -> Optional[str]:
+    """Content hash of a file (None when missing)"""
+    if not os.path.exists(path):
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def local_modules(script: str, root: str = ROOT) -> List[str]:
+    """A script and every module of this repo it imports, transitively"""
+    seen: Set[str] = set()
+    todo = [os.path.join(root, script)]
+    while todo:
+        path = todo.pop()
+        if path in seen or not os.path.exists(path):
+            continue
+        seen.add(path)
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                todo.append(os.path.join(root, name.split('.')[0] + '.py'))
+    return sorted(seen)
+
+
+def code_version(script: str, root: str = ROOT) -> str:
+    """Hash over the source of a script and its local imports"""
+    h = hashlib.blake2b(digest_size=16)
+    for path in local_modules(script, root):
+        h.update(os.path.relpath(path, root).encode('utf-8'))
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class Pipeline:
+    """Runs stale stages of a DAG and records fingerprints of successful runs"""
+
+    def __init__(self, stages: List[Stage], state_file: str = DEFAULT_STATE,
+                 log_dir: str = DEFAULT_LOG_DIR, jobs: int = 2,
+                 max_rpm: Optional[float] = None):
+        """
+        Args:
+            stages: Stages in dependency order
+            state_file: JSON with each stage's last successful fingerprint
+            log_dir: Per-stage stdout/stderr logs
+            jobs: Stages run at the same time
+            max_rpm: Requests-per-minute budget split across concurrently
+                running network stages (default $TRANSFERMARKT_MAX_RPM or 30)
+        """
+        self.stages = link_stages(stages)
+        self.order = [stage.name for stage in stages]
+        self.state_file = state_file
+        self.log_dir = log_dir
+        self.jobs = max(jobs, 1)
+        if max_rpm is None:
+            max_rpm = float(os.environ.get('TRANSFERMARKT_MAX_RPM', DEFAULT_MAX_RPM))
+        self.max_rpm = max_rpm
+        self.state = self._load_state()
+        self._lock = threading.Lock()
+        self._network_running = 0
+
+    def _load_state(self) -> Dict:
+        if not os.path.exists(self.state_file):
+            return {}
+        with open(self.state_file) as f:
+            return json.load(f)
+
+    def _save_state(self):
+        tmp = self.state_file + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_file)
+
+    def fingerprint(self, stage: Stage) -> Dict:
+        """Current code, parameter and input hashes of a stage"""
+        return {
+            'code': code_version(stage.script),
+            'args': stage.args,
+            'inputs': {path: file_digest(path) for path in stage.inputs},
+        }
+
+    def stale_reason(self, stage: Stage) -> Optional[str]:
+        """Why a stage must run, or None when it is up to date"""
+        missing = [path for path in stage.outputs if not os.path.exists(path)]
+        if missing:
+            return f"missing output {missing[0]}"
+        last = self.state.get(stage.name)
+        if last is None:
+            # Outputs that predate the orchestrator are adopted for source stages
+            return None if stage.source else "never run by the pipeline"
+        current = self.fingerprint(stage)
+        if current['code'] != last['code']:
+            return "code changed"
+        if current['args'] != last['args']:
+            return "parameters changed"
+        if not stage.source:
+            changed = [p for p, d in current['inputs'].items() if last['inputs'].get(p) != d]
+            if changed:
+                return f"input changed: {changed[0]}"
+        return None
+
+    def _run_stage(self, stage: Stage) -> bool:
+        """Run one stage's script; True on success"""
+        env = dict(os.environ)
+        if stage.network:
+            with self._lock:
+                self._network_running += 1
+                sharing = self._network_running
+            if self.max_rpm > 0:
+                env['TRANSFERMARKT_MAX_RPM'] = f"{self.max_rpm / sharing:g}"
+        os.makedirs(self.log_dir, exist_ok=True)
+        log_path = os.path.join(self.log_dir, f"{stage.name}.log")
+        command = [sys.executable, os.path.join(ROOT, stage.script), *stage.args]
+        logger.info(f"[{stage.name}] running {' '.join(command[1:])} (log: {log_path})")
+        start = time.time()
+        try:
+            with open(log_path, 'a') as log:
+                log.write(f"\n=== {datetime.now().isoformat(timespec='seconds')} {' '.join(command)}\n")
+                log.flush()
+                result = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT, env=env)
+        finally:
+            if stage.network:
+                with self._lock:
+                    self._network_running -= 1
+        seconds = time.time() - start
+        if result.returncode != 0:
+            logger.error(f"[{stage.name}] failed with exit code {result.returncode} after {seconds:.0f}s")
+            return False
+
+        record = self.fingerprint(stage)
+        record['outputs'] = {path: file_digest(path) for path in stage.outputs}
+        record['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        record['seconds'] = round(seconds, 1)
+        with self._lock:
+            self.state[stage.name] = record
+            self._save_state()
+        logger.info(f"[{stage.name}] done in {seconds:.0f}s")
+        return True
+
+    def run(self, targets: Optional[List[str]] = None, force: Optional[Set[str]] = None,
+            dry_run: bool = False) -> Dict[str, str]:
+        """
+        Run the stale stages needed for the targets
+
+        Args:
+            targets: Stages to bring up to date (default: all); their
+                upstream stages are checked too
+            force: Stages to run even if up to date
+            dry_run: Only report what would run
+
+        Returns:
+            Outcome per stage: ran, skipped, failed, blocked or would-run
+        """
+        selected = upstream(self.stages, targets) if targets else set(self.order)
+        force = force or set()
+        outcome: Dict[str, str] = {}
+        pending = [name for name in self.order if name in selected]
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                for name in list(pending):
+                    stage = self.stages[name]
+                    deps = stage.deps & selected
+                    if any(outcome.get(d) in ('failed', 'blocked') for d in deps):
+                        outcome[name] = 'blocked'
+                        pending.remove(name)
+                        logger.warning(f"[{name}] blocked by a failed upstream stage")
+                        continue
+                    if not all(d in outcome for d in deps):
+                        continue
+                    pending.remove(name)
+                    # Dry runs assume upstream stages that would run change their outputs
+                    upstream_runs = any(outcome.get(d) in ('ran', 'would-run') for d in deps)
+                    reason = "forced" if name in force else self.stale_reason(stage)
+                    if reason is None and dry_run and upstream_runs and not stage.source:
+                        reason = "upstream stage runs"
+                    missing = [p for p in stage.inputs if not os.path.exists(p)
+                               and not any(p in self.stages[d].outputs for d in deps)]
+                    if reason is None:
+                        outcome[name] = 'skipped'
+                        logger.info(f"[{name}] up to date")
+                    elif missing:
+                        outcome[name] = 'blocked'
+                        logger.warning(f"[{name}] missing input {missing[0]}")
+                    elif dry_run:
+                        outcome[name] = 'would-run'
+                        logger.info(f"[{name}] would run ({reason})")
+                    else:
+                        logger.info(f"[{name}] stale: {reason}")
+                        running[pool.submit(self._run_stage, stage)] = name
+                if not running:
+                    if pending and not any(
+                        all(d in outcome for d in self.stages[n].deps & selected) for n in pending
+                    ):
+                        break
+                    continue
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    outcome[name] = 'ran' if future.result() else 'failed'
+        return outcome
+
+    def status(self) -> List[Dict]:
+        """Per-stage state for display"""
+        rows = []
+        for name in self.order:
+            stage = self.stages[name]
+            last = self.state.get(name, {})
+            rows.append({
+                'stage': name,
+                'deps': ', '.join(sorted(stage.deps)) or '-',
+                'last_run': last.get('finished_at', 'never'),
+                'seconds': last.get('seconds'),
+                'stale': self.stale_reason(stage) or 'up to date',
+            })
+        return rows
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Run the MLS injury pipeline as a DAG of stages")
+    parser.add_argument('targets', nargs='*', help="Stages to bring up to date (default: all)")
+    parser.add_argument('--from', dest='from_stage', default=None,
+                        help="Re-run this stage and everything downstream of it")
+    parser.add_argument('--force', nargs='+', default=[], help="Re-run these stages even if up to date")
+    parser.add_argument('--seasons', nargs='+', default=[str(year) for year in range(2015, 2025)],
+                        help="Seasons for the scrape stage")
+    parser.add_argument('--jobs', type=int, default=2, help="Stages run at the same time")
+    parser.add_argument('--max-rpm', type=float, default=None,
+                        help="Requests-per-minute budget shared by concurrent network stages")
+    parser.add_argument('--state', default=DEFAULT_STATE)
+    parser.add_argument('--dry-run', action='store_true', help="Show what would run")
+    parser.add_argument('--status', action='store_true', help="Show each stage's state and exit")
+    args = parser.parse_args()
+
+    pipeline = Pipeline(default_stages(args.seasons), state_file=args.state,
+                        jobs=args.jobs, max_rpm=args.max_rpm)
+    names = set(pipeline.order)
+    unknown = [n for n in args.targets + args.force + [args.from_stage or ''] if n and n not in names]
+    if unknown:
+        parser.error(f"unknown stage {unknown[0]!r} (stages: {', '.join(pipeline.order)})")
+
+    if args.status:
+        print("="*70)
+        print("MLS Injury Pipeline - Stage Status")
+        print("="*70)
+        for row in pipeline.status():
+            seconds = f"{row['seconds']:.0f}s" if row['seconds'] is not None else ''
+            print(f"{row['stage']:<20} after: {row['deps']:<28} last: {row['last_run']:<20} "
+                  f"{seconds:>7}  {row['stale']}")
+        print("="*70)
+        return
+
+    force = set(args.force)
+    targets = args.targets or None
+    if args.from_stage:
+        force |= downstream(pipeline.stages, [args.from_stage])
+        targets = targets or sorted(force)
+
+    outcome = pipeline.run(targets=targets, force=force, dry_run=args.dry_run)
+
+    print("="*70)
+    print("PIPELINE SUMMARY" + (" (dry run)" if args.dry_run else ""))
+    print("="*70)
+    for name in pipeline.order:
+        if name in outcome:
+            print(f"{name:<20} {outcome[name]}")
+    print("="*70)
+    if any(result in ('failed', 'blocked') for result in outcome.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
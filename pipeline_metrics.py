@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Live metrics for scraper and matcher runs
+Counters, gauges and latency histograms exposed as Prometheus text on localhost
+and as an atomically rewritten status JSON file (with a key=value text companion for shell scripts)
+"""
+
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds (Prometheus-style, cumulative)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Samples kept per histogram for percentile estimates
+RESERVOIR_SIZE = 2048
+
+# Window used for requests/sec
+RATE_WINDOW_SECONDS = 60.0
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in key) + '}'
+
+
+class _Histogram:
+    """Cumulative buckets plus a bounded reservoir of recent samples"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.recent.append(value)
+        idx = bisect.bisect_left(self.buckets, value)
+        if idx < len(self.counts):
+            self.counts[idx] += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        pos = min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[pos]
+
+
+class MetricsRegistry:
+    """Thread-safe in-process metrics store shared by all pipeline stages"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._request_times = deque()
+        self._progress: Dict[str, Dict[str, float]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """Increment a counter"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to an absolute value"""
+        with self._lock:
+            self.gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a histogram sample (seconds for latency metrics)"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = _Histogram()
+            series[key].observe(value)
+
+    def record_request(self, page_type: str, status: str, latency: float):
+        """Record one HTTP fetch (latency, status and rolling request rate)"""
+        now = time.time()
+        self.inc('http_requests_total', page_type=page_type, status=status)
+        self.observe('http_request_seconds', latency, page_type=page_type)
+        with self._lock:
+            self._request_times.append(now)
+            while self._request_times and self._request_times[0] < now - RATE_WINDOW_SECONDS:
+                self._request_times.popleft()
+
+    def record_cache(self, cache: str, hit: bool):
+        """Record a cache lookup"""
+        self.inc('cache_lookups_total', cache=cache, result='hit' if hit else 'miss')
+
+    def set_progress(self, stage: str, done: int, total: int):
+        """
+        Update progress for a stage; ETA is derived from the observed rate
+        since the first progress update
+        """
+        now = time.time()
+        with self._lock:
+            progress = self._progress.get(stage)
+            if progress is None or done < progress['start_done']:
+                progress = {'start_time': now, 'start_done': done}
+                self._progress[stage] = progress
+            progress.update(done=done, total=total, updated=now)
+        self.set_gauge('progress_done', done, stage=stage)
+        self.set_gauge('progress_total', total, stage=stage)
+
+    def counter_total(self, name: str) -> float:
+        """Sum of a counter across all label sets"""
+        with self._lock:
+            return sum(self.counters.get(name, {}).values())
+
+    def histogram_total(self, name: str) -> Tuple[int, float]:
+        """(sample count, sum of samples) of a histogram across all label sets"""
+        with self._lock:
+            series = self.histograms.get(name, {}).values()
+            return sum(h.count for h in series), sum(h.total for h in series)
+
+    def requests_per_second(self) -> float:
+        now = time.time()
+        with self._lock:
+            recent = [t for t in self._request_times if t >= now - RATE_WINDOW_SECONDS]
+        window = min(RATE_WINDOW_SECONDS, max(now - self.started_at, 1.0))
+        return len(recent) / window
+
+    def _eta(self) -> Dict[str, Optional[float]]:
+        etas = {}
+        with self._lock:
+            for stage, p in self._progress.items():
+                elapsed = p['updated'] - p['start_time']
+                advanced = p['done'] - p['start_done']
+                remaining = max(p['total'] - p['done'], 0)
+                etas[stage] = remaining / (advanced / elapsed) if advanced > 0 and elapsed > 0 else None
+        return etas
+
+    def snapshot(self) -> Dict:
+        """JSON-serializable view of all metrics plus derived rates"""
+        etas = self._eta()
+        for stage, eta in etas.items():
+            if eta is not None:
+                self.set_gauge('eta_seconds', eta, stage=stage)
+
+        with self._lock:
+            counters = {
+                name: {_format_labels(k) or 'total': v for k, v in series.items()}
+                for name, series in self.counters.items()
+            }
+            gauges = {
+                name: {_format_labels(k) or 'value': v for k, v in series.items()}
+                for name, series in self.gauges.items()
+            }
+            histograms = {
+                name: {
+                    _format_labels(k) or 'all': {
+                        'count': h.count,
+                        'sum': round(h.total, 6),
+                        'p50': h.percentile(0.50),
+                        'p90': h.percentile(0.90),
+                        'p99': h.percentile(0.99),
+                    }
+                    for k, h in series.items()
+                }
+                for name, series in self.histograms.items()
+            }
+            lookups = dict(self.counters.get('cache_lookups_total', {}))
+
+        hits = sum(v for k, v in lookups.items() if ('result', 'hit') in k)
+        total = sum(lookups.values())
+        return {
+            'updated': datetime.now().isoformat(),
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'requests_per_second': round(self.requests_per_second(), 3),
+            'cache_hit_rate': round(hits / total, 4) if total else None,
+            'eta_seconds': {k: (round(v, 1) if v is not None else None) for k, v in etas.items()},
+            'counters': counters,
+            'gauges': gauges,
+            'histograms': histograms,
+        }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        self.snapshot()  # refresh derived gauges
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self.gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, h in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        cumulative += count
+                        le_key = key + (('le', f"{bound:g}"),)
+                        lines.append(f"{name}_bucket{_format_labels(le_key)} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {h.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {h.total:g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {h.count}")
+        lines.append("# TYPE requests_per_second gauge")
+        lines.append(f"requests_per_second {self.requests_per_second():g}")
+        return '\n'.join(lines) + '\n'
+
+
+# Shared registry used by every collector in the process
+METRICS = MetricsRegistry()
+
+
+def status_text_path(path: str) -> str:
+    """The key=value companion of a status JSON (scraper_status.json -> scraper_status.txt)"""
+    return os.path.splitext(path)[0] + '.txt'
+
+
+def render_status_text(snapshot: Dict) -> str:
+    """
+    Flat key=value lines of a status snapshot, for shell scripts to cat or grep
+
+    Returns:
+        updated, requests_per_second, cache_hit_rate, then progress.<stage>
+        (done/total), eta_minutes.<stage> and http_requests{labels} lines
+    """
+    hit_rate = snapshot.get('cache_hit_rate')
+    lines = [
+        f"updated={snapshot['updated']}",
+        f"requests_per_second={snapshot['requests_per_second']}",
+        f"cache_hit_rate={hit_rate * 100:.1f}%" if hit_rate is not None else "cache_hit_rate=",
+    ]
+    totals = snapshot['gauges'].get('progress_total', {})
+    for labels, done in snapshot['gauges'].get('progress_done', {}).items():
+        stage = labels.split('"')[1]
+        lines.append(f"progress.{stage}={done:.0f}/{totals.get(labels, 0):.0f}")
+        eta = snapshot['eta_seconds'].get(stage)
+        if eta is not None:
+            lines.append(f"eta_minutes.{stage}={eta / 60:.0f}")
+    for labels, count in snapshot['counters'].get('http_requests_total', {}).items():
+        lines.append(f"http_requests{labels if labels != 'total' else ''}={count:.0f}")
+    return '\n'.join(lines) + '\n'
+
+
+def write_status_file(path: str, registry: MetricsRegistry = METRICS):
+    """
+    Atomically rewrite the status JSON and its key=value text companion
+    (readers never see a partial file)
+    """
+    snapshot = registry.snapshot()
+    for target, content in ((path, json.dumps(snapshot, indent=2, default=str)),
+                            (status_text_path(path), render_status_text(snapshot))):
+        tmp_path = f"{target}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, target)
+
+
+class StatusFileWriter(threading.Thread):
+    """Background thread that rewrites the status file every few seconds"""
+
+    def __init__(self, path: str, interval: float = 5.0, registry: MetricsRegistry = METRICS):
+        super().__init__(name='status-file-writer', daemon=True)
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        try:
+            write_status_file(self.path, self.registry)
+        except Exception as e:
+            logger.warning(f"Could not write status file {self.path}: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        self.flush()
+
+
+def _make_handler(registry: MetricsRegistry):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith('/metrics'):
+                body = registry.render_prometheus().encode()
+                content_type = 'text/plain; version=0.0.4'
+            elif self.path.startswith('/status'):
+                body = json.dumps(registry.snapshot(), default=str).encode()
+                content_type = 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(f"metrics endpoint: {format % args}")
+
+    return MetricsHandler
+
+
+def start_metrics_server(port: int, registry: MetricsRegistry = METRICS) -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus text) and /status (JSON) on 127.0.0.1"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), _make_handler(registry))
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    logger.info(f"Metrics available at http://127.0.0.1:{server.server_address[1]}/metrics")
+    return server
+
+
+def start_monitoring(status_file: Optional[str] = None, port: Optional[int] = None,
+                     interval: float = 5.0) -> Optional[StatusFileWriter]:
+    """
+    Start the optional status file writer and HTTP endpoint
+
+    Args:
+        status_file: Path of the status JSON to rewrite every `interval` seconds
+        port: Localhost port for the Prometheus/JSON endpoint (None/0 disables)
+
+    Returns:
+        The status writer (call .stop() at exit to write a final snapshot)
+    """
+    if port:
+        start_metrics_server(port)
+    writer = None
+    if status_file:
+        writer = StatusFileWriter(status_file, interval)
+        writer.start()
+    return writer
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Read-only localhost query service over the injury dataset
+Loads the injury table (flat CSV or the partitioned injury store), the
+stored fixtures and the enrichment view once, indexes them by player_id,
+team_id and date, and answers JSON queries from memory:
+
+    /injuries?player_id=&team_id=&team=&from=&to=&limit=&offset=
+    /aggregate?by=mls_season&team_id=&from=&to=
+    /fixtures?team_id=&from=&to=
+    /status
+
+The source files are polled, and a changed table is loaded into a new
+snapshot that replaces the old one once built. Requests in flight keep
+the snapshot they started with.
+"""
+
+import os
+import json
+import time
+import argparse
+import logging
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from date_normalization import calendar_lookup, parse_dates
+from enrichment_view import DEFAULT_FIXTURES, DEFAULT_VIEW, EnrichmentView, with_injury_ids
+from injury_store import InjuryStore
+from injury_taxonomy import classify
+from mls_ids import IdRegistry
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8770
+RELOAD_INTERVAL = 2.0
+DEFAULT_LIMIT = 500
+
+AGGREGATE_KEYS = ['mls_season', 'month', 'team_id', 'player_id', 'injury_type', 'body_region',
+                  'injury_category', 'surface_type', 'climate_zone']
+
+_EPOCH = date(1970, 1, 1)
+
+# Spacing between teams on the combined (team, day) fixture key; larger than any day number
+_TEAM_STRIDE = 1_000_000
+
+
+class QueryError(ValueError):
+    """A request parameter that cannot be answered (HTTP 400)"""
+
+
+def _json_default(value):
+    """JSON encoding for numpy scalars and timestamps"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def _records_json(df: pd.DataFrame) -> List[str]:
+    """Each row as a JSON object (missing values as null)"""
+    records = df.astype(object).where(df.notna(), None).to_dict('records')
+    return [json.dumps(r, default=_json_default, ensure_ascii=False) for r in records]
+
+
+def _day_numbers(dates: pd.Series) -> pd.Series:
+    """Days since epoch (NaN for missing dates)"""
+    return (dates - pd.Timestamp('1970-01-01')).dt.days
+
+
+def _iso(dates: pd.Series, fallback: pd.Series) -> pd.Series:
+    """ISO dates where parseable, the original text elsewhere"""
+    return dates.dt.strftime('%Y-%m-%d').where(dates.notna(), fallback)
+
+
+class InjuryIndex:
+    """
+    One immutable snapshot of the tables with its lookup indexes
+
+    Injuries are sorted by date, so a date range is one searchsorted pair,
+    and by_player/by_team map an ID to the ascending row offsets of its
+    injuries (date order). Rows are pre-serialized to JSON at load time.
+    """
+
+    def __init__(self, injuries: pd.DataFrame, fixtures: pd.DataFrame,
+                 view_csv: str = DEFAULT_VIEW, registry: Optional[IdRegistry] = None):
+        start = time.perf_counter()
+        registry = registry or IdRegistry()
+        self.team_ids: Dict[str, int] = dict(registry.team_names)
+        self.team_names: Dict[int, str] = registry.canonical_team_names()
+
+        injuries = with_injury_ids(registry.add_id_columns(injuries.copy()), registry)
+        injuries = injuries[injuries['injury_id'].notna()].drop_duplicates('injury_id', keep='last')
+        if os.path.exists(view_csv):
+            injuries = EnrichmentView(view_csv).join(injuries)
+        dates = parse_dates(injuries['injury_date']).dt.normalize()
+        injuries = injuries.assign(
+            _day=_day_numbers(dates),
+            injury_date=_iso(dates, injuries['injury_date']),
+            return_date=_iso(parse_dates(injuries['return_date']).dt.normalize(), injuries['return_date']),
+            mls_season=calendar_lookup(dates)['mls_season'],
+            month=dates.dt.month.astype('Int64'),
+        )
+        injuries = pd.concat([injuries, classify(injuries['injury_type'])], axis=1)
+        injuries['player_id'] = pd.to_numeric(injuries['player_id'], errors='coerce').astype('Int64')
+        injuries['team_id'] = pd.to_numeric(injuries['team_id'], errors='coerce').astype('Int64')
+        injuries = injuries.sort_values(['_day', 'injury_id'], na_position='last').reset_index(drop=True)
+
+        self.size = len(injuries)
+        self.days = injuries['_day'].dropna().to_numpy('int64')
+        self.by_player = self._offsets(injuries['player_id'])
+        self.by_team = self._offsets(injuries['team_id'])
+        self.days_out = pd.to_numeric(injuries['days_out'], errors='coerce').to_numpy(float)
+        self.games_missed = pd.to_numeric(injuries['games_missed'], errors='coerce').to_numpy(float)
+        self.codes: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for key in AGGREGATE_KEYS:
+            if key in injuries.columns:
+                codes, uniques = pd.factorize(injuries[key], sort=True)
+                self.codes[key] = (codes, np.asarray(uniques, dtype=object))
+        self.rows = _records_json(injuries.drop(columns=['_day']))
+
+        fixtures = fixtures.copy()
+        fixture_dates = parse_dates(fixtures['date']).dt.normalize()
+        fixtures['_day'] = _day_numbers(fixture_dates)
+        fixtures['date'] = _iso(fixture_dates, fixtures['date'])
+        fixtures = fixtures.dropna(subset=['_day', 'team_id'])
+        fixtures = fixtures.sort_values(['team_id', '_day']).reset_index(drop=True)
+        self.fixture_keys = (fixtures['team_id'].to_numpy('int64') * _TEAM_STRIDE
+                             + fixtures['_day'].to_numpy('int64'))
+        self.fixture_rows = _records_json(fixtures.drop(columns=['_day']))
+
+        self.loaded_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.load_seconds = time.perf_counter() - start
+
+    @staticmethod
+    def _offsets(ids: pd.Series) -> Dict[int, np.ndarray]:
+        """ID -> ascending row offsets (rows without an ID are not indexed)"""
+        known = ids.notna().to_numpy()
+        offsets = np.flatnonzero(known)
+        groups = pd.Series(offsets).groupby(ids[known].astype('int64').to_numpy()).indices
+        return {int(key): offsets[positions] for key, positions in groups.items()}
+
+    def select(self, player_id: Optional[int] = None, team_id: Optional[int] = None,
+               start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """
+        Row offsets of the injuries matching every given filter, in date order
+
+        Args:
+            player_id: Player ID
+            team_id: Team ID
+            start: First day (days since epoch), inclusive
+            end: Last day (days since epoch), inclusive
+
+        Returns:
+            Ascending offsets (injuries without a date only match without a
+            date filter)
+        """
+        candidates = None
+        if player_id is not None:
+            candidates = self.by_player.get(player_id, np.empty(0, dtype='int64'))
+        if team_id is not None:
+            team_rows = self.by_team.get(team_id, np.empty(0, dtype='int64'))
+            candidates = team_rows if candidates is None else np.intersect1d(candidates, team_rows,
+                                                                             assume_unique=True)
+        if start is None and end is None:
+            return np.arange(self.size) if candidates is None else candidates
+        first = np.searchsorted(self.days, start, side='left') if start is not None else 0
+        last = np.searchsorted(self.days, end, side='right') if end is not None else len(self.days)
+        if candidates is None:
+            return np.arange(first, last)
+        return candidates[np.searchsorted(candidates, first):np.searchsorted(candidates, last)]
+
+    def aggregate(self, offsets: np.ndarray, by: str) -> List[Dict]:
+        """
+        Counts and days_out / games_missed totals per group of the selection
+
+        Returns:
+            One dict per non-empty group, sorted by the group value
+        """
+        if by not in self.codes:
+            raise QueryError(f"Cannot aggregate by '{by}' (one of {', '.join(self.codes)})")
+        codes, uniques = self.codes[by]
+        selected = codes[offsets]
+        valid = selected >= 0
+        selected = selected[valid]
+        rows = offsets[valid]
+        size = len(uniques)
+        counts = np.bincount(selected, minlength=size)
+        groups: List[Dict] = []
+        totals = {}
+        for name, values in (('days_out', self.days_out), ('games_missed', self.games_missed)):
+            known = ~np.isnan(values[rows])
+            totals[name] = (np.bincount(selected[known], weights=values[rows][known], minlength=size),
+                            np.bincount(selected[known], minlength=size))
+        for code in np.flatnonzero(counts):
+            value = uniques[code]
+            group = {by: value.item() if hasattr(value, 'item') else value, 'injuries': int(counts[code])}
+            if by == 'team_id':
+                group['team'] = self.team_names.get(int(uniques[code]))
+            for name, (total, known) in totals.items():
+                group[f'{name}_total'] = float(total[code])
+                group[f'{name}_mean'] = round(float(total[code] / known[code]), 1) if known[code] else None
+            groups.append(group)
+        return groups
+
+    def fixtures(self, team_id: int, start: Optional[int] = None, end: Optional[int] = None) -> List[str]:
+        """Stored fixtures of a team (JSON rows in date order)"""
+        base = team_id * _TEAM_STRIDE
+        first = np.searchsorted(self.fixture_keys, base + (start if start is not None else 0), side='left')
+        last = np.searchsorted(self.fixture_keys, base + (end if end is not None else _TEAM_STRIDE - 1),
+                               side='right')
+        return self.fixture_rows[first:last]
+
+
+class QueryService:
+    """Holds the current InjuryIndex and reloads it when a source file changes"""
+
+    def __init__(self, injuries_path: str = "mls_player_injuries.csv",
+                 fixtures_csv: str = DEFAULT_FIXTURES, view_csv: str = DEFAULT_VIEW,
+                 reload_interval: float = RELOAD_INTERVAL):
+        """
+        Args:
+            injuries_path: Flat injury CSV, or an injury store directory
+            fixtures_csv: Stored fixture table
+            view_csv: Enrichment view joined onto the injuries
+            reload_interval: Seconds between source file checks
+        """
+        self.injuries_path = injuries_path
+        self.fixtures_csv = fixtures_csv
+        self.view_csv = view_csv
+        self.reload_interval = reload_interval
+        self.reloads = 0
+        self.index: Optional[InjuryIndex] = None
+        self._signature = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sources(self) -> List[str]:
+        """Files the snapshot is built from"""
+        if os.path.isdir(self.injuries_path):
+            store = InjuryStore(self.injuries_path)
+            files = [store.partition_path(p) for p in store.partitions()]
+        else:
+            files = [self.injuries_path]
+        return files + [self.fixtures_csv, self.view_csv]
+
+    def signature(self) -> Tuple:
+        """(path, mtime, size) of every source file (writers replace files atomically)"""
+        entries = []
+        for path in self.sources():
+            try:
+                stat = os.stat(path)
+                entries.append((path, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                entries.append((path, None, None))
+        return tuple(entries)
+
+    def load(self):
+        """Build a new snapshot from the source files and swap it in"""
+        signature = self.signature()
+        if os.path.isdir(self.injuries_path):
+            injuries = InjuryStore(self.injuries_path).read()
+        else:
+            injuries = pd.read_csv(self.injuries_path)
+        fixtures = pd.read_csv(self.fixtures_csv) if os.path.exists(self.fixtures_csv) \
+            else pd.DataFrame(columns=['team_id', 'season', 'date', 'home_team', 'away_team'])
+        self.index = InjuryIndex(injuries, fixtures, self.view_csv)
+        self._signature = signature
+        self.reloads += 1
+        logger.info(f"Loaded {self.index.size:,} injuries and {len(self.index.fixture_rows):,} fixtures "
+                    f"in {self.index.load_seconds:.2f}s")
+
+    def maybe_reload(self) -> bool:
+        """Reload if a source changed; a failed load keeps the current snapshot"""
+        if self.signature() == self._signature:
+            return False
+        try:
+            self.load()
+            return True
+        except Exception as e:
+            logger.warning(f"Reload failed, still serving the snapshot from {self.index.loaded_at}: {e}")
+            return False
+
+    def start_watcher(self):
+        """Poll the sources in a background thread"""
+        def watch():
+            while not self._stop_event.wait(self.reload_interval):
+                self.maybe_reload()
+
+        self._thread = threading.Thread(target=watch, name='query-reload', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def handle(self, path: str) -> Tuple[int, str]:
+        """
+        Answer one request
+
+        Returns:
+            (HTTP status, JSON body)
+        """
+        start = time.perf_counter()
+        index = self.index
+        url = urlparse(path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == '/status':
+                body = json.dumps({
+                    'loaded_at': index.loaded_at, 'load_seconds': round(index.load_seconds, 3),
+                    'reloads': self.reloads, 'injuries': index.size,
+                    'players': len(index.by_player), 'teams': len(index.by_team),
+                    'fixtures': len(index.fixture_rows), 'sources': self.sources(),
+                })
+                return 200, body
+
+            filters = self._filters(index, params)
+            if url.path == '/injuries':
+                offsets = index.select(**filters)
+                limit = self._int(params, 'limit', DEFAULT_LIMIT)
+                skip = self._int(params, 'offset', 0)
+                if limit < 0 or skip < 0:
+                    raise QueryError("limit and offset must not be negative")
+                page = offsets[skip:skip + limit]
+                rows = ','.join(index.rows[i] for i in page)
+                elapsed = (time.perf_counter() - start) * 1000
+                return 200, (f'{{"count": {len(offsets)}, "returned": {len(page)}, '
+                             f'"elapsed_ms": {elapsed:.3f}, "rows": [{rows}]}}')
+            if url.path == '/aggregate':
+                groups = index.aggregate(index.select(**filters), params.get('by', 'mls_season'))
+                elapsed = (time.perf_counter() - start) * 1000
+                return 200, json.dumps({'by': params.get('by', 'mls_season'), 'elapsed_ms': round(elapsed, 3),
+                                        'groups': groups}, ensure_ascii=False)
+            if url.path == '/fixtures':
+                if filters['team_id'] is None:
+                    raise QueryError("team_id (or team) is required")
+                rows = index.fixtures(filters['team_id'], filters['start'], filters['end'])
+                elapsed = (time.perf_counter() - start) * 1000
+                return 200, (f'{{"count": {len(rows)}, "elapsed_ms": {elapsed:.3f}, '
+                             f'"rows": [{",".join(rows)}]}}')
+            return 404, json.dumps({'error': f"Unknown endpoint {url.path}"})
+        except QueryError as e:
+            return 400, json.dumps({'error': str(e)})
+
+    @staticmethod
+    def _int(params: Dict[str, str], key: str, default: Optional[int] = None) -> Optional[int]:
+        if key not in params:
+            return default
+        try:
+            return int(params[key])
+        except ValueError:
+            raise QueryError(f"{key} must be an integer, got '{params[key]}'")
+
+    def _filters(self, index: InjuryIndex, params: Dict[str, str]) -> Dict:
+        """player_id / team_id / date range arguments for InjuryIndex.select"""
+        team_id = self._int(params, 'team_id')
+        if team_id is None and 'team' in params:
+            if params['team'] not in index.team_ids:
+                raise QueryError(f"Unknown team '{params['team']}'")
+            team_id = index.team_ids[params['team']]
+        days = {}
+        for key in ('from', 'to'):
+            if key in params:
+                try:
+                    days[key] = (date.fromisoformat(params[key]) - _EPOCH).days
+                except ValueError:
+                    raise QueryError(f"{key} must be a YYYY-MM-DD date, got '{params[key]}'")
+        return {'player_id': self._int(params, 'player_id'), 'team_id': team_id,
+                'start': days.get('from'), 'end': days.get('to')}
+
+
+def _make_handler(service: QueryService):
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, body = service.handle(self.path)
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            logger.debug(f"query service: {format % args}")
+
+    return QueryHandler
+
+
+def start_query_server(service: QueryService, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Load the tables and serve them on 127.0.0.1 (with file watching)"""
+    if service.index is None:
+        service.load()
+    service.start_watcher()
+    server = ThreadingHTTPServer(('127.0.0.1', port), _make_handler(service))
+    thread = threading.Thread(target=server.serve_forever, name='query-server', daemon=True)
+    thread.start()
+    logger.info(f"Query service at http://127.0.0.1:{server.server_address[1]}/injuries")
+    return server
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Read-only localhost JSON queries over the injury dataset")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--injuries', default="mls_player_injuries.csv",
+                        help="Flat injury CSV or injury store directory")
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES)
+    parser.add_argument('--view', default=DEFAULT_VIEW)
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL,
+                        help="Seconds between checks for changed source files")
+    args = parser.parse_args()
+
+    service = QueryService(args.injuries, args.fixtures, args.view, args.reload_interval)
+    server = start_query_server(service, args.port)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    print("="*70)
+    print(f"Serving {service.index.size:,} injuries at {base}")
+    print("="*70)
+    print(f"  curl -s '{base}/injuries?player_id=<id>'")
+    print(f"  curl -s '{base}/injuries?team=<name>&from=2024-01-01&to=2024-12-31'")
+    print(f"  curl -s '{base}/aggregate?by=mls_season&team_id=<id>'")
+    print(f"  curl -s '{base}/fixtures?team_id=<id>&from=2024-01-01'")
+    print(f"  curl -s '{base}/status'")
+    print("="*70)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        service.stop()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
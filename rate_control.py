@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Adaptive request pacing for Transfermarkt
+AIMD rate control from observed latency and 429/503 responses, Retry-After
+handling and a hard requests-per-minute ceiling, shared by every fetcher in
+the process
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from pipeline_metrics import METRICS, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Politeness ceiling for all Transfermarkt requests from one process
+# (override with TRANSFERMARKT_MAX_RPM; 0 disables)
+DEFAULT_MAX_RPM = 30.0
+
+# Never go faster than this many seconds between requests (unless the
+# configured delay is lower, e.g. 0 against a local stand-in)
+DEFAULT_MIN_DELAY = 1.0
+
+# Delay used after the first throttle response when starting from zero
+THROTTLED_FLOOR = 1.0
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header (seconds or HTTP date) -> seconds to wait"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateController:
+    """
+    Additive-increase / multiplicative-decrease request pacing
+
+    The request rate (1 / delay) grows by a small step after every healthy
+    response and is cut by backoff_factor on 429/503 or when latency exceeds
+    slow_latency. Retry-After pauses all requests until it expires, and a
+    sliding one-minute window enforces max_rpm regardless of the AIMD state.
+    """
+
+    def __init__(self, initial_delay: float = 3.0, min_delay: Optional[float] = None,
+                 max_delay: float = 60.0, max_rpm: Optional[float] = None,
+                 rate_step: float = 0.01, backoff_factor: float = 2.0,
+                 slow_latency: float = 5.0, metrics: MetricsRegistry = METRICS):
+        """
+        Args:
+            initial_delay: Starting seconds between requests (the old fixed delay)
+            min_delay: Fastest allowed pacing (defaults to min(initial_delay, 1.0))
+            max_delay: Slowest pacing after repeated throttling
+            max_rpm: Hard requests-per-minute ceiling (defaults to
+                $TRANSFERMARKT_MAX_RPM or 30; 0 disables)
+            rate_step: Requests/sec added after each healthy response
+            backoff_factor: Delay multiplier on throttling or slow responses
+            slow_latency: Response time (seconds) treated as a congestion signal
+            metrics: Registry receiving pacing gauges/counters
+        """
+        if min_delay is None:
+            min_delay = min(initial_delay, DEFAULT_MIN_DELAY)
+        if max_rpm is None:
+            max_rpm = float(os.environ.get('TRANSFERMARKT_MAX_RPM', DEFAULT_MAX_RPM))
+        self.delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_rpm = max_rpm
+        self.rate_step = rate_step
+        self.backoff_factor = backoff_factor
+        self.slow_latency = slow_latency
+        self.metrics = metrics
+
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._sent = deque()
+        self.metrics.set_gauge('rate_delay_seconds', self.delay)
+
+    def wait(self) -> float:
+        """
+        Block until the next request may be sent
+
+        Slots are reserved under the lock so concurrent fetchers are spaced
+        out rather than released together.
+
+        Returns:
+            Seconds slept
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until)
+            if self.max_rpm > 0:
+                # Fractional ceilings (30/N shards) allow the next whole request
+                window = math.ceil(self.max_rpm)
+                while self._sent and self._sent[0] <= slot - 60.0:
+                    self._sent.popleft()
+                if len(self._sent) >= window:
+                    # Oldest request in the window must age out first
+                    slot = max(slot, self._sent[-window] + 60.0)
+                self._sent.append(slot)
+            self._next_slot = slot + self.delay
+        waited = slot - now
+        if waited > 0:
+            time.sleep(waited)
+        return waited
+
+    def record(self, status: Optional[int], latency: float, retry_after: Optional[float] = None):
+        """
+        Adjust pacing from one response
+
+        Args:
+            status: HTTP status (None for connection errors/timeouts)
+            latency: Seconds the request took
+            retry_after: Parsed Retry-After seconds, if sent
+        """
+        with self._lock:
+            if status in THROTTLE_STATUSES or status is None or latency > self.slow_latency:
+                base = self.delay if self.delay > 0 else THROTTLED_FLOOR / self.backoff_factor
+                self.delay = min(base * self.backoff_factor, self.max_delay)
+                reason = 'timeout' if status is None else (str(status) if status in THROTTLE_STATUSES else 'slow')
+                self.metrics.inc('rate_backoffs_total', reason=reason)
+            elif status < 400 and self.delay > self.min_delay:
+                rate = 1.0 / self.delay + self.rate_step
+                self.delay = max(1.0 / rate, self.min_delay)
+
+            if retry_after:
+                pause = time.monotonic() + min(retry_after, self.max_delay * 5)
+                self._paused_until = max(self._paused_until, pause)
+                self.metrics.inc('retry_after_seconds_total', retry_after)
+                logger.warning(f"Server asked us to back off for {retry_after:.0f}s (delay now {self.delay:.1f}s)")
+            delay = self.delay
+        self.metrics.set_gauge('rate_delay_seconds', delay)
+
+    def state(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'delay': self.delay,
+                'paused_for': max(self._paused_until - time.monotonic(), 0.0),
+                'sent_last_minute': len(self._sent),
+            }
+
+
+_controllers: Dict[str, RateController] = {}
+_controllers_lock = threading.Lock()
+
+
+def shared_controller(host: str, initial_delay: float = 3.0,
+                      max_rpm: Optional[float] = None) -> RateController:
+    """
+    Process-wide controller for a host
+
+    The first fetcher for a host configures it; later fetchers (other
+    collectors, sharded workers in the same process) share its pacing and
+    request budget.
+    """
+    with _controllers_lock:
+        controller = _controllers.get(host)
+        if controller is None:
+            controller = RateController(initial_delay=initial_delay, max_rpm=max_rpm)
+            _controllers[host] = controller
+        return controller
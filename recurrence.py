@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Re-injury and recurrence detection
+Every injury gets its number in the player's history, days since the
+previous injury, days since the player last returned from any injury, and
+whether it is a recurrence: an injury to the same body region (from
+injury_taxonomy) within a window after returning from the previous one.
+Injuries are sorted by (player_id, injury_date) once; counts and gaps are
+grouped cumcounts and shifts, returns are as-of lookups on a sorted
+(player, day) key.
+"""
+
+import argparse
+import logging
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from date_normalization import parse_dates
+from enrichment_view import with_injury_ids
+from injury_taxonomy import UNSPECIFIED, classify
+from mls_ids import IdRegistry
+from pipeline_metrics import METRICS
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = "mls_injury_recurrence.csv"
+
+# Days after returning within which a same-region injury is a recurrence
+# (the "early recurrence" window of the football injury consensus)
+RECURRENCE_WINDOW_DAYS = 60
+
+RECURRENCE_COLUMNS = [
+    'body_region', 'injury_category', 'injury_number', 'region_injury_number',
+    'days_since_previous_injury', 'days_since_last_return', 'days_since_region_return',
+    'previous_region_injury_id', 'is_recurrence',
+]
+
+# Spacing between groups on the combined (group, day) key; larger than any day number
+_GROUP_STRIDE = 1_000_000
+
+
+def _days(dates: pd.Series) -> pd.Series:
+    """Days since epoch (NaN for missing dates)"""
+    return (dates - pd.Timestamp('1970-01-01')).dt.days
+
+
+def last_return_index(return_groups: np.ndarray, return_days: np.ndarray,
+                      query_groups: np.ndarray, query_days: np.ndarray) -> np.ndarray:
+    """
+    As-of lookup: the latest return on or before each query day in its group
+
+    Args:
+        return_groups: Group code per return, sorted together with return_days
+        return_days: Return day per return (sorted within group)
+        query_groups: Group code per query
+        query_days: Injury day per query
+
+    Returns:
+        Index into the returns (-1 where the group has no earlier return)
+    """
+    if not len(return_days):
+        return np.full(len(query_days), -1)
+    keys = return_groups * _GROUP_STRIDE + return_days
+    previous = np.searchsorted(keys, query_groups * _GROUP_STRIDE + query_days, side='right') - 1
+    same_group = return_groups[np.maximum(previous, 0)] == query_groups
+    return np.where((previous >= 0) & same_group, previous, -1)
+
+
+def recurrence_features(injuries: pd.DataFrame, window_days: int = RECURRENCE_WINDOW_DAYS,
+                        registry: Optional[IdRegistry] = None) -> pd.DataFrame:
+    """
+    History and recurrence features for every injury in one pass
+
+    An earlier injury counts as a return once its return_date is on or
+    before the new injury's date; absences still running (or without a
+    return date) do not. Regions named by no rule (UNSPECIFIED, e.g.
+    "Muscle injury", illnesses) never match as recurrences.
+
+    Args:
+        injuries: Injury rows (player_id and injury_id derived when missing)
+        window_days: Maximum days from return to a same-region injury
+
+    Returns:
+        injury_id plus RECURRENCE_COLUMNS, one row per injury, sorted by
+        player and date (rows without a player or date last, with blanks)
+    """
+    registry = registry or IdRegistry()
+    injuries = with_injury_ids(registry.add_id_columns(injuries.copy()), registry)
+    injuries = injuries.drop_duplicates('injury_id')
+    labels = classify(injuries['injury_type'])
+
+    frame = pd.DataFrame({
+        'injury_id': injuries['injury_id'],
+        'player_id': pd.to_numeric(injuries['player_id'], errors='coerce'),
+        'day': _days(parse_dates(injuries['injury_date']).dt.normalize()),
+        'return_day': _days(parse_dates(injuries['return_date']).dt.normalize()),
+        'body_region': labels['body_region'],
+        'injury_category': labels['injury_category'],
+    })
+    known = frame['player_id'].notna() & frame['day'].notna()
+    unknown = frame[~known]
+    frame = (frame[known]
+             .astype({'player_id': 'int64', 'day': 'int64'})
+             .sort_values(['player_id', 'day', 'injury_id'])
+             .reset_index(drop=True))
+
+    by_player = frame.groupby('player_id', sort=False)
+    frame['injury_number'] = by_player.cumcount() + 1
+    frame['days_since_previous_injury'] = pd.array(frame['day'] - by_player['day'].shift(), dtype='Int64')
+
+    specified = (frame['body_region'] != UNSPECIFIED).to_numpy()
+    region_code = np.where(
+        specified, pd.factorize(frame['player_id'].astype(str) + '|' + frame['body_region'])[0], -1
+    )
+    frame['region_injury_number'] = pd.array(
+        np.where(specified, frame.groupby(region_code, sort=False).cumcount() + 1, np.nan), dtype='Int64'
+    )
+
+    # Completed absences, sorted by (group, return day) for the as-of lookups
+    players = frame['player_id'].to_numpy('int64')
+    days = frame['day'].to_numpy('int64')
+    returned = (frame['return_day'] > frame['day']).to_numpy()
+    return_days = frame['return_day'].fillna(0).to_numpy('int64')
+
+    order = np.lexsort((return_days[returned], players[returned]))
+    rows = np.flatnonzero(returned)[order]
+    last = last_return_index(players[rows], return_days[rows], players, days)
+    frame['days_since_last_return'] = pd.array(
+        np.where(last >= 0, days - return_days[rows[np.maximum(last, 0)]], np.nan), dtype='Int64'
+    )
+
+    region_returned = returned & specified
+    order = np.lexsort((return_days[region_returned], region_code[region_returned]))
+    region_rows = np.flatnonzero(region_returned)[order]
+    last = last_return_index(region_code[region_rows], return_days[region_rows], region_code, days)
+    last = np.where(specified, last, -1)
+    previous = region_rows[np.maximum(last, 0)] if len(region_rows) else np.zeros(len(days), 'int64')
+    gap = np.where(last >= 0, days - return_days[previous], np.nan)
+    frame['days_since_region_return'] = pd.array(gap, dtype='Int64')
+    frame['previous_region_injury_id'] = np.where(
+        last >= 0, frame['injury_id'].to_numpy(object)[previous], None
+    )
+    frame['is_recurrence'] = (last >= 0) & (gap <= window_days)
+
+    result = pd.concat([frame, unknown], ignore_index=True)[['injury_id'] + RECURRENCE_COLUMNS]
+    result['injury_number'] = result['injury_number'].astype('Int64')
+    result['is_recurrence'] = result['is_recurrence'].astype('boolean')
+    METRICS.inc('rows_written_total', len(frame), output='recurrence')
+    logger.info(f"Recurrence features for {len(frame):,} of {len(result):,} injuries "
+                f"({int(frame['is_recurrence'].sum()):,} recurrences within {window_days} days)")
+    return result
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Re-injury history and recurrence flags per injury")
+    parser.add_argument('--injuries', default="mls_player_injuries.csv")
+    parser.add_argument('--window', type=int, default=RECURRENCE_WINDOW_DAYS,
+                        help="Days after returning within which a same-region injury is a recurrence")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    features = recurrence_features(pd.read_csv(args.injuries), args.window)
+    features.to_csv(args.output, index=False)
+
+    known = features.dropna(subset=['injury_number'])
+    recurrences = known[known['is_recurrence'].fillna(False).astype(bool)]
+    print("="*70)
+    print("RE-INJURY AND RECURRENCE SUMMARY")
+    print("="*70)
+    print(f"Injuries: {len(features):,} ({len(known):,} with a player and date)")
+    if len(known):
+        print(f"Players with 2+ injuries: {known.loc[known['injury_number'] == 2, 'injury_id'].count():,}")
+        print(f"Median days since last return: {known['days_since_last_return'].median():.0f}")
+        print(f"Recurrences (same region within {args.window} days of return): "
+              f"{len(recurrences):,} ({len(recurrences) / len(known) * 100:.1f}%)")
+        if len(recurrences):
+            print("\nRecurrences by body region:")
+            print(recurrences['body_region'].value_counts().head(10).to_string())
+    print(f"Saved to {args.output}")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
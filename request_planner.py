@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Dry-run request planner
+Computes the unique Transfermarkt URLs each pipeline stage would fetch, drops
+what checkpoints, stored rosters and the page archive already cover, and
+estimates wall time under the current rate budget. Nothing is fetched.
+"""
+
+import os
+import json
+import argparse
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+import pandas as pd
+
+from date_normalization import calendar_lookup, parse_date, parse_dates, performance_seasons, transfermarkt_season
+from page_archive import PageArchive, archive_from_env, archive_reuse_hours
+from page_parsers import injury_url, league_url, match_log_url, squad_url
+from rate_control import DEFAULT_MAX_RPM, DEFAULT_MIN_DELAY
+
+logger = logging.getLogger(__name__)
+
+STAGES = ['scrape', 'fixtures', 'performance_30day', 'performance_season']
+
+# Used for seasons whose team list / squads are not stored yet
+DEFAULT_TEAMS_PER_SEASON = 29
+DEFAULT_SQUAD_SIZE = 30
+
+# Typical Transfermarkt response time (seconds) when no better figure is given
+DEFAULT_LATENCY = 0.6
+
+
+def _stage_plan(stage: str) -> Dict:
+    return {'stage': stage, 'urls': set(), 'skipped': 0, 'estimated': 0, 'notes': []}
+
+
+def plan_scrape(scraper, seasons: List[str], output_file: str = "mls_player_injuries.csv") -> Dict:
+    """
+    URLs scrape_mls_injuries would fetch for the given seasons
+
+    League and squad pages of stored seasons, done team-seasons and processed
+    players are skipped. Squads that are not stored yet cannot be enumerated;
+    their injury pages are estimated from the average stored squad size, less
+    the players the checkpoint already has for that season.
+
+    Args:
+        scraper: TransfermarktScraper (only its checkpoint/roster state is read)
+        seasons: Seasons to scrape
+        output_file: Injury CSV whose rows count as processed
+    """
+    plan = _stage_plan('scrape')
+    scraper._load_processed_from_csv(output_file)
+    rosters = scraper.rosters
+    stored_squads = [len(r) for r in rosters.rosters.values()]
+    squad_size = round(sum(stored_squads) / len(stored_squads)) if stored_squads else DEFAULT_SQUAD_SIZE
+    stored_teams = [len(t) for t in rosters.teams.values()]
+    teams_per_season = max(stored_teams) if stored_teams else DEFAULT_TEAMS_PER_SEASON
+    processed_per_season = Counter(season for _, season in scraper.processed_players)
+
+    for season in seasons:
+        teams = rosters.get_teams(season)
+        if teams is None:
+            plan['urls'].add(league_url(season))
+            processed = processed_per_season.get(season, 0)
+            player_pages = max(teams_per_season * squad_size - processed, 0)
+            plan['estimated'] += teams_per_season + player_pages
+            plan['skipped'] += processed
+            plan['notes'].append(f"{season}: team list not stored; estimated "
+                                 f"{teams_per_season} teams x {squad_size} players, "
+                                 f"{processed} already processed")
+            continue
+        plan['skipped'] += 1
+        for team in teams:
+            if (season, team['team_id']) in scraper.done_team_seasons:
+                plan['skipped'] += 1 + len(rosters.rosters.get((season, team['team_id']), []))
+                continue
+            players = rosters.get_squad(season, team['team_id'], scraper.registry)
+            if players is None:
+                plan['urls'].add(squad_url(team['url'], season))
+                plan['estimated'] += squad_size
+                continue
+            plan['skipped'] += 1
+            for player in players:
+                if (player['player_id'], season) in scraper.processed_players:
+                    plan['skipped'] += 1
+                else:
+                    plan['urls'].add(injury_url(player['url']))
+    return plan
+
+
+def _injury_rows(registry, injuries_csv: str) -> pd.DataFrame:
+    df = pd.read_csv(injuries_csv)
+    return registry.attach_player_urls(registry.add_id_columns(df))
+
+
+def plan_fixtures(matcher, injuries_csv: str = "mls_player_injuries.csv",
+                  view_csv: str = "mls_injury_enrichment.csv") -> Dict:
+    """
+    URLs match_injuries_to_fixtures would fetch: one schedule per team-season
+
+    Injuries the enrichment view already covers and schedules stored in
+    mls_fixtures.csv need no request.
+    """
+    # enrichment_view imports the scraper, which imports this module
+    from enrichment_view import EnrichmentView, with_injury_ids
+
+    plan = _stage_plan('fixtures')
+    df = with_injury_ids(pd.read_csv(injuries_csv), matcher.registry)
+    stale = EnrichmentView(view_csv).stale(df)
+    plan['skipped'] = int((~stale).sum())
+    df = df[stale.to_numpy()]
+    seasons = calendar_lookup(parse_dates(df['injury_date']))['mls_season'].astype('string')
+    unknown = 0
+    for team, season in zip(df['team'], seasons):
+        team_id = matcher.registry.team_id(team)
+        if not team_id or pd.isna(season):
+            unknown += 1
+        elif matcher.fixture_store.get(team_id, season, team) is None:
+            plan['urls'].add(matcher.fixtures_url(team_id, team, season))
+    plan['skipped'] += len(df) - unknown - len(plan['urls'])
+    if unknown:
+        plan['notes'].append(f"{unknown} rows without a known team ID or date (no request)")
+    return plan
+
+
+def plan_performance_30day(registry, injuries_csv: str = "mls_player_injuries.csv") -> Dict:
+    """URLs collect_30day_performance would fetch: match logs around each injury"""
+    plan = _stage_plan('performance_30day')
+    df = _injury_rows(registry, injuries_csv)
+    lookups = 0
+    for player_url, injury_date in zip(df['player_url'], df['injury_date']):
+        date = parse_date(injury_date) if isinstance(player_url, str) else None
+        if date is None:
+            continue
+        for season in performance_seasons(date):
+            plan['urls'].add(match_log_url(player_url, season))
+            lookups += 1
+    plan['skipped'] = lookups - len(plan['urls'])
+    return plan
+
+
+def plan_performance_season(registry, injuries_csv: str = "mls_player_injuries.csv") -> Dict:
+    """URLs collect_performance_data would fetch: the injury season's match log"""
+    plan = _stage_plan('performance_season')
+    df = _injury_rows(registry, injuries_csv)
+    lookups = 0
+    for player_url, injury_date in zip(df['player_url'], df['injury_date']):
+        date = parse_date(injury_date) if isinstance(player_url, str) else None
+        if date is None:
+            continue
+        plan['urls'].add(match_log_url(player_url, str(transfermarkt_season(date))))
+        lookups += 1
+    plan['skipped'] = lookups - len(plan['urls'])
+    return plan
+
+
+def estimate_seconds(requests: int, initial_delay: float = 3.0, max_rpm: Optional[float] = None,
+                     latency: float = DEFAULT_LATENCY, rate_step: float = 0.01) -> float:
+    """
+    Wall time for a number of requests under the rate controller
+
+    Assumes healthy responses: the delay ramps from initial_delay toward the
+    floor by the controller's additive step, and no request goes faster than
+    its latency or the requests-per-minute ceiling.
+    """
+    if max_rpm is None:
+        max_rpm = float(os.environ.get('TRANSFERMARKT_MAX_RPM', DEFAULT_MAX_RPM))
+    ceiling = 60.0 / max_rpm if max_rpm > 0 else 0.0
+    min_delay = min(initial_delay, DEFAULT_MIN_DELAY)
+    delay, total = initial_delay, 0.0
+    for i in range(requests):
+        if delay <= min_delay:
+            total += (requests - i) * max(delay, latency, ceiling)
+            break
+        total += max(delay, latency, ceiling)
+        delay = max(1.0 / (1.0 / delay + rate_step), min_delay) if delay > 0 else 0.0
+    return total
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 5400:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+def build_plan(stage_plans: List[Dict], archive: Optional[PageArchive] = None,
+               reuse_hours: float = 0.0, initial_delay: float = 3.0,
+               max_rpm: Optional[float] = None, latency: float = DEFAULT_LATENCY) -> Dict:
+    """
+    Combine stage plans into request counts and time estimates
+
+    A URL needed by more than one stage is only fetched once when archive
+    reuse is on (TRANSFERMARKT_ARCHIVE_REUSE_HOURS): later stages are served
+    from the archive. Without reuse each stage fetches it again.
+
+    Returns:
+        {'stages': [per-stage dicts], 'total': dict}
+    """
+    seen: Set[str] = set()
+    rows = []
+    for plan in stage_plans:
+        urls = plan['urls']
+        shared = urls & seen if reuse_hours > 0 else set()
+        archived = set()
+        if archive is not None and reuse_hours > 0:
+            archived = {u for u in urls - shared if archive.fresh_entry(u, reuse_hours)}
+        fetch = len(urls) - len(shared) - len(archived)
+        requests = fetch + plan['estimated']
+        needed = len(urls) + plan['skipped'] + plan['estimated']
+        seen |= urls
+        rows.append({
+            'stage': plan['stage'],
+            'needed': needed,
+            'skipped': plan['skipped'],
+            'shared': len(shared),
+            'archived': len(archived),
+            'requests': requests,
+            'estimated': plan['estimated'],
+            'hit_rate': round(1 - requests / needed, 3) if needed else 1.0,
+            'seconds': round(estimate_seconds(requests, initial_delay, max_rpm, latency)),
+            'notes': plan['notes'],
+        })
+
+    total_requests = sum(r['requests'] for r in rows)
+    total_needed = sum(r['needed'] for r in rows)
+    total = {
+        'stage': 'total',
+        'needed': total_needed,
+        'skipped': sum(r['skipped'] for r in rows),
+        'shared': sum(r['shared'] for r in rows),
+        'archived': sum(r['archived'] for r in rows),
+        'requests': total_requests,
+        'estimated': sum(r['estimated'] for r in rows),
+        'hit_rate': round(1 - total_requests / total_needed, 3) if total_needed else 1.0,
+        'seconds': sum(r['seconds'] for r in rows),
+        'unique_urls': len(seen),
+    }
+    return {'stages': rows, 'total': total}
+
+
+def format_plan(plan: Dict) -> str:
+    header = (f"{'stage':<20} {'needed':>8} {'cached':>8} {'shared':>7} {'archive':>8} "
+              f"{'requests':>9} {'(est.)':>7} {'hit %':>6} {'time':>7}")
+    lines = [header, '-' * len(header)]
+    for r in plan['stages'] + [plan['total']]:
+        if r['stage'] == 'total':
+            lines.append('-' * len(header))
+        lines.append(
+            f"{r['stage']:<20} {r['needed']:>8} {r['skipped']:>8} {r['shared']:>7} {r['archived']:>8} "
+            f"{r['requests']:>9} {r['estimated']:>7} {r['hit_rate'] * 100:>5.1f}% "
+            f"{format_duration(r['seconds']):>7}"
+        )
+    for r in plan['stages']:
+        for note in r['notes']:
+            lines.append(f"  {r['stage']}: {note}")
+    return '\n'.join(lines)
+
+
+def summary_line(plan: Dict) -> str:
+    """One-line request/runtime estimate for a stage banner"""
+    total = plan['total']
+    line = (f"~{format_duration(total['seconds'])} for {total['requests']:,} requests "
+            f"({total['hit_rate'] * 100:.0f}% of {total['needed']:,} pages served locally)")
+    if total['estimated']:
+        line += f"; {total['estimated']:,} of them estimated"
+    return line
+
+
+def plan_stages(stages: List[str], seasons: Optional[List[str]] = None,
+                injuries_csv: str = "mls_player_injuries.csv",
+                checkpoint_file: str = "scraper_checkpoint.json",
+                max_rpm: Optional[float] = None, latency: float = DEFAULT_LATENCY,
+                reuse_hours: Optional[float] = None, initial_delay: float = 3.0) -> Dict:
+    """Plan the given stages (in pipeline order) from local state only"""
+    # Stage modules import this one for their --plan flags
+    from match_injuries_to_fixtures import FixtureMatchingService
+    from mls_ids import IdRegistry
+    from scrape_mls_injuries import TransfermarktScraper
+
+    registry = IdRegistry()
+    plans = []
+    for stage in stages:
+        if stage == 'scrape':
+            scraper = TransfermarktScraper(checkpoint_file=checkpoint_file, registry=registry)
+            plans.append(plan_scrape(scraper, seasons or [], injuries_csv))
+        elif not os.path.exists(injuries_csv):
+            plan = _stage_plan(stage)
+            plan['notes'].append(f"{injuries_csv} not found")
+            plans.append(plan)
+        elif stage == 'fixtures':
+            plans.append(plan_fixtures(FixtureMatchingService(registry=registry), injuries_csv))
+        elif stage == 'performance_30day':
+            plans.append(plan_performance_30day(registry, injuries_csv))
+        else:
+            plans.append(plan_performance_season(registry, injuries_csv))
+
+    if reuse_hours is None:
+        reuse_hours = archive_reuse_hours()
+    return build_plan(plans, archive_from_env(), reuse_hours, initial_delay, max_rpm, latency)
+
+
+def print_plan(stages: List[str], **kwargs) -> Dict:
+    """Plan stages and print the table (used by each stage's --plan flag)"""
+    plan = plan_stages(stages, **kwargs)
+    print(format_plan(plan))
+    return plan
+
+
+def main():
+    """Command line entry point"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Dry-run request planner (no network access)")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--seasons', nargs='+', default=[str(year) for year in range(2015, 2025)])
+    parser.add_argument('--injuries', default="mls_player_injuries.csv")
+    parser.add_argument('--checkpoint', default="scraper_checkpoint.json")
+    parser.add_argument('--max-rpm', type=float, default=None,
+                        help="Requests-per-minute ceiling (default $TRANSFERMARKT_MAX_RPM or 30)")
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY,
+                        help="Assumed seconds per response")
+    parser.add_argument('--reuse-hours', type=float, default=None,
+                        help="Archive reuse window (default $TRANSFERMARKT_ARCHIVE_REUSE_HOURS or 0)")
+    parser.add_argument('--json', action='store_true', help="Print the plan as JSON")
+    args = parser.parse_args()
+
+    plan = plan_stages(args.stages, seasons=args.seasons, injuries_csv=args.injuries,
+                       checkpoint_file=args.checkpoint, max_rpm=args.max_rpm,
+                       latency=args.latency, reuse_hours=args.reuse_hours)
+    if args.json:
+        print(json.dumps(plan, indent=2))
+        return
+
+    print("="*70)
+    print("MLS Injury Pipeline - Request Plan (dry run)")
+    print("="*70)
+    print(format_plan(plan))
+    total = plan['total']
+    print(f"\n{total['unique_urls']:,} unique URLs known; {total['requests']:,} requests "
+          f"(~{format_duration(total['seconds'])}), {total['hit_rate'] * 100:.1f}% served locally")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
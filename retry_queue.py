@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Persistent retry queue and dead-letter store for failed page fetches
+Player pages that could not be fetched are queued (instead of being marked
+processed) and retried with exponential backoff; after max_attempts, or on
+errors retrying cannot fix, they land in the dead-letter ('failed') state
+"""
+
+import os
+import re
+import argparse
+import logging
+from typing import Dict, List, Optional
+
+from mls_ids import IdRegistry, extract_player_id
+from work_queue import FAILED, PENDING, WorkQueue, open_backend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRY_QUEUE = "retry_queue.db"
+
+# Error classes; 'not_found' and 'parse' are not retried
+TRANSIENT_ERRORS = ('throttled', 'forbidden', 'server_error', 'timeout', 'connection', 'error')
+PERMANENT_ERRORS = ('not_found', 'parse')
+
+FAILED_FETCH_PATTERN = re.compile(r'Failed to fetch (?P<url>\S+/verletzungen/spieler/\d+): (?P<error>.*)$')
+SEASON_PATTERN = re.compile(r'Processing season (?P<season>\d{4})')
+TEAM_PATTERN = re.compile(r'Processing team: (?P<team>.+?)\s*$')
+
+
+def classify_error(label: Optional[str]) -> str:
+    """
+    Map a fetch status label (see page_fetcher.status_label) or logged error
+    text to an error class
+    """
+    label = (label or '').lower()
+    # Logged HTTPErrors read '404 Client Error: ...'
+    code = label[:3] if label[:3].isdigit() else ''
+    if code in ('404', '410'):
+        return 'not_found'
+    if code == '429':
+        return 'throttled'
+    if code == '403':
+        # Bot blocking on Transfermarkt; usually clears after a pause
+        return 'forbidden'
+    if code.startswith('5'):
+        return 'server_error'
+    if 'timeout' in label or 'timed out' in label:
+        return 'timeout'
+    if 'connection' in label:
+        return 'connection'
+    if label == 'parse':
+        return 'parse'
+    return 'error'
+
+
+class FetchError(RuntimeError):
+    """A page could not be fetched; carries the error class for retry decisions"""
+
+    def __init__(self, url: str, label: Optional[str]):
+        self.error_class = classify_error(label)
+        self.permanent = self.error_class in PERMANENT_ERRORS
+        super().__init__(f"{self.error_class} ({label}) fetching {url}")
+
+
+class RetryQueue:
+    """Failed player-season fetches on top of a WorkQueue backend"""
+
+    def __init__(self, path: str = DEFAULT_RETRY_QUEUE, max_attempts: int = 5,
+                 retry_delay: float = 300.0):
+        """
+        Args:
+            path: Queue location (any work_queue.open_backend location)
+            max_attempts: Retries before a unit is dead-lettered
+            retry_delay: Base backoff in seconds (doubles on each failure)
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._queue: Optional[WorkQueue] = None
+
+    @property
+    def queue(self) -> WorkQueue:
+        # Opened on first use so runs without failures leave no database behind
+        if self._queue is None:
+            self._queue = WorkQueue(open_backend(self.path), max_attempts=self.max_attempts,
+                                    retry_delay=self.retry_delay)
+        return self._queue
+
+    def record_failure(self, season: str, team: Dict, player: Dict, error: Optional[str]) -> bool:
+        """
+        Queue a player-season whose injury page could not be fetched
+
+        Returns:
+            True if it was newly queued (False if already waiting)
+        """
+        unit = WorkQueue.player_unit(season, team, player)
+        unit['payload']['first_error'] = classify_error(error)
+        added = self.queue.add([unit]) == 1
+        if added:
+            logger.info(f"Queued {player['name']} ({season}) for retry: {classify_error(error)}")
+        return added
+
+    def lease(self, worker_id: str) -> List[Dict]:
+        return self.queue.lease(worker_id)
+
+    def succeeded(self, unit: Dict, worker_id: str) -> bool:
+        return self.queue.complete(unit, worker_id)
+
+    def failed(self, unit: Dict, worker_id: str, error: Optional[str]) -> bool:
+        """Back off (transient errors) or dead-letter (permanent ones) a unit"""
+        error_class = classify_error(error)
+        return self.queue.fail(unit, worker_id, f"{error_class}: {error}",
+                               permanent=error_class in PERMANENT_ERRORS)
+
+    def is_drained(self) -> bool:
+        return self.queue.is_drained()
+
+    def dead_letters(self) -> List[Dict]:
+        return self.queue.backend.units(status=FAILED)
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """Unit counts per status, broken down by (latest) error class"""
+        summary: Dict[str, Dict[str, int]] = {}
+        for unit in self.queue.backend.units():
+            error = unit.get('last_error') or unit['payload'].get('first_error') or 'error'
+            error_class = error.split(':', 1)[0]
+            by_class = summary.setdefault(unit['status'], {})
+            by_class[error_class] = by_class.get(error_class, 0) + 1
+        return summary
+
+
+def seed_from_log(log_path: str, retry_queue: RetryQueue,
+                  registry: Optional[IdRegistry] = None) -> int:
+    """
+    Queue injury pages a past run logged as 'Failed to fetch'
+
+    The season and team come from the preceding 'Processing season' /
+    'Processing team' lines; position is unknown and left as 'Unknown'.
+
+    Returns:
+        Number of player-seasons newly queued
+    """
+    registry = registry or IdRegistry()
+    season, team_name = None, None
+    added = 0
+    with open(log_path, errors='replace') as f:
+        for raw in f:
+            # tqdm redraws share lines with log records; only the last record matters
+            line = raw.rsplit('\r', 1)[-1]
+            match = SEASON_PATTERN.search(line)
+            if match:
+                season = match.group('season')
+                continue
+            match = TEAM_PATTERN.search(line)
+            if match:
+                team_name = match.group('team')
+                continue
+            match = FAILED_FETCH_PATTERN.search(line)
+            if not match or season is None:
+                continue
+            injury_url = match.group('url')
+            player_url = injury_url.replace('/verletzungen/', '/profil/')
+            player_id = extract_player_id(player_url)
+            slug = player_url.split('/')[3]
+            player = {
+                'player_id': player_id,
+                'name': registry.players.get(player_id, {}).get('player_name') or slug.replace('-', ' ').title(),
+                'url': player_url,
+                'position': 'Unknown',
+            }
+            team = {'team_id': registry.team_id(team_name), 'name': team_name, 'url': None}
+            added += retry_queue.record_failure(season, team, player, match.group('error'))
+    logger.info(f"Queued {added} failed fetches from {log_path}")
+    return added
+
+
+def main():
+    """Inspect the retry queue or seed it from old logs"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Retry queue and dead-letter store for failed fetches")
+    parser.add_argument('--queue', default=DEFAULT_RETRY_QUEUE)
+    sub = parser.add_subparsers(dest='command', required=True)
+    seed = sub.add_parser('seed-from-log', help="Queue pages logged as 'Failed to fetch'")
+    seed.add_argument('logs', nargs='+')
+    sub.add_parser('status', help="Counts per status and error class")
+    sub.add_parser('dead', help="List dead-lettered pages")
+    args = parser.parse_args()
+
+    retry_queue = RetryQueue(args.queue)
+    if args.command == 'seed-from-log':
+        for log_path in args.logs:
+            if os.path.exists(log_path):
+                seed_from_log(log_path, retry_queue)
+    if args.command == 'dead':
+        for unit in retry_queue.dead_letters():
+            payload = unit['payload']
+            print(f"{payload['season']}  {payload['player']['name']:<30} {unit['attempts']} attempts  "
+                  f"{unit['last_error']}  {payload['player']['url']}")
+        return
+
+    for status, by_class in sorted(retry_queue.summary().items()):
+        label = 'dead-letter' if status == FAILED else status
+        detail = ', '.join(f"{k}={v}" for k, v in sorted(by_class.items()))
+        print(f"{label:<12} {sum(by_class.values()):>5}  ({detail})")
+    if not retry_queue.summary().get(PENDING):
+        print("Nothing waiting for retry")
+
+
+if __name__ == "__main__":
+    main()
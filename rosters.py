@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Persisted MLS team lists and squad rosters
+Team lists and squad listings of completed seasons do not change, so the
+scraper stores them once and later runs (resumes, supervised restarts,
+sharded seeding) read them from disk instead of re-fetching league and
+squad pages
+"""
+
+import os
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from date_normalization import mls_season
+from mls_ids import IdRegistry
+
+logger = logging.getLogger(__name__)
+
+
+def season_is_complete(season: str, today: Optional[datetime] = None) -> bool:
+    """True once a season's offseason has started (its rosters are final)"""
+    return int(season) < mls_season(today or datetime.now())
+
+
+class RosterStore:
+    """
+    Season team lists and squad rosters keyed by integer IDs
+
+    Player names and URLs are resolved through the IdRegistry, so the roster
+    table itself only holds (season, team_id, player_id, position).
+    """
+
+    TEAM_COLUMNS = ['season', 'team_id', 'team_name', 'team_url']
+    ROSTER_COLUMNS = ['season', 'team_id', 'player_id', 'position']
+
+    def __init__(self, teams_file: str = "mls_season_teams.csv", rosters_file: str = "mls_rosters.csv"):
+        """
+        Args:
+            teams_file: CSV with one row per team and season
+            rosters_file: CSV with one row per squad member and season
+        """
+        self.teams_file = teams_file
+        self.rosters_file = rosters_file
+        self.teams: Dict[str, List[Dict]] = {}
+        self.rosters: Dict[Tuple[str, int], List[Tuple[int, str]]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        """Load stored team lists and rosters if they exist"""
+        if os.path.exists(self.teams_file):
+            try:
+                df = pd.read_csv(self.teams_file, dtype={'season': str})
+                for season, team_id, name, url in df[self.TEAM_COLUMNS].itertuples(index=False):
+                    self.teams.setdefault(season, []).append(
+                        {'team_id': int(team_id), 'name': name, 'url': url}
+                    )
+            except Exception as e:
+                logger.warning(f"Could not load season team table: {e}")
+
+        if os.path.exists(self.rosters_file):
+            try:
+                df = pd.read_csv(self.rosters_file, dtype={'season': str, 'position': str})
+                for season, team_id, player_id, position in df[self.ROSTER_COLUMNS].itertuples(index=False):
+                    self.rosters.setdefault((season, int(team_id)), []).append((int(player_id), position))
+            except Exception as e:
+                logger.warning(f"Could not load roster table: {e}")
+
+    def save(self):
+        """Persist both tables (no-op when nothing changed)"""
+        if not self._dirty:
+            return
+        teams = pd.DataFrame(
+            [(season, t['team_id'], t['name'], t['url']) for season, ts in self.teams.items() for t in ts],
+            columns=self.TEAM_COLUMNS
+        ).sort_values(['season', 'team_id'])
+        rosters = pd.DataFrame(
+            [(season, team_id, player_id, position)
+             for (season, team_id), players in self.rosters.items()
+             for player_id, position in players],
+            columns=self.ROSTER_COLUMNS
+        ).sort_values(['season', 'team_id', 'player_id'])
+        teams.to_csv(self.teams_file, index=False)
+        rosters.to_csv(self.rosters_file, index=False)
+        self._dirty = False
+
+    def get_teams(self, season: str) -> Optional[List[Dict]]:
+        """Stored team list for a season, or None"""
+        return self.teams.get(season)
+
+    def put_teams(self, season: str, teams: List[Dict]):
+        """Store a season's team list (teams without an ID are skipped)"""
+        self.teams[season] = [
+            {'team_id': t['team_id'], 'name': t['name'], 'url': t['url']}
+            for t in teams if t['team_id'] is not None
+        ]
+        self._dirty = True
+
+    def get_squad(self, season: str, team_id: Optional[int], registry: IdRegistry) -> Optional[List[Dict]]:
+        """
+        Stored squad in get_team_players form, or None
+
+        A squad with a player the registry cannot resolve counts as a miss.
+        """
+        roster = self.rosters.get((season, team_id))
+        if not roster:
+            return None
+        players = []
+        for player_id, position in roster:
+            player = registry.players.get(player_id)
+            if player is None:
+                return None
+            players.append({
+                'player_id': player_id,
+                'name': player['player_name'],
+                'url': player['player_url'],
+                'position': position
+            })
+        return players
+
+    def put_squad(self, season: str, team_id: Optional[int], players: List[Dict]):
+        """Store a team-season squad (players without an ID are skipped)"""
+        if team_id is None:
+            return
+        self.rosters[(season, team_id)] = [
+            (p['player_id'], p['position']) for p in players if p['player_id'] is not None
+        ]
+        self._dirty = True
+
+    def merge(self, other: 'RosterStore'):
+        """Fold another store (e.g. a worker shard's) into this one"""
+        for season, teams in other.teams.items():
+            if season not in self.teams:
+                self.teams[season] = teams
+                self._dirty = True
+        for key, players in other.rosters.items():
+            if key not in self.rosters:
+                self.rosters[key] = players
+                self._dirty = True
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Progress reporting for interactive and unattended runs
+On a terminal this is plain tqdm; when output goes to a log file, tqdm redraws
+are replaced by a JSON-lines progress event every few seconds
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+from typing import Dict, Iterable, Optional
+
+from tqdm import tqdm
+
+from pipeline_metrics import METRICS, MetricsRegistry
+
+logger = logging.getLogger('progress')
+
+# 'tqdm', 'json' or 'auto' (json when stderr is not a terminal)
+PROGRESS_MODE_ENV = "PIPELINE_PROGRESS"
+
+# Seconds between progress events (override with PIPELINE_PROGRESS_INTERVAL)
+DEFAULT_INTERVAL = 30.0
+
+# Every progress event log line contains this prefix followed by the JSON body
+EVENT_PREFIX = '{"event": '
+
+
+def json_progress_enabled(stream=None) -> bool:
+    """True when progress should be logged as JSON events instead of tqdm bars"""
+    mode = os.environ.get(PROGRESS_MODE_ENV, 'auto').lower()
+    if mode in ('json', 'tqdm'):
+        return mode == 'json'
+    stream = stream or sys.stderr
+    return not (hasattr(stream, 'isatty') and stream.isatty())
+
+
+def _timing_totals(registry: MetricsRegistry) -> Dict[str, float]:
+    """Cumulative fetch/parse/sleep seconds and request counts from the registry"""
+    requests_count, fetch_seconds = registry.histogram_total('http_request_seconds')
+    _, parse_seconds = registry.histogram_total('parse_seconds')
+    return {
+        'requests': requests_count,
+        'errors': registry.counter_total('http_errors_total'),
+        'rows': registry.counter_total('rows_written_total'),
+        'fetch_s': fetch_seconds,
+        'parse_s': parse_seconds,
+        'sleep_s': registry.counter_total('sleep_seconds_total'),
+    }
+
+
+class ProgressEvents:
+    """
+    Iterator wrapper that logs structured progress events
+
+    Each event carries overall and interval rates, an ETA and a breakdown of
+    the interval's wall time into fetch, parse, sleep and other work, taken
+    from the shared metrics registry.
+    """
+
+    def __init__(self, iterable: Iterable, stage: str, total: Optional[int] = None,
+                 interval: Optional[float] = None, leave: bool = True,
+                 registry: MetricsRegistry = METRICS):
+        """
+        Args:
+            iterable: Items to iterate over
+            stage: Stage name recorded in every event
+            total: Item count (taken from len(iterable) when available)
+            interval: Seconds between events
+            leave: Log a final 'stage_end' event (mirrors tqdm's leave flag;
+                inner loops pass False so only the outer stage reports)
+            registry: Metrics registry used for the timing breakdown
+        """
+        self.iterable = iterable
+        self.stage = stage
+        if total is None and hasattr(iterable, '__len__'):
+            total = len(iterable)
+        self.total = total
+        if interval is None:
+            interval = float(os.environ.get('PIPELINE_PROGRESS_INTERVAL', DEFAULT_INTERVAL))
+        self.interval = interval
+        self.leave = leave
+        self.registry = registry
+        self.done = 0
+
+    def __len__(self):
+        return self.total or 0
+
+    def __iter__(self):
+        start = last_time = time.time()
+        last_done = 0
+        start_totals = last_totals = _timing_totals(self.registry)
+        if self.leave:
+            self._emit('stage_start', start, start, last_done, last_totals)
+
+        for item in self.iterable:
+            yield item
+            self.done += 1
+            now = time.time()
+            if now - last_time >= self.interval:
+                last_totals = self._emit('progress', start, last_time, last_done, last_totals, now)
+                last_time, last_done = now, self.done
+
+        if self.leave:
+            # Final event summarizes the whole stage rather than the last interval
+            self._emit('stage_end', start, start, 0, start_totals)
+
+    def _emit(self, event: str, start: float, since: float, since_done: int,
+              since_totals: Dict[str, float], now: Optional[float] = None) -> Dict[str, float]:
+        now = now or time.time()
+        totals = _timing_totals(self.registry)
+        elapsed = now - start
+        window = now - since
+        delta = {k: totals[k] - since_totals[k] for k in totals}
+
+        record = {
+            'event': event,
+            'ts': round(now, 3),
+            'stage': self.stage,
+            'done': self.done,
+            'total': self.total,
+            'elapsed_s': round(elapsed, 1),
+            'rate': round(self.done / elapsed, 4) if elapsed > 0 else None,
+        }
+        if event != 'stage_start':
+            interval_done = self.done - since_done
+            rate = interval_done / window if window > 0 else None
+            remaining = (self.total - self.done) if self.total is not None else None
+            fetch_work = delta['fetch_s'] + delta['parse_s'] + delta['sleep_s']
+            record.update({
+                'interval_s': round(window, 1),
+                'interval_rate': round(rate, 4) if rate is not None else None,
+                'eta_s': round(remaining / rate, 1) if rate and remaining is not None else None,
+                'requests': int(delta['requests']),
+                'errors': int(delta['errors']),
+                'rows': int(delta['rows']),
+                'mean_latency_s': round(delta['fetch_s'] / delta['requests'], 4) if delta['requests'] else None,
+                'timing': {
+                    'fetch_s': round(delta['fetch_s'], 2),
+                    'parse_s': round(delta['parse_s'], 2),
+                    'sleep_s': round(delta['sleep_s'], 2),
+                    'other_s': round(max(window - fetch_work, 0.0), 2),
+                },
+            })
+        logger.info(json.dumps(record))
+        return totals
+
+
+def progress(iterable: Iterable, desc: str, stage: Optional[str] = None,
+             total: Optional[int] = None, leave: bool = True, **tqdm_kwargs):
+    """
+    Drop-in replacement for tqdm(iterable, desc=...)
+
+    Args:
+        iterable: Items to iterate over
+        desc: Progress bar label
+        stage: Stage name for JSON events (defaults to desc)
+        total: Item count if the iterable has no len()
+        leave: Keep the bar / log a stage_end event when done
+        **tqdm_kwargs: Passed through to tqdm on terminals (e.g. position)
+    """
+    if json_progress_enabled():
+        return ProgressEvents(iterable, stage or desc, total=total, leave=leave)
+    return tqdm(iterable, desc=desc, total=total, leave=leave, **tqdm_kwargs)
+
+
+def parse_events(lines: Iterable[str]):
+    """Yield progress event dicts from log lines (other lines are ignored)"""
+    for line in lines:
+        pos = line.find(EVENT_PREFIX)
+        if pos < 0:
+            continue
+        try:
+            yield json.loads(line[pos:])
+        except ValueError:
+            continue
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Priority scheduling of scrape work units
+Orders team-season and player units (WorkQueue unit dicts) by pluggable
+policies so the most valuable pages are fetched first, and turns a
+--deadline into a stop event so a bounded run ends cleanly.
+"""
+
+import os
+import re
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from date_normalization import mls_season, parse_dates
+from mls_ids import IdRegistry
+from page_archive import PageArchive
+from page_parsers import injury_url, squad_url
+from work_queue import WorkQueue
+
+logger = logging.getLogger(__name__)
+
+# Seasons this far back (or further) share the lowest recency score
+RECENCY_SPAN_SEASONS = 20
+
+# Injuries older than this no longer make a player "recently injured"
+RECENT_INJURY_DAYS = 3 * 365
+
+# Pages fetched this long ago count as fully stale
+STALE_DAYS = 365
+
+DURATION_PATTERN = re.compile(r'^(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m)?(?:(\d+(?:\.\d+)?)s)?$')
+
+
+def recency(unit: Dict, scheduler: 'PriorityScheduler') -> float:
+    """Newest season first (the current MLS season scores 0)"""
+    age = mls_season(scheduler.now) - int(unit['payload']['season'])
+    return min(max(age, 0) / RECENCY_SPAN_SEASONS, 1.0)
+
+
+def recent_injuries(unit: Dict, scheduler: 'PriorityScheduler') -> float:
+    """Players with a recent known injury first, never-injured players last"""
+    if unit['kind'] != WorkQueue.PLAYER:
+        # A squad may hold recently injured players
+        return 0.0
+    last = scheduler.last_injuries.get(unit['payload']['player']['player_id'])
+    if last is None:
+        return 1.0
+    age = (scheduler.now - last).days
+    return min(max(age, 0) / RECENT_INJURY_DAYS, 1.0) * 0.99
+
+
+def freshness(unit: Dict, scheduler: 'PriorityScheduler') -> float:
+    """Pages never fetched first, then the stalest archived ones"""
+    if scheduler.archive is None:
+        return 0.0
+    payload = unit['payload']
+    if unit['kind'] == WorkQueue.PLAYER:
+        url = injury_url(payload['player']['url'])
+    else:
+        url = squad_url(payload['team']['url'], payload['season'])
+    fetched = scheduler.archive.last_fetched(url)
+    if fetched is None:
+        return 0.0
+    age = (datetime.now(timezone.utc) - fetched).days
+    return 1.0 - min(age / STALE_DAYS, 1.0) * 0.99
+
+
+POLICIES: Dict[str, Callable[[Dict, 'PriorityScheduler'], float]] = {
+    'recency': recency,
+    'recent_injuries': recent_injuries,
+    'freshness': freshness,
+}
+DEFAULT_POLICIES = ['recency', 'recent_injuries', 'freshness']
+
+
+def last_injury_dates(injury_csv: str, registry: IdRegistry) -> Dict[int, datetime]:
+    """Latest known injury date per player_id from an injury dataset"""
+    if not os.path.exists(injury_csv):
+        return {}
+    df = registry.add_id_columns(pd.read_csv(injury_csv))
+    if 'player_id' not in df.columns or df.empty:
+        return {}
+    dates = parse_dates(df['injury_date'])
+    latest = dates.groupby(df['player_id']).max().dropna()
+    return {int(player_id): date.to_pydatetime() for player_id, date in latest.items()}
+
+
+class PriorityScheduler:
+    """
+    In-memory priority queue of work units
+
+    Each policy scores a unit between 0 (most urgent) and 1; policies are
+    applied in order, later ones only breaking ties of earlier ones. The
+    combined score is the unit's 'priority' (lower first, as in WorkQueue),
+    so the same ordering carries over to sharded runs.
+    """
+
+    # Score resolution per policy; three policies fit a float's precision
+    LEVELS = 1000
+
+    def __init__(self, policies: Optional[List[str]] = None,
+                 last_injuries: Optional[Dict[int, datetime]] = None,
+                 archive: Optional[PageArchive] = None, now: Optional[datetime] = None):
+        """
+        Args:
+            policies: Policy names from POLICIES, most important first
+            last_injuries: player_id -> latest known injury date
+            archive: Page archive consulted for fetch times
+            now: Reference time for season and injury recency (default: now)
+        """
+        policies = DEFAULT_POLICIES if policies is None else policies
+        unknown = [p for p in policies if p not in POLICIES]
+        if unknown:
+            raise ValueError(f"Unknown scheduling policies: {', '.join(unknown)}")
+        self.policies = [POLICIES[p] for p in policies]
+        self.last_injuries = last_injuries or {}
+        self.archive = archive
+        self.now = now or datetime.now()
+        self._heap = []
+        self._seq = 0
+
+    def priority(self, unit: Dict) -> float:
+        """Combined policy score of a unit (lower is scheduled first)"""
+        priority = 0.0
+        for policy in self.policies:
+            score = min(max(policy(unit, self), 0.0), 1.0)
+            priority = priority * self.LEVELS + round(score * (self.LEVELS - 1))
+        return priority
+
+    def push(self, unit: Dict):
+        """Score a unit and add it to the queue"""
+        unit['priority'] = self.priority(unit)
+        heapq.heappush(self._heap, (unit['priority'], self._seq, unit))
+        self._seq += 1
+
+    def pop(self) -> Optional[Dict]:
+        """Highest-priority unit, or None when empty"""
+        if not self._heap:
+            return None
+        return heapq.heappop(self._heap)[2]
+
+    def __len__(self):
+        return len(self._heap)
+
+    def pending(self, kind: Optional[str] = None) -> int:
+        """Units still queued (optionally of one kind)"""
+        return sum(1 for _, _, unit in self._heap if kind is None or unit['kind'] == kind)
+
+
+def parse_deadline(value: str, now: Optional[datetime] = None) -> float:
+    """
+    Seconds until a deadline
+
+    Accepts a time budget ("90m", "2h", "1h30m", "45s"; a bare number is
+    minutes), a clock time ("06:30", the next occurrence) or an ISO
+    datetime ("2026-10-20T06:30").
+    """
+    now = now or datetime.now()
+    value = value.strip()
+    if re.fullmatch(r'\d+(\.\d+)?', value):
+        return float(value) * 60
+    match = DURATION_PATTERN.match(value)
+    if match and any(match.groups()):
+        hours, minutes, seconds = (float(g) if g else 0.0 for g in match.groups())
+        return hours * 3600 + minutes * 60 + seconds
+    if re.fullmatch(r'\d{1,2}:\d{2}', value):
+        hour, minute = map(int, value.split(':'))
+        target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+        return (target - now).total_seconds()
+    try:
+        return (datetime.fromisoformat(value) - now).total_seconds()
+    except ValueError:
+        raise ValueError(f"Unrecognized deadline: {value!r}")
+
+
+def start_deadline(value: str, stop_event: threading.Event) -> threading.Timer:
+    """Set stop_event when the deadline passes (the run then checkpoints and returns)"""
+    seconds = max(parse_deadline(value), 0.0)
+    timer = threading.Timer(seconds, stop_event.set)
+    timer.daemon = True
+    timer.start()
+    logger.info(f"Deadline in {seconds / 60:.1f} minutes")
+    return timer
@@ -3,14 +3,23 @@
 Update MLS injury data with latest 2025 season data
 """
 
+import argparse
+
 from scrape_mls_injuries import TransfermarktScraper
-import pandas as pd
+from pipeline_metrics import start_monitoring
+from injury_store import InjuryStore
 
 def main():
+    parser = argparse.ArgumentParser(description="Scrape the latest seasons into the injury store")
+    parser.add_argument('--export-flat', action='store_true',
+                        help="Also rewrite mls_player_injuries.csv from the store (full-dataset write)")
+    args = parser.parse_args()
+
     print("="*70)
     print("MLS Injury Data - 2025 Season Update")
     print("="*70)
     
+    status_writer = start_monitoring("scraper_2025_status.json")
     scraper = TransfermarktScraper(delay=3.0)
     
     # Only scrape 2024 and 2025 seasons for latest data
@@ -24,6 +33,7 @@ def main():
         seasons=seasons,
         output_file="mls_injuries_2025_update.csv"
     )
+    status_writer.stop()
     
     if not df_new.empty:
         print("\n" + "="*70)
@@ -32,25 +42,25 @@ def main():
         print(f"✓ New injuries collected: {len(df_new)}")
         print(f"✓ Latest injury date: {df_new['injury_date'].max()}")
         
-        # Merge with existing data
+        # Apply the update to the partitioned store, which rewrites only the
+        # season partitions it touches; the flat CSV is rewritten on request
         print("\nMerging with existing data...")
-        df_old = pd.read_csv("mls_player_injuries.csv")
-        
-        # Combine and remove duplicates
-        df_combined = pd.concat([df_old, df_new])
-        df_combined = df_combined.drop_duplicates(
-            subset=['player_name', 'season', 'injury_date', 'injury_type', 'team']
-        )
-        
-        # Save merged data
-        df_combined.to_csv("mls_player_injuries.csv", index=False)
-        
-        new_records = len(df_combined) - len(df_old)
-        
-        print(f"\n✓ Previous total: {len(df_old):,} injuries")
-        print(f"✓ New total: {len(df_combined):,} injuries")
-        print(f"✓ Added: {new_records:,} new injuries")
-        print(f"✓ Updated file: mls_player_injuries.csv")
+        store = InjuryStore()
+        if store.sync_flat("mls_player_injuries.csv") is not None:
+            print("✓ Injury store synced with rows appended to mls_player_injuries.csv")
+        result = store.upsert(df_new, source="mls_injuries_2025_update.csv")
+        if args.export_flat:
+            store.export("mls_player_injuries.csv")
+
+        print(f"\n✓ Added: {result['inserted']:,} new injuries")
+        print(f"✓ Updated: {result['updated']:,} re-scraped injuries (e.g. team re-attribution)")
+        print(f"✓ Unchanged: {result['unchanged']:,}")
+        print(f"✓ Seasons rewritten: {', '.join(result['partitions']) or 'none'}")
+        if args.export_flat:
+            print(f"✓ Updated file: mls_player_injuries.csv (changes in {store.path}/changes.jsonl)")
+        else:
+            print(f"✓ Updated store: {store.path}/ (changes in {store.path}/changes.jsonl); "
+                  f"pass --export-flat or run 'python3 injury_store.py export' to refresh mls_player_injuries.csv")
         print("="*70)
 
 if __name__ == "__main__":
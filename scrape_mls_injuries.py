@@ -4,18 +4,33 @@ MLS Injury Data Scraper
 Collects historical injury data for MLS players from Transfermarkt
 """
 
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
-import time
 from datetime import datetime
 import csv
-import re
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional, Set, Tuple
 import logging
-from tqdm import tqdm
 import os
 import json
+import time
+import argparse
+import threading
+
+from date_normalization import season_year_from_label
+from mls_ids import IdRegistry, extract_player_id, extract_team_id, processed_keys_from_legacy
+from page_fetcher import PageFetcher
+from page_parsers import (
+    injury_url, league_url, parse_injuries, parse_league_teams, parse_squad_players,
+    parse_transfers, squad_url
+)
+from pipeline_metrics import METRICS, start_monitoring
+from request_planner import build_plan, format_plan, plan_scrape, summary_line
+from retry_queue import DEFAULT_RETRY_QUEUE, RetryQueue, seed_from_log
+from rosters import RosterStore, season_is_complete
+from run_logging import progress
+from scheduler import DEFAULT_POLICIES, POLICIES, PriorityScheduler, last_injury_dates, start_deadline
+from transfer_stints import TransferStintIndex, build_stints, stint_team_at
+from work_queue import WorkQueue
 
 # Set up logging
 logging.basicConfig(
@@ -25,67 +40,211 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Column layout of injury rows written by the scraper. Player URLs and team
+# slugs live in the mls_players.csv / mls_teams.csv dimension tables.
+INJURY_COLUMNS = [
+    'player_id', 'team_id', 'player_name', 'position', 'team', 'season',
+    'injury_type', 'injury_date', 'return_date', 'days_out', 'games_missed',
+    'data_collection_date'
+]
+
+CHECKPOINT_VERSION = 2
+
+
+def read_checkpoint(checkpoint_file: str) -> Set[Tuple[int, str]]:
+    """
+    Read the (player_id, season) pairs recorded in a checkpoint file
+
+    Understands both the current {season: [player_id]} layout and legacy
+    'player_url_season' string lists.
+    """
+    with open(checkpoint_file, 'r') as f:
+        data = json.load(f)
+    if 'processed' in data:
+        processed = data['processed']
+    else:
+        # Legacy checkpoints store 'player_url_season' strings
+        processed = processed_keys_from_legacy(data.get('processed_players', []))
+    return {
+        (int(player_id), season)
+        for season, player_ids in processed.items()
+        for player_id in player_ids
+    }
+
+
+def read_done_team_seasons(checkpoint_file: str) -> Set[Tuple[str, int]]:
+    """Read the (season, team_id) pairs a checkpoint records as fully scraped"""
+    with open(checkpoint_file, 'r') as f:
+        data = json.load(f)
+    return {
+        (season, int(team_id))
+        for season, team_ids in data.get('done_team_seasons', {}).items()
+        for team_id in team_ids
+    }
+
+
+def injury_row(injury: Dict, player_id: Optional[int], player_name: str, position: str,
+               collected: str, team_id: Optional[int]) -> Dict:
+    """Output row (INJURY_COLUMNS) for one parsed injury"""
+    return {
+        'player_id': player_id,
+        'team_id': team_id,
+        'player_name': player_name,
+        'position': position,
+        'team': injury['team'],
+        'season': injury['season'],
+        'injury_type': injury['injury_type'],
+        'injury_date': injury['injury_date'],
+        'return_date': injury['return_date'],
+        'days_out': injury['days_out'],
+        'games_missed': injury['games_missed'],
+        'data_collection_date': collected
+    }
+
+
 class TransfermarktScraper:
     """Scraper for Transfermarkt MLS injury data"""
 
     BASE_URL = "https://www.transfermarkt.us"
     MLS_LEAGUE_URL = f"{BASE_URL}/major-league-soccer/startseite/wettbewerb/MLS1"
 
-    def __init__(self, delay: float = 2.0, checkpoint_file: str = "scraper_checkpoint.json"):
+    def __init__(
+        self,
+        delay: float = 2.0,
+        checkpoint_file: str = "scraper_checkpoint.json",
+        registry: Optional[IdRegistry] = None,
+        max_rpm: Optional[float] = None,
+        retry_queue: Optional[RetryQueue] = None,
+        rosters: Optional[RosterStore] = None,
+        stream=None
+    ):
         """
         Initialize scraper with rate limiting
 
         Args:
-            delay: Seconds to wait between requests (default 2.0)
+            delay: Starting seconds between requests (default 2.0); adapted
+                by the shared rate controller
             checkpoint_file: File to store progress checkpoints
+            registry: Player/team ID dimension tables (default: mls_players.csv / mls_teams.csv)
+            max_rpm: Requests-per-minute ceiling (default $TRANSFERMARKT_MAX_RPM or 30)
+            retry_queue: Where failed injury-page fetches are queued (default retry_queue.db)
+            rosters: Stored team lists/squads of completed seasons (default
+                mls_season_teams.csv / mls_rosters.csv)
+            stream: InjuryStream that new injury rows are also published to,
+                for enrichment stages following the scrape (default: none)
         """
         self.delay = delay
         self.checkpoint_file = checkpoint_file
-        self.processed_players: Set[str] = set()  # Hash set for O(1) lookup
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        })
+        self.registry = registry or IdRegistry()
+        self.processed_players: Set[Tuple[int, str]] = set()  # (player_id, season) for O(1) lookup
+        # Team-seasons whose every squad member is processed; resumes skip them
+        self.done_team_seasons: Set[Tuple[str, int]] = set()
+        self.rosters = rosters or RosterStore()
+        # League and squad listings are kept in memory so a supervised restart
+        # of the scrape loop does not re-fetch them
+        self.teams_cache: Dict[str, List[Dict]] = {}
+        self.squads_cache: Dict[Tuple[str, str], List[Dict]] = {}
+        self.fetcher = PageFetcher(delay=delay, max_rpm=max_rpm)
+        self.session = self.fetcher.session
+        self.retry_queue = retry_queue or RetryQueue(DEFAULT_RETRY_QUEUE)
+        self.stream = stream
         self._load_checkpoint()
 
     def _load_checkpoint(self):
         """Load progress from checkpoint file if it exists"""
         if os.path.exists(self.checkpoint_file):
             try:
-                with open(self.checkpoint_file, 'r') as f:
-                    data = json.load(f)
-                    self.processed_players = set(data.get('processed_players', []))
-                    logger.info(f"Resumed from checkpoint: {len(self.processed_players)} players already processed")
+                self.processed_players = read_checkpoint(self.checkpoint_file)
+                self.done_team_seasons = read_done_team_seasons(self.checkpoint_file)
+                logger.info(f"Resumed from checkpoint: {len(self.processed_players)} players already processed, "
+                            f"{len(self.done_team_seasons)} team-seasons done")
             except Exception as e:
                 logger.warning(f"Could not load checkpoint: {e}")
                 self.processed_players = set()
+                self.done_team_seasons = set()
 
     def _load_processed_from_csv(self, output_file: str):
         """Load already-processed players from existing CSV to prevent duplicates"""
         if os.path.exists(output_file):
             try:
                 df = pd.read_csv(output_file)
-                # Create unique keys from existing data
-                for _, row in df.iterrows():
-                    # Use player_url + season as key (assumes these columns exist)
-                    if 'player_url' in df.columns and 'season' in df.columns:
-                        player_key = f"{row['player_url']}_{row['season']}"
-                        self.processed_players.add(player_key)
+                if 'season' not in df.columns:
+                    return
+                self.registry.register_from_dataset(df)
+                self.registry.add_id_columns(df)
+                keys = df[['player_id', 'season']].dropna().drop_duplicates()
+                self.processed_players.update(
+                    (int(player_id), str(season)) for player_id, season in keys.itertuples(index=False)
+                )
                 logger.info(f"Loaded {len(self.processed_players)} players from existing CSV")
             except Exception as e:
                 logger.warning(f"Could not load from CSV: {e}")
 
     def _save_checkpoint(self):
         """Save current progress to checkpoint file"""
+        processed: Dict[str, List[int]] = {}
+        for player_id, season in self.processed_players:
+            processed.setdefault(season, []).append(player_id)
+        done: Dict[str, List[int]] = {}
+        for season, team_id in self.done_team_seasons:
+            done.setdefault(season, []).append(team_id)
         try:
             with open(self.checkpoint_file, 'w') as f:
                 json.dump({
-                    'processed_players': list(self.processed_players),
+                    'version': CHECKPOINT_VERSION,
+                    'processed': {season: sorted(ids) for season, ids in sorted(processed.items())},
+                    'done_team_seasons': {season: sorted(ids) for season, ids in sorted(done.items())},
                     'last_updated': datetime.now().isoformat()
                 }, f)
+            self.registry.save()
+            self.rosters.save()
         except Exception as e:
             logger.warning(f"Could not save checkpoint: {e}")
 
+    def mark_done_team_seasons(self) -> int:
+        """
+        Mark stored completed-season squads whose players are all processed
+
+        Returns:
+            Number of team-seasons newly marked done
+        """
+        added = 0
+        for (season, team_id), roster in self.rosters.rosters.items():
+            if (season, team_id) in self.done_team_seasons or not season_is_complete(season):
+                continue
+            if roster and all((player_id, season) in self.processed_players for player_id, _ in roster):
+                self.done_team_seasons.add((season, team_id))
+                added += 1
+        return added
+
+    def _append_rows(self, output_file: str, rows: List[Dict]):
+        """
+        Append injury rows to the output CSV
+
+        New files use INJURY_COLUMNS. Files created before the ID layer keep
+        their original header, with player_url resolved from the registry;
+        files exported by injury_store get injury_id filled in. With a
+        stream attached, the rows are published once they are on disk.
+        """
+        METRICS.inc('rows_written_total', len(rows), output=os.path.basename(output_file))
+        df_batch = pd.DataFrame(rows)
+        if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+            with open(output_file, 'r', newline='') as f:
+                header = next(csv.reader(f))
+            if 'player_url' in header:
+                self.registry.attach_player_urls(df_batch)
+            if 'injury_id' in header:
+                # Files exported from the injury store carry stable IDs
+                from injury_store import injury_ids
+                df_batch['injury_id'] = injury_ids(df_batch)
+            df_batch = df_batch.reindex(columns=header)
+            df_batch.to_csv(output_file, mode='a', header=False, index=False)
+        else:
+            df_batch.reindex(columns=INJURY_COLUMNS).to_csv(output_file, index=False)
+        if self.stream is not None:
+            from injury_stream import stream_rows
+            self.stream.publish(stream_rows(rows, self.registry))
+
     def _get_page(self, url: str) -> Optional[BeautifulSoup]:
         """
         Fetch and parse a webpage with rate limiting
@@ -96,14 +255,7 @@ class TransfermarktScraper:
         Returns:
             BeautifulSoup object or None if failed
         """
-        try:
-            time.sleep(self.delay)  # Rate limiting
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
-        except Exception as e:
-            logger.error(f"Failed to fetch {url}: {e}")
-            return None
+        return self.fetcher.get_page(url)
 
     def get_mls_teams(self, season: str = "2024") -> List[Dict[str, str]]:
         """
@@ -115,26 +267,31 @@ class TransfermarktScraper:
         Returns:
             List of team dictionaries with name and URL
         """
-        url = f"{self.MLS_LEAGUE_URL}/plus/?saison_id={season}"
-        soup = self._get_page(url)
+        if season not in self.teams_cache and self.rosters.get_teams(season):
+            self.teams_cache[season] = self.rosters.get_teams(season)
+        METRICS.record_cache('teams', season in self.teams_cache)
+        if season in self.teams_cache:
+            return self.teams_cache[season]
+
+        soup = self._get_page(league_url(season))
 
         if not soup:
             return []
 
-        teams = []
-        # Find team table
-        team_table = soup.find('table', {'class': 'items'})
-        if team_table:
-            for row in team_table.find_all('tr', {'class': ['odd', 'even']}):
-                team_cell = row.find('td', {'class': 'hauptlink'})
-                if team_cell and team_cell.find('a'):
-                    team_link = team_cell.find('a')
-                    teams.append({
-                        'name': team_link.text.strip(),
-                        'url': self.BASE_URL + team_link['href']
-                    })
+        teams = [
+            {
+                'team_id': self.registry.register_team(team['name'], team['url']),
+                'name': team['name'],
+                'url': team['url']
+            }
+            for team in parse_league_teams(soup, self.BASE_URL)
+        ]
 
         logger.info(f"Found {len(teams)} MLS teams for {season}")
+        if teams:
+            self.teams_cache[season] = teams
+            if season_is_complete(season):
+                self.rosters.put_teams(season, teams)
         return teams
 
     def get_team_players(self, team_url: str, season: str = "2024") -> List[Dict[str, str]]:
@@ -148,45 +305,30 @@ class TransfermarktScraper:
         Returns:
             List of player dictionaries
         """
-        # Convert team homepage URL to squad/kader page
-        # Example: /inter-miami-cf/startseite/verein/69012 -> /inter-miami-cf/kader/verein/69012/saison_id/2024
-        squad_url = team_url.replace('/startseite/', '/kader/') + f"/saison_id/{season}/plus/1"
+        team_id = extract_team_id(team_url)
+        if (team_url, season) not in self.squads_cache:
+            stored = self.rosters.get_squad(season, team_id, self.registry)
+            if stored:
+                self.squads_cache[(team_url, season)] = stored
+        METRICS.record_cache('squads', (team_url, season) in self.squads_cache)
+        if (team_url, season) in self.squads_cache:
+            return self.squads_cache[(team_url, season)]
 
-        soup = self._get_page(squad_url)
+        soup = self._get_page(squad_url(team_url, season))
 
         if not soup:
             return []
 
-        players = []
-        # Find player table
-        player_table = soup.find('table', {'class': 'items'})
-        if player_table:
-            for row in player_table.find_all('tr', {'class': ['odd', 'even']}):
-                # Get player name and URL from the positionCell
-                cells = row.find_all('td')
-                if len(cells) > 1:
-                    # Position is typically in the second cell
-                    position_cell = cells[0] if len(cells) > 0 else None
-                    position = ""
-                    if position_cell:
-                        # Position might be in a nested table or div
-                        pos_text = position_cell.get_text(strip=True)
-                        position = pos_text if pos_text else "Unknown"
-
-                    # Player name is in hauptlink cell
-                    name_cell = row.find('td', {'class': 'hauptlink'})
-                    if name_cell:
-                        player_links = name_cell.find_all('a')
-                        for link in player_links:
-                            if '/profil/spieler/' in link.get('href', ''):
-                                players.append({
-                                    'name': link.text.strip(),
-                                    'url': self.BASE_URL + link['href'],
-                                    'position': position
-                                })
-                                break
+        players = [
+            {'player_id': self.registry.register_player(player['url'], player['name']), **player}
+            for player in parse_squad_players(soup, self.BASE_URL)
+        ]
 
         logger.info(f"Found {len(players)} players")
+        if players:
+            self.squads_cache[(team_url, season)] = players
+            if season_is_complete(season):
+                self.rosters.put_squad(season, team_id, players)
         return players
 
     def get_player_transfer_history(self, player_url: str) -> List[Dict]:
@@ -207,54 +349,10 @@ class TransfermarktScraper:
             return []
 
         transfers = []
-
-        # Find the transfer history table
-        transfer_table = soup.find('table', {'class': 'items'})
-        if transfer_table:
-            for row in transfer_table.find_all('tr', {'class': ['odd', 'even']}):
-                cells = row.find_all('td')
-                if len(cells) >= 4:
-                    try:
-                        # Extract date, left club, joined club
-                        date_cell = cells[0]
-                        left_club_cell = cells[1]
-                        joined_club_cell = cells[2]
-
-                        # Get date
-                        date_text = date_cell.get_text(strip=True)
-
-                        # Get club names from image titles or links
-                        left_club = None
-                        joined_club = None
-
-                        # Try to get left club
-                        left_img = left_club_cell.find('img', {'class': 'tiny_wappen'})
-                        if left_img and 'title' in left_img.attrs:
-                            left_club = left_img['title']
-                        else:
-                            left_link = left_club_cell.find('a')
-                            if left_link:
-                                left_club = left_link.get_text(strip=True)
-
-                        # Try to get joined club
-                        joined_img = joined_club_cell.find('img', {'class': 'tiny_wappen'})
-                        if joined_img and 'title' in joined_img.attrs:
-                            joined_club = joined_img['title']
-                        else:
-                            joined_link = joined_club_cell.find('a')
-                            if joined_link:
-                                joined_club = joined_link.get_text(strip=True)
-
-                        if date_text and joined_club:
-                            transfers.append({
-                                'date': date_text,
-                                'from_team': left_club,
-                                'to_team': joined_club
-                            })
-
-                    except Exception as e:
-                        logger.debug(f"Error parsing transfer row: {e}")
-                        continue
+        for transfer in parse_transfers(soup):
+            to_team_href = transfer.pop('to_team_href')
+            transfer['to_team_id'] = self.registry.register_team(transfer['to_team'], to_team_href)
+            transfers.append(transfer)
 
         logger.debug(f"Found {len(transfers)} transfers")
         return transfers
@@ -272,39 +370,37 @@ class TransfermarktScraper:
         """
         # Parse season to get year
         try:
-            if '/' in injury_season:
-                year = injury_season.split('/')[0]
-                if len(year) == 2:
-                    injury_year = int('20' + year) if int(year) < 50 else int('19' + year)
-                else:
-                    injury_year = int(year)
-            else:
+            if '/' not in injury_season:
+                return None
+            injury_year = season_year_from_label(injury_season)
+            if injury_year is None:
                 return None
 
-            # Find the team during that season
-            # Transfers are typically listed with dates like "Jul 1, 2016"
-            current_team = None
-
-            for transfer in transfers:
-                # Parse transfer date
-                date_str = transfer['date']
-                try:
-                    # Try to extract year from various date formats
-                    year_match = re.search(r'(19|20)\d{2}', date_str)
-                    if year_match:
-                        transfer_year = int(year_match.group(0))
-                        if transfer_year <= injury_year:
-                            current_team = transfer['to_team']
-                except:
-                    continue
-
-            return current_team
+            # Latest stint starting on or before the end of the injury year
+            stints = build_stints(0, transfers)
+            return stint_team_at(stints, pd.Timestamp(year=injury_year, month=12, day=31))
 
         except Exception as e:
             logger.debug(f"Error matching injury to team: {e}")
             return None
 
-    def get_player_injuries(self, player_url: str, player_name: str, position: str, team: str) -> List[Dict]:
+    def get_player_stints(self, player_url: str, index: TransferStintIndex) -> pd.DataFrame:
+        """
+        Get a player's team stints, fetching the transfer page only on a cache miss
+
+        Args:
+            player_url: URL of the player page
+            index: On-disk stint cache
+
+        Returns:
+            DataFrame of (player_id, team_id, team_name, start_date, end_date)
+        """
+        player_id = extract_player_id(player_url)
+        if player_id not in index:
+            index.add_player(player_id, self.get_player_transfer_history(player_url))
+        return index.stints_for(player_id)
+
+    def get_player_injuries(self, player_url: str, player_name: str, position: str, team: str) -> Optional[List[Dict]]:
         """
         Get injury history for a specific player with correct team attributions
 
@@ -315,84 +411,50 @@ class TransfermarktScraper:
             team: Player's current team (fallback if team not found in injury table)
 
         Returns:
-            List of injury dictionaries
+            List of injury dictionaries, or None if the injury page could not
+            be fetched (fetcher.last_error says why)
         """
-        # Convert player profile URL to injury page URL
-        injury_url = player_url.replace('/profil/', '/verletzungen/')
-        soup = self._get_page(injury_url)
+        player_id = self.registry.register_player(player_url, player_name)
+
+        soup = self._get_page(injury_url(player_url))
 
         if not soup:
-            return []
+            return None
 
-        injuries = []
-        # Find injury table
-        injury_table = soup.find('table', {'class': 'items'})
-        if injury_table:
-            for row in injury_table.find_all('tr', {'class': ['odd', 'even']}):
-                cells = row.find_all('td')
-                if len(cells) >= 5:
-                    try:
-                        season = cells[0].text.strip()
-                        injury_type = cells[1].text.strip()
-                        date_from = cells[2].text.strip()
-                        date_until = cells[3].text.strip()
-                        days_out = cells[4].text.strip()
-                        games_missed_cell = cells[5] if len(cells) > 5 else None
-
-                        # Extract numeric days
-                        days_match = re.search(r'(\d+)', days_out)
-                        days_numeric = int(days_match.group(1)) if days_match else None
-
-                        # Extract numeric games and team from games_missed cell
-                        games_numeric = None
-                        injury_team = team  # Default to current team
-
-                        if games_missed_cell:
-                            # Get games missed number
-                            games_text = games_missed_cell.text.strip()
-                            games_match = re.search(r'(\d+)', games_text)
-                            games_numeric = int(games_match.group(1)) if games_match else None
-
-                            # Extract team from image in the games_missed cell
-                            team_img = games_missed_cell.find('img')
-                            if team_img and 'title' in team_img.attrs:
-                                injury_team = team_img['title']
-                                logger.debug(f"Found team from injury table: {injury_team}")
-                            else:
-                                # Try to find team link
-                                team_link = games_missed_cell.find('a', href=re.compile(r'/verein/'))
-                                if team_link:
-                                    injury_team = team_link.get('title', team_link.text.strip())
-                                    logger.debug(f"Found team from link: {injury_team}")
-
-                        injuries.append({
-                            'player_name': player_name,
-                            'position': position,
-                            'team': injury_team,
-                            'season': season,
-                            'injury_type': injury_type,
-                            'injury_date': date_from,
-                            'return_date': date_until,
-                            'days_out': days_numeric,
-                            'games_missed': games_numeric,
-                            'player_url': player_url,
-                            'data_collection_date': datetime.now().strftime('%Y-%m-%d')
-                        })
-                    except Exception as e:
-                        logger.warning(f"Error parsing injury row for {player_name}: {e}")
+        collected = datetime.now().strftime('%Y-%m-%d')
+        injuries = [
+            injury_row(injury, player_id, player_name, position, collected,
+                       self.registry.register_team(injury['team'], injury['team_href']))
+            for injury in parse_injuries(soup, team, player_name)
+        ]
 
         if injuries:
-            logger.info(f"Found {len(injuries)} injuries for {player_name}")
+            logger.debug(f"Found {len(injuries)} injuries for {player_name}")
 
         return injuries
 
-    def scrape_mls_injuries(self, seasons: List[str] = None, output_file: str = "mls_player_injuries.csv") -> pd.DataFrame:
+    def scrape_mls_injuries(
+        self,
+        seasons: List[str] = None,
+        output_file: str = "mls_player_injuries.csv",
+        stop_event: Optional[threading.Event] = None,
+        policies: Optional[List[str]] = None
+    ) -> pd.DataFrame:
         """
         Scrape injury data for all MLS players across multiple seasons
 
+        Squad pages and player injury pages are work units run in priority
+        order (see scheduler.py), so a run cut short by a deadline or stop
+        has covered the most valuable players.
+
         Args:
             seasons: List of season years (e.g., ["2020", "2021", "2022"])
             output_file: CSV file to save results
+            stop_event: When set, the loop checkpoints and returns after the
+                current unit (used by scraper_supervisor for graceful shutdown
+                and by --deadline)
+            policies: Scheduling policy names, most important first
+                (default: recency, recent_injuries, freshness)
 
         Returns:
             DataFrame with all injury data
@@ -401,63 +463,99 @@ class TransfermarktScraper:
             # Default to recent seasons
             seasons = ["2019", "2020", "2021", "2022", "2023", "2024"]
 
-        # Check if output file exists and load existing data
-        file_exists = os.path.exists(output_file)
-        write_header = not file_exists
-
         # Load players from CSV to prevent duplicates across runs
         self._load_processed_from_csv(output_file)
 
-        # Progress bar for seasons
-        for season in tqdm(seasons, desc="Seasons", position=0):
-            logger.info(f"Processing season {season}")
-            teams = self.get_mls_teams(season)
-
-            # Progress bar for teams
-            for team in tqdm(teams, desc=f"Teams ({season})", position=1, leave=False):
-                logger.info(f"Processing team: {team['name']}")
+        scheduler = PriorityScheduler(
+            policies, last_injury_dates(output_file, self.registry), self.fetcher.archive
+        )
+        if self.stream is not None:
+            self.stream.open()
+        # Team-seasons are queued up front; expanding one queues its players,
+        # who then compete with every other queued unit on priority
+        for season in progress(seasons, desc="Seasons", stage="scrape_seasons", position=0):
+            if stop_event is not None and stop_event.is_set():
+                break
+            logger.info(f"Queueing season {season}")
+            for team in self.get_mls_teams(season):
+                if (season, team['team_id']) in self.done_team_seasons:
+                    # Every squad member was processed by an earlier run
+                    METRICS.inc('team_seasons_skipped_total')
+                    continue
+                scheduler.push(WorkQueue.team_season_unit(season, team))
+
+        # (season, team url) -> squad, and how many of its player units are still queued
+        squads: Dict[Tuple[str, str], List[Dict]] = {}
+        queued_players: Dict[Tuple[str, str], int] = {}
+        units_done = 0
+
+        for unit in progress(iter(scheduler.pop, None), desc="Work units", stage="scrape_units", position=1):
+            if stop_event is not None and stop_event.is_set():
+                # Put it back so the log reports what is left
+                scheduler.push(unit)
+                logger.info(f"Stop requested - checkpointing with {len(scheduler)} units left "
+                            f"({scheduler.pending(WorkQueue.PLAYER)} players) for the next run")
+                break
+            METRICS.set_progress('scrape', units_done, units_done + len(scheduler) + 1)
+            units_done += 1
+            season = unit['payload']['season']
+            team = unit['payload']['team']
+            team_key = (season, team['url'])
+
+            if unit['kind'] == WorkQueue.TEAM_SEASON:
+                logger.info(f"Processing team: {team['name']} ({season})")
                 players = self.get_team_players(team['url'], season)
-
-                # Progress bar for players
-                for player in tqdm(players, desc=f"{team['name'][:20]}", position=2, leave=False):
-                    # Create unique player key using URL (most reliable identifier)
-                    player_key = f"{player['url']}_{season}"
-
+                squads[team_key] = players
+                queued_players[team_key] = 0
+                for player in players:
                     # Skip if already processed (O(1) lookup with hash set)
-                    if player_key in self.processed_players:
+                    if (player['player_id'], season) in self.processed_players:
                         logger.debug(f"Skipping already processed player: {player['name']}")
+                        METRICS.inc('players_skipped_total')
                         continue
-
-                    injuries = self.get_player_injuries(
-                        player['url'],
-                        player['name'],
-                        player['position'],
-                        team['name']
-                    )
-
+                    scheduler.push(WorkQueue.player_unit(season, team, player))
+                    queued_players[team_key] += 1
+            else:
+                player = unit['payload']['player']
+                injuries = self.get_player_injuries(
+                    player['url'],
+                    player['name'],
+                    player['position'],
+                    team['name']
+                )
+
+                if injuries is None:
+                    # Leave unprocessed; --retry-failed picks it up later
+                    self.retry_queue.record_failure(season, team, player, self.fetcher.last_error)
+                    METRICS.inc('players_failed_total')
+                else:
                     # Mark player as processed
-                    self.processed_players.add(player_key)
+                    self.processed_players.add((player['player_id'], season))
+                    METRICS.inc('players_processed_total')
 
                     # Incremental write to CSV to prevent data loss
                     if injuries:
-                        df_batch = pd.DataFrame(injuries)
-                        df_batch.to_csv(
-                            output_file,
-                            mode='a',
-                            header=write_header,
-                            index=False
-                        )
-                        write_header = False  # Only write header once
+                        self._append_rows(output_file, injuries)
 
                     # Save checkpoint every 10 players
                     if len(self.processed_players) % 10 == 0:
                         self._save_checkpoint()
 
-                # Extra delay between teams to be respectful
-                time.sleep(self.delay)
+                queued_players[team_key] -= 1
+
+            # Rosters of completed seasons are final, so a fully processed
+            # team-season never needs its squad page again
+            players = squads[team_key]
+            if (queued_players[team_key] == 0 and players and team['team_id'] is not None
+                    and season_is_complete(season)
+                    and all((p['player_id'], season) in self.processed_players for p in players)):
+                self.done_team_seasons.add((season, team['team_id']))
 
         # Final checkpoint save
         self._save_checkpoint()
+        if self.stream is not None:
+            # Followers finish what was published and exit; a resumed run reopens it
+            self.stream.close()
 
         # Read final CSV
         if os.path.exists(output_file):
@@ -469,29 +567,170 @@ class TransfermarktScraper:
             print("\n✗ No injury data collected")
             return pd.DataFrame()
 
+    def retry_failed(
+        self,
+        output_file: str = "mls_player_injuries.csv",
+        stop_event: Optional[threading.Event] = None,
+        wait: bool = True
+    ) -> Dict[str, int]:
+        """
+        Drain the retry queue only: refetch injury pages that failed earlier
+
+        Pages that fail again back off exponentially; after max_attempts, or
+        immediately for pages that are gone (404/410), they are dead-lettered.
+
+        Args:
+            output_file: CSV the recovered injury rows are appended to
+            stop_event: When set, checkpoint and return after the current page
+            wait: Sleep until backed-off pages are due instead of returning
+
+        Returns:
+            Counts of 'recovered' and 'failed' pages this run
+        """
+        self._load_processed_from_csv(output_file)
+        worker_id = f"retry-{os.getpid()}"
+        counts = {'recovered': 0, 'failed': 0}
+        while stop_event is None or not stop_event.is_set():
+            units = self.retry_queue.lease(worker_id)
+            if not units:
+                if self.retry_queue.is_drained() or not wait:
+                    break
+                # Everything left is backing off
+                pause = min(self.retry_queue.retry_delay, 30)
+                if stop_event is not None:
+                    stop_event.wait(pause)
+                else:
+                    time.sleep(pause)
+                continue
+
+            unit = units[0]
+            season = unit['payload']['season']
+            team = unit['payload']['team']
+            player = unit['payload']['player']
+            if (player['player_id'], season) in self.processed_players:
+                self.retry_queue.succeeded(unit, worker_id)
+                continue
+
+            injuries = self.get_player_injuries(player['url'], player['name'], player['position'], team['name'])
+            if injuries is None:
+                self.retry_queue.failed(unit, worker_id, self.fetcher.last_error)
+                METRICS.inc('players_failed_total')
+                counts['failed'] += 1
+                continue
+
+            if injuries:
+                self._append_rows(output_file, injuries)
+            self.processed_players.add((player['player_id'], season))
+            self.retry_queue.succeeded(unit, worker_id)
+            METRICS.inc('players_processed_total')
+            counts['recovered'] += 1
+            if counts['recovered'] % 10 == 0:
+                self._save_checkpoint()
+
+        self._save_checkpoint()
+        logger.info(f"Retry pass: {counts['recovered']} recovered, {counts['failed']} failed again")
+        return counts
+
 
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(description="MLS injury data collection")
+    parser.add_argument('--status-file', default="scraper_status.json",
+                        help="Status JSON rewritten every few seconds ('' to disable)")
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help="Serve Prometheus metrics on this localhost port (0 disables)")
+    parser.add_argument('--max-rpm', type=float, default=None,
+                        help="Requests-per-minute ceiling (default $TRANSFERMARKT_MAX_RPM or 30)")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="Only refetch pages waiting in the retry queue")
+    parser.add_argument('--wait', action='store_true',
+                        help="With --retry-failed, sleep until backed-off pages are due "
+                             "(can take over an hour) instead of leaving them for the next run")
+    parser.add_argument('--seed-retries-from-log', nargs='+', metavar='LOG', default=[],
+                        help="Queue pages an older run logged as 'Failed to fetch'")
+    parser.add_argument('--show-dead-letters', action='store_true',
+                        help="List pages that exhausted their retries and exit")
+    parser.add_argument('--plan', action='store_true',
+                        help="Print the pages a run would fetch and its estimated runtime, then exit")
+    parser.add_argument('--seasons', nargs='+', default=[str(year) for year in range(2015, 2025)],
+                        help="Seasons to scrape (default 2015-2024)")
+    parser.add_argument('--policy', nargs='+', choices=list(POLICIES), default=DEFAULT_POLICIES,
+                        help="Scheduling policies, most important first")
+    parser.add_argument('--stream', nargs='?', const="injury_stream", default='',
+                        help="Publish new injury rows to this stream directory so enrichment "
+                             "can follow the scrape (default injury_stream)")
+    parser.add_argument('--deadline', default=None,
+                        help="Stop cleanly after a time budget ('90m', '2h') or at a clock time "
+                             "('06:30'); unfinished units are picked up by the next run")
+    args = parser.parse_args()
+
+    if args.show_dead_letters:
+        dead = RetryQueue(DEFAULT_RETRY_QUEUE).dead_letters()
+        for unit in dead:
+            player = unit['payload']['player']
+            print(f"{unit['payload']['season']}  {player['name']:<30} {unit['last_error']}  {player['url']}")
+        print(f"{len(dead)} dead-lettered pages")
+        return
+
+    status_writer = start_monitoring(args.status_file or None, args.metrics_port)
+
     print("="*70)
     print("MLS Injury Data Collection")
     print("="*70)
 
-    scraper = TransfermarktScraper(delay=3.0)  # 3 second delay to be respectful
+    # Starts at 3 seconds between requests and adapts to how the site responds
+    stream = None
+    if args.stream:
+        from injury_stream import InjuryStream
+        stream = InjuryStream(args.stream)
+    scraper = TransfermarktScraper(delay=3.0, max_rpm=args.max_rpm, stream=stream)
+    max_rpm = scraper.fetcher.controller.max_rpm
+
+    stop_event = threading.Event()
+    if args.deadline:
+        start_deadline(args.deadline, stop_event)
+
+    for log_path in args.seed_retries_from_log:
+        seed_from_log(log_path, scraper.retry_queue, scraper.registry)
+
+    if args.retry_failed or args.seed_retries_from_log:
+        print(f"\nRetrying failed pages from {scraper.retry_queue.path}")
+        counts = scraper.retry_failed(output_file="mls_player_injuries.csv", stop_event=stop_event,
+                                      wait=args.wait)
+        if status_writer:
+            status_writer.stop()
+        print(f"✓ Recovered: {counts['recovered']}")
+        print(f"✗ Failed again: {counts['failed']} "
+              f"({len(scraper.retry_queue.dead_letters())} dead-lettered in total)")
+        if not scraper.retry_queue.is_drained():
+            print("… Pages still backing off; rerun later or pass --wait")
+        print("="*70)
+        return
+
+    # Scrape injuries from 2015-2024 (longest possible span) unless told otherwise
+    seasons = args.seasons
 
-    # Scrape injuries from 2015-2024 (longest possible span)
-    seasons = [str(year) for year in range(2015, 2025)]
+    plan = build_plan([plan_scrape(scraper, seasons, "mls_player_injuries.csv")],
+                      scraper.fetcher.archive, scraper.fetcher.reuse_hours, scraper.delay, max_rpm)
+    if args.plan:
+        print(format_plan(plan))
+        return
 
     print(f"\nCollecting data for seasons: {', '.join(seasons)}")
-    print(f"Estimated runtime: 3-7 hours")
-    print(f"Rate limit: 3 seconds between requests\n")
+    print(f"Estimated runtime: {summary_line(plan)}")
+    print(f"Rate limit: adaptive, starting at 3 seconds between requests, at most {max_rpm:g} per minute\n")
 
     logger.info("Starting MLS injury data collection...")
     logger.info(f"Seasons: {', '.join(seasons)}")
 
     df = scraper.scrape_mls_injuries(
         seasons=seasons,
-        output_file="mls_player_injuries.csv"
+        output_file="mls_player_injuries.csv",
+        stop_event=stop_event,
+        policies=args.policy
     )
+    if status_writer:
+        status_writer.stop()
 
     if not df.empty:
         print("\n" + "="*70)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+In-process supervisor for scraper stages
+Replaces the auto_resume_scraper.sh polling loop: failed workers are restarted
+immediately with backoff, warm state (session, caches, processed-player index)
+survives restarts, and SIGTERM/SIGINT flush checkpoints before exit
+"""
+
+import time
+import signal
+import argparse
+import logging
+import threading
+from typing import Callable, List, Optional
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class ManagedWorker:
+    """A restartable unit of work run on its own thread"""
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[threading.Event], None],
+        flush: Optional[Callable[[], None]] = None
+    ):
+        """
+        Args:
+            name: Label used in logs
+            run: Work function; receives the supervisor's stop event and should
+                return promptly once it is set. Returning normally means the
+                worker is finished; raising means it should be restarted.
+            flush: Called after the worker stops (normally, on failure, or on
+                shutdown) to persist checkpoints and buffered output
+        """
+        self.name = name
+        self.run = run
+        self.flush = flush
+        self.thread: Optional[threading.Thread] = None
+        self.error: Optional[BaseException] = None
+        self.finished = False
+        self.restarts = 0
+        self.started_at = 0.0
+        self.next_start = 0.0
+        self.backoff = 0.0
+
+    def start(self, stop_event: threading.Event):
+        """Launch the worker thread"""
+        self.error = None
+        self.started_at = time.monotonic()
+        self.thread = threading.Thread(target=self._target, args=(stop_event,), name=self.name, daemon=True)
+        self.thread.start()
+
+    def _target(self, stop_event: threading.Event):
+        try:
+            self.run(stop_event)
+        except BaseException as e:
+            self.error = e
+            logger.exception(f"Worker {self.name} crashed: {e}")
+        finally:
+            self.flush_state()
+
+    def flush_state(self):
+        """Run the flush hook, never letting it raise"""
+        if self.flush is None:
+            return
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"Flush failed for {self.name}: {e}")
+
+    def is_alive(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+
+class Supervisor:
+    """Runs managed workers, restarting crashed ones with exponential backoff"""
+
+    def __init__(self, min_backoff: float = 1.0, max_backoff: float = 60.0,
+                 stable_after: float = 300.0, poll_interval: float = 0.5):
+        """
+        Args:
+            min_backoff: Delay before the first restart of a crashed worker
+            max_backoff: Upper bound for the restart delay
+            stable_after: A worker that ran this long before crashing restarts
+                with min_backoff again
+            poll_interval: How often worker threads are checked
+        """
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+        self.workers: List[ManagedWorker] = []
+
+    def add(self, worker: ManagedWorker):
+        self.workers.append(worker)
+
+    def install_signal_handlers(self):
+        """Translate SIGTERM/SIGINT into a graceful stop"""
+        def handle(signum, frame):
+            logger.info(f"Received {signal.Signals(signum).name} - shutting down gracefully")
+            self.stop_event.set()
+
+        signal.signal(signal.SIGTERM, handle)
+        signal.signal(signal.SIGINT, handle)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _schedule_restart(self, worker: ManagedWorker, now: float):
+        ran_for = now - worker.started_at
+        if ran_for >= self.stable_after or worker.backoff == 0:
+            worker.backoff = self.min_backoff
+        else:
+            worker.backoff = min(worker.backoff * 2, self.max_backoff)
+        worker.next_start = now + worker.backoff
+        worker.restarts += 1
+        logger.info(f"Restarting {worker.name} in {worker.backoff:.1f}s (restart #{worker.restarts})")
+
+    def run(self, shutdown_timeout: float = 30.0) -> int:
+        """
+        Supervise until every worker finishes or a stop is requested
+
+        Returns:
+            Number of workers that ended in a failed state
+        """
+        for worker in self.workers:
+            worker.start(self.stop_event)
+
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            active = False
+            for worker in self.workers:
+                if worker.finished:
+                    continue
+                active = True
+                if worker.is_alive():
+                    continue
+                if worker.thread is not None and worker.error is None:
+                    worker.finished = True
+                    logger.info(f"Worker {worker.name} finished")
+                    continue
+                if worker.thread is not None:
+                    # Crashed: mark for restart and clear the handle
+                    worker.thread = None
+                    self._schedule_restart(worker, now)
+                elif now >= worker.next_start:
+                    worker.start(self.stop_event)
+            if not active:
+                break
+            self.stop_event.wait(self.poll_interval)
+
+        for worker in self.workers:
+            if worker.is_alive():
+                worker.thread.join(shutdown_timeout)
+                if worker.is_alive():
+                    logger.warning(f"Worker {worker.name} did not stop within {shutdown_timeout}s")
+                    worker.flush_state()
+
+        return sum(1 for w in self.workers if not w.finished)
+
+
+def scrape_worker(scraper, seasons: List[str], output_file: str,
+                  policies: Optional[List[str]] = None) -> ManagedWorker:
+    """
+    Wrap TransfermarktScraper.scrape_mls_injuries as a managed worker
+
+    The same scraper instance is reused on every restart, so its HTTP
+    session, team/squad caches and processed-player set stay warm.
+    """
+    return ManagedWorker(
+        name='scrape',
+        run=lambda stop: scraper.scrape_mls_injuries(seasons=seasons, output_file=output_file,
+                                                     stop_event=stop, policies=policies),
+        flush=scraper._save_checkpoint
+    )
+
+
+def shard_worker(worker) -> ManagedWorker:
+    """Wrap a sharded_scraper.ShardWorker as a managed worker"""
+    return ManagedWorker(
+        name=worker.worker_id,
+        run=lambda stop: worker.run(stop_event=stop),
+        flush=worker.scraper._save_checkpoint
+    )
+
+
+def main():
+    """Supervise the main scraper (or N sharded workers) until done or signalled"""
+    from scrape_mls_injuries import TransfermarktScraper
+    from scheduler import DEFAULT_POLICIES, POLICIES, start_deadline
+
+    parser = argparse.ArgumentParser(description="Supervised MLS injury scraping")
+    parser.add_argument('--seasons', nargs='+', default=[str(y) for y in range(2015, 2025)])
+    parser.add_argument('--output', default="mls_player_injuries.csv")
+    parser.add_argument('--delay', type=float, default=3.0)
+    parser.add_argument('--queue', help="Run sharded workers against this work queue instead")
+    parser.add_argument('--workers', type=int, default=1, help="Sharded workers to run (with --queue)")
+    parser.add_argument('--max-backoff', type=float, default=60.0)
+    parser.add_argument('--max-rpm', type=float, default=None,
+                        help="Requests-per-minute ceiling shared by all workers")
+    parser.add_argument('--status-file', default="scraper_status.json")
+    parser.add_argument('--metrics-port', type=int, default=0)
+    parser.add_argument('--policy', nargs='+', choices=list(POLICIES), default=DEFAULT_POLICIES,
+                        help="Scheduling policies, most important first")
+    parser.add_argument('--deadline', default=None,
+                        help="Shut down cleanly after a time budget ('90m') or at a clock time ('06:30')")
+    args = parser.parse_args()
+
+    from pipeline_metrics import METRICS, start_monitoring
+    status_writer = start_monitoring(args.status_file or None, args.metrics_port)
+
+    supervisor = Supervisor(max_backoff=args.max_backoff)
+    supervisor.install_signal_handlers()
+    if args.deadline:
+        start_deadline(args.deadline, supervisor.stop_event)
+
+    if args.queue:
+        from sharded_scraper import ShardWorker
+        from work_queue import WorkQueue, open_backend
+
+        queue = WorkQueue(open_backend(args.queue))
+        # Worker threads share one process-wide rate controller, so each gets
+        # the full budget rather than a 1/N slice
+        for i in range(args.workers):
+            supervisor.add(shard_worker(ShardWorker(queue, f"worker-{i}", delay=args.delay,
+                                                    max_rpm=args.max_rpm, policies=args.policy)))
+    else:
+        scraper = TransfermarktScraper(delay=args.delay, max_rpm=args.max_rpm)
+        supervisor.add(scrape_worker(scraper, args.seasons, args.output, args.policy))
+
+    failed = supervisor.run()
+    METRICS.inc('supervisor_restarts_total', sum(w.restarts for w in supervisor.workers))
+    if status_writer:
+        status_writer.stop()
+    logger.info("Supervisor exiting" + (f" with {failed} unfinished workers" if failed else ""))
+
+
+if __name__ == "__main__":
+    main()
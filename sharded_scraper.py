@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Sharded MLS injury scraping over a shared work queue
+Run `seed` once, start any number of `work` processes, then `merge` their shards
+"""
+
+import os
+import glob
+import time
+import socket
+import argparse
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from mls_ids import IdRegistry
+from pipeline_metrics import METRICS, start_monitoring
+from rate_control import DEFAULT_MAX_RPM
+from retry_queue import FetchError
+from rosters import RosterStore
+from scheduler import DEFAULT_POLICIES, POLICIES, PriorityScheduler, last_injury_dates, start_deadline
+from scrape_mls_injuries import TransfermarktScraper, read_checkpoint
+from work_queue import WorkQueue, open_backend
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = "scrape_queue.db"
+DEFAULT_SHARD_DIR = "shards"
+
+
+class ShardWorker:
+    """Pulls units from the queue and writes injuries to its own output shard"""
+
+    def __init__(self, queue: WorkQueue, worker_id: str, shard_dir: str = DEFAULT_SHARD_DIR,
+                 delay: float = 3.0, num_workers: int = 1,
+                 main_checkpoint: str = "scraper_checkpoint.json",
+                 max_rpm: Optional[float] = None, policies: Optional[List[str]] = None,
+                 main_output: str = "mls_player_injuries.csv"):
+        """
+        Initialize a worker
+
+        Args:
+            queue: Shared work queue
+            worker_id: Unique name for this worker (used for leases and shard files)
+            shard_dir: Directory for per-worker output, registry and checkpoint shards
+            delay: Starting politeness delay for the whole fleet; each worker
+                starts at delay * num_workers so the combined rate stays the same
+            num_workers: Number of worker processes sharing the rate budget
+                (workers in one process already share a rate controller, so
+                the supervisor passes 1)
+            main_checkpoint: Checkpoint of the unsharded scraper; players it
+                already covers are not queued again
+            max_rpm: Fleet-wide requests-per-minute ceiling, split evenly
+                across num_workers
+            policies: Scheduling policies used to prioritize the player units
+                this worker queues (see scheduler.py)
+            main_output: Main injury dataset (recent injuries for the
+                recent_injuries policy)
+        """
+        self.queue = queue
+        self.worker_id = worker_id
+        os.makedirs(shard_dir, exist_ok=True)
+        self.output_file = os.path.join(shard_dir, f"injuries-{worker_id}.csv")
+        registry = IdRegistry(
+            players_file=os.path.join(shard_dir, f"players-{worker_id}.csv"),
+            teams_file=os.path.join(shard_dir, f"teams-{worker_id}.csv")
+        )
+        num_workers = max(num_workers, 1)
+        if max_rpm is None:
+            max_rpm = float(os.environ.get('TRANSFERMARKT_MAX_RPM', DEFAULT_MAX_RPM))
+        self.scraper = TransfermarktScraper(
+            delay=delay * num_workers,
+            checkpoint_file=os.path.join(shard_dir, f"checkpoint-{worker_id}.json"),
+            registry=registry,
+            max_rpm=max_rpm / num_workers,
+            rosters=RosterStore(
+                teams_file=os.path.join(shard_dir, f"season-teams-{worker_id}.csv"),
+                rosters_file=os.path.join(shard_dir, f"rosters-{worker_id}.csv")
+            )
+        )
+        self.already_processed = (
+            read_checkpoint(main_checkpoint) if os.path.exists(main_checkpoint) else set()
+        )
+        self.scheduler = PriorityScheduler(
+            policies, last_injury_dates(main_output, registry), self.scraper.fetcher.archive
+        )
+
+    def _process_team_season(self, unit: Dict):
+        """Expand a squad page into player units"""
+        season = unit['payload']['season']
+        team = unit['payload']['team']
+        players = self.scraper.get_team_players(team['url'], season)
+        if not players:
+            raise RuntimeError(f"No squad listing for {team['name']} {season}")
+        units = [
+            WorkQueue.player_unit(season, team, player)
+            for player in players
+            if player['player_id'] is not None
+            and (player['player_id'], season) not in self.already_processed
+        ]
+        for player_unit in units:
+            player_unit['priority'] = self.scheduler.priority(player_unit)
+        added = self.queue.add(units)
+        logger.info(f"[{self.worker_id}] {team['name']} {season}: queued {added} players")
+
+    def _process_player(self, unit: Dict):
+        """Fetch one player's injuries and append them to this worker's shard"""
+        season = unit['payload']['season']
+        team = unit['payload']['team']
+        player = unit['payload']['player']
+        injuries = self.scraper.get_player_injuries(
+            player['url'], player['name'], player['position'], team['name']
+        )
+        if injuries is None:
+            raise FetchError(player['url'], self.scraper.fetcher.last_error)
+        if injuries:
+            self.scraper._append_rows(self.output_file, injuries)
+        self.scraper.processed_players.add((player['player_id'], season))
+
+    def report_queue_depth(self):
+        """Publish queue counts as gauges and overall progress"""
+        counts = self.queue.counts()
+        for status in ('pending', 'leased', 'done', 'failed'):
+            METRICS.set_gauge('queue_depth', counts.get(status, 0), status=status)
+        METRICS.set_progress('queue', counts.get('done', 0), sum(counts.values()))
+
+    def run(self, max_units: int = None, stop_event: Optional[threading.Event] = None) -> int:
+        """
+        Process units until the queue is drained (or max_units is reached)
+
+        Args:
+            max_units: Stop after completing this many units
+            stop_event: When set, return after the current unit; its lease
+                simply expires if it was not completed
+
+        Returns:
+            Number of units completed by this worker
+        """
+        completed = 0
+        while max_units is None or completed < max_units:
+            if stop_event is not None and stop_event.is_set():
+                break
+            units = self.queue.lease(self.worker_id)
+            if not units:
+                if self.queue.is_drained():
+                    break
+                # Everything left is leased by other workers or backing off
+                self.scraper._save_checkpoint()
+                if stop_event is not None:
+                    stop_event.wait(min(self.queue.retry_delay, 10))
+                else:
+                    time.sleep(min(self.queue.retry_delay, 10))
+                continue
+
+            unit = units[0]
+            try:
+                if unit['kind'] == WorkQueue.TEAM_SEASON:
+                    self._process_team_season(unit)
+                else:
+                    self._process_player(unit)
+            except Exception as e:
+                logger.warning(f"[{self.worker_id}] {unit['unit_id']} failed: {e}")
+                METRICS.inc('units_failed_total', kind=unit['kind'])
+                # Pages that are gone go straight to the dead-letter state
+                self.queue.fail(unit, self.worker_id, str(e), permanent=getattr(e, 'permanent', False))
+                continue
+
+            if self.queue.complete(unit, self.worker_id):
+                completed += 1
+                METRICS.inc('units_completed_total', kind=unit['kind'])
+            if completed % 10 == 0:
+                self.scraper._save_checkpoint()
+                self.report_queue_depth()
+
+        self.scraper._save_checkpoint()
+        logger.info(f"[{self.worker_id}] Finished: {completed} units")
+        return completed
+
+
+def seed_queue(queue: WorkQueue, seasons: List[str], delay: float = 3.0,
+               policies: Optional[List[str]] = None) -> int:
+    """
+    Queue one team-season unit per MLS team and season
+
+    Player units are added by the workers as squads are expanded; workers
+    skip (player, season) pairs already in the main checkpoint, and
+    team-seasons the checkpoint marks done are not queued at all. Units are
+    prioritized by the scheduling policies (newest season first by default).
+    """
+    scraper = TransfermarktScraper(delay=delay)
+    scheduler = PriorityScheduler(policies, archive=scraper.fetcher.archive)
+    units = []
+    for season in seasons:
+        for team in scraper.get_mls_teams(season):
+            if team['team_id'] is not None and (season, team['team_id']) not in scraper.done_team_seasons:
+                unit = WorkQueue.team_season_unit(season, team)
+                unit['priority'] = scheduler.priority(unit)
+                units.append(unit)
+    scraper.registry.save()
+    scraper.rosters.save()
+    added = queue.add(units)
+    logger.info(f"Seeded {added} team-season units")
+    return added
+
+
+def _merge_keys(rows: pd.DataFrame) -> pd.MultiIndex:
+    """
+    (player, season, date, injury type) keys compared as text
+
+    player_id is read as float when the column holds a NaN, so it is made
+    an integer first ('123.0' would otherwise never match '123')
+    """
+    keys = rows[['player_id', 'season', 'injury_date', 'injury_type']].copy()
+    keys['player_id'] = pd.to_numeric(keys['player_id'], errors='coerce').astype('Int64')
+    return pd.MultiIndex.from_frame(keys.astype(str))
+
+
+def merge_shards(shard_dir: str = DEFAULT_SHARD_DIR, output_file: str = "mls_player_injuries.csv",
+                 checkpoint_file: str = "scraper_checkpoint.json") -> pd.DataFrame:
+    """
+    Merge worker shards into the main dataset, registry and checkpoint
+
+    Rows already present in output_file (same player, season, date and
+    injury type) are not duplicated.
+    """
+    main = TransfermarktScraper(delay=0, checkpoint_file=checkpoint_file)
+
+    for players_file in sorted(glob.glob(os.path.join(shard_dir, "players-*.csv"))):
+        worker_id = os.path.basename(players_file)[len("players-"):-len(".csv")]
+        main.registry.merge(IdRegistry(
+            players_file=players_file,
+            teams_file=os.path.join(shard_dir, f"teams-{worker_id}.csv")
+        ))
+
+    for checkpoint in sorted(glob.glob(os.path.join(shard_dir, "checkpoint-*.json"))):
+        main.processed_players.update(read_checkpoint(checkpoint))
+
+    for rosters_file in sorted(glob.glob(os.path.join(shard_dir, "rosters-*.csv"))):
+        worker_id = os.path.basename(rosters_file)[len("rosters-"):-len(".csv")]
+        main.rosters.merge(RosterStore(
+            teams_file=os.path.join(shard_dir, f"season-teams-{worker_id}.csv"),
+            rosters_file=rosters_file
+        ))
+    main.mark_done_team_seasons()
+
+    shard_files = sorted(glob.glob(os.path.join(shard_dir, "injuries-*.csv")))
+    frames = [pd.read_csv(f) for f in shard_files if os.path.getsize(f) > 0]
+    if not frames:
+        main._save_checkpoint()
+        logger.info("No shard rows to merge")
+        return pd.DataFrame()
+    new_rows = pd.concat(frames, ignore_index=True)
+
+    new_keys = _merge_keys(new_rows)
+    keep = ~new_keys.duplicated()
+    if os.path.exists(output_file):
+        existing = main.registry.add_id_columns(pd.read_csv(output_file))
+        keep &= ~new_keys.isin(_merge_keys(existing))
+    new_rows = new_rows[keep]
+
+    if not new_rows.empty:
+        main._append_rows(output_file, new_rows.to_dict('records'))
+    main._save_checkpoint()
+    logger.info(f"Merged {len(new_rows)} new rows from {len(shard_files)} shards into {output_file}")
+    return new_rows
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Sharded MLS injury scraping")
+    parser.add_argument('--queue', default=DEFAULT_QUEUE,
+                        help="Queue location (sqlite path, .json path, sqlite:/// or file:/// URL)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    seed = sub.add_parser('seed', help="Queue team-season units")
+    seed.add_argument('--seasons', nargs='+', default=[str(y) for y in range(2015, 2025)])
+    seed.add_argument('--delay', type=float, default=3.0)
+    seed.add_argument('--policy', nargs='+', choices=list(POLICIES), default=DEFAULT_POLICIES)
+
+    work = sub.add_parser('work', help="Run one worker")
+    work.add_argument('--worker-id', default=f"{socket.gethostname()}-{os.getpid()}")
+    work.add_argument('--workers', type=int, default=1, help="Workers sharing the rate budget")
+    work.add_argument('--delay', type=float, default=3.0, help="Fleet-wide starting seconds between requests")
+    work.add_argument('--max-rpm', type=float, default=None, help="Fleet-wide requests-per-minute ceiling")
+    work.add_argument('--shard-dir', default=DEFAULT_SHARD_DIR)
+    work.add_argument('--policy', nargs='+', choices=list(POLICIES), default=DEFAULT_POLICIES)
+    work.add_argument('--deadline', default=None,
+                      help="Stop cleanly after a time budget ('90m') or at a clock time ('06:30'); "
+                           "remaining units stay queued")
+
+    merge = sub.add_parser('merge', help="Merge worker shards into the main dataset")
+    merge.add_argument('--shard-dir', default=DEFAULT_SHARD_DIR)
+    merge.add_argument('--output', default="mls_player_injuries.csv")
+
+    sub.add_parser('status', help="Show queue counts")
+
+    parser.add_argument('--status-file', default='', help="Status JSON path for this process")
+    parser.add_argument('--metrics-port', type=int, default=0)
+    args = parser.parse_args()
+    start_monitoring(args.status_file or None, args.metrics_port)
+    queue = WorkQueue(open_backend(args.queue))
+
+    if args.command == 'seed':
+        seed_queue(queue, args.seasons, delay=args.delay, policies=args.policy)
+    elif args.command == 'work':
+        stop_event = threading.Event()
+        if args.deadline:
+            start_deadline(args.deadline, stop_event)
+        ShardWorker(queue, args.worker_id, args.shard_dir, args.delay, args.workers,
+                    max_rpm=args.max_rpm, policies=args.policy).run(stop_event=stop_event)
+    elif args.command == 'merge':
+        merge_shards(args.shard_dir, args.output)
+    print(queue.counts())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Stadium geo registry and travel-load features
+Stadium coordinates and time zones (mls_stadium_geo.csv) are combined with
+the per-year team stadiums of mls_stadiums.csv into precomputed team x team
+distance and time-zone-shift matrices for every year. Per-injury travel
+features are then read out of those matrices with array indexing over the
+stored fixture table.
+"""
+
+import argparse
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from congestion_features import last_match_index, load_schedules, window_sums
+from date_normalization import parse_dates
+from enrichment_view import DEFAULT_FIXTURES, with_injury_ids
+from mls_ids import IdRegistry
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_GEO = "mls_stadium_geo.csv"
+DEFAULT_OUTPUT = "mls_injury_travel.csv"
+
+EARTH_RADIUS_KM = 6371.0
+
+# The matched fixture is at most this many days before the injury (as in
+# FixtureMatchingService.find_match_for_injury)
+MATCH_WINDOW_DAYS = 7
+
+# Trailing window for cumulative travel
+TRAVEL_WINDOW_DAYS = 14
+
+TRAVEL_COLUMNS = ['last_match_travel_km', 'last_match_tz_crossed', f'travel_km_prior_{TRAVEL_WINDOW_DAYS}d']
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in km (array arguments broadcast)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def utc_offset_hours(timezone: str, year: int) -> float:
+    """Summer-time UTC offset of a zone in a year (MLS plays Feb-Dec; all venues observe DST)"""
+    offset = datetime(year, 7, 1, 12, tzinfo=ZoneInfo(timezone)).utcoffset()
+    return offset.total_seconds() / 3600
+
+
+class StadiumGeo:
+    """
+    Per-year team-to-team distance and time-zone-shift matrices
+
+    Teams are indexed by the display names used in mls_stadiums.csv (and
+    in fixtures). For year y, distance_km[y - first_year, a, b] is the
+    distance from team a's stadium to team b's; tz_shift is b's UTC offset
+    minus a's (positive = travelling east). Pairs with a stadium missing
+    coordinates, or a team without a stadium that year, are NaN.
+    """
+
+    def __init__(self, stadiums_csv: str = "mls_stadiums.csv", geo_csv: str = DEFAULT_GEO):
+        stadiums = pd.read_csv(stadiums_csv)
+        geo = pd.read_csv(geo_csv).drop_duplicates('stadium_name').set_index('stadium_name')
+        missing = sorted(set(stadiums['stadium_name']) - set(geo.index))
+        if missing:
+            logger.warning(f"No coordinates for stadiums: {', '.join(missing)}")
+
+        self.teams: List[str] = sorted(stadiums['team'].unique())
+        self.team_index: Dict[str, int] = {team: i for i, team in enumerate(self.teams)}
+        self.first_year = int(stadiums['start_year'].min())
+        self.last_year = int(stadiums['end_year'].max())
+        years = np.arange(self.first_year, self.last_year + 1)
+
+        # Stadium-level geometry: one row per stadium with coordinates
+        names = [n for n in geo.index if n in set(stadiums['stadium_name'])]
+        stadium_index = {name: i for i, name in enumerate(names)}
+        lat = geo.loc[names, 'latitude'].to_numpy(float)
+        lon = geo.loc[names, 'longitude'].to_numpy(float)
+        stadium_km = haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+        offsets = np.array([[utc_offset_hours(tz, int(y)) for tz in geo.loc[names, 'timezone']]
+                            for y in years]).reshape(len(years), len(names))
+
+        # Team -> stadium per year (first listed row wins, as in stadium_attributes)
+        home = np.full((len(years), len(self.teams)), -1)
+        for row in stadiums[::-1].itertuples(index=False):
+            s = stadium_index.get(row.stadium_name, -1)
+            span = slice(int(row.start_year) - self.first_year, int(row.end_year) - self.first_year + 1)
+            home[span, self.team_index[row.team]] = s
+        self.home_stadium = home
+
+        # Expand to team x team per year by indexing the stadium matrices
+        valid = home >= 0
+        idx = np.maximum(home, 0)
+        pair_valid = valid[:, :, None] & valid[:, None, :]
+        self.distance_km = np.where(pair_valid, stadium_km[idx[:, :, None], idx[:, None, :]], np.nan)
+        year_rows = np.arange(len(years))[:, None]
+        team_offsets = np.where(valid, offsets[year_rows, idx], np.nan)
+        self.tz_shift = team_offsets[:, None, :] - team_offsets[:, :, None]
+
+    def indices(self, teams: pd.Series) -> np.ndarray:
+        """Team index per name (-1 for teams without a stadium entry)"""
+        return teams.map(self.team_index).fillna(-1).to_numpy('int64')
+
+    def lookup(self, years: np.ndarray, from_teams: np.ndarray, to_teams: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Distance and time-zone shift for many (year, from, to) triples
+
+        Args:
+            years: Calendar years
+            from_teams: Team indices (-1 unknown)
+            to_teams: Team indices (-1 unknown)
+
+        Returns:
+            'distance_km' and 'tz_shift' arrays (NaN where unknown)
+        """
+        years = np.asarray(years, dtype='int64')
+        from_teams = np.asarray(from_teams, dtype='int64')
+        to_teams = np.asarray(to_teams, dtype='int64')
+        y = years - self.first_year
+        ok = (y >= 0) & (y < self.distance_km.shape[0]) & (from_teams >= 0) & (to_teams >= 0)
+        y, a, b = np.where(ok, y, 0), np.where(ok, from_teams, 0), np.where(ok, to_teams, 0)
+        return {
+            'distance_km': np.where(ok, self.distance_km[y, a, b], np.nan),
+            'tz_shift': np.where(ok, self.tz_shift[y, a, b], np.nan),
+        }
+
+    def matrix(self, year: int, values: str = 'distance_km') -> pd.DataFrame:
+        """One year's team x team matrix as a table"""
+        data = getattr(self, values)[year - self.first_year]
+        return pd.DataFrame(data, index=self.teams, columns=self.teams)
+
+
+def match_travel(schedules: pd.DataFrame, geo: StadiumGeo) -> pd.DataFrame:
+    """
+    One-way travel per stored match: home stadium to venue (0 at home)
+
+    Returns:
+        travel_km and tz_shift aligned with schedules (NaN for venues
+        without a stadium entry, e.g. cup opponents)
+    """
+    years = (pd.Timestamp('1970-01-01') + pd.to_timedelta(schedules['day'], unit='D')).dt.year
+    looked_up = geo.lookup(years.to_numpy(), geo.indices(schedules['team']),
+                           geo.indices(schedules['venue_team']))
+    away = schedules['is_away'].to_numpy(bool)
+    return pd.DataFrame({
+        'travel_km': np.where(away, looked_up['distance_km'], 0.0),
+        'tz_shift': np.where(away, looked_up['tz_shift'], 0.0),
+    }, index=schedules.index)
+
+
+def injury_travel(injuries: pd.DataFrame, schedules: pd.DataFrame, geo: StadiumGeo,
+                  registry: Optional[IdRegistry] = None) -> pd.DataFrame:
+    """
+    Travel-load features for every injury at once
+
+    last_match_* describe the match within 7 days before the injury (the
+    one fixture matching links to): one-way km from the team's stadium and
+    time zones crossed, 0 for home games. travel_km_prior_14d sums one-way
+    km of the team's away matches in the 14 days up to the injury;
+    venues without coordinates count as 0 there. Injuries whose team has no
+    stored schedule get blanks.
+
+    Returns:
+        injury_id plus TRAVEL_COLUMNS, one row per injury
+    """
+    registry = registry or IdRegistry()
+    injuries = with_injury_ids(registry.add_id_columns(injuries.copy()), registry)
+    dates = parse_dates(injuries['injury_date']).dt.normalize()
+    team_ids = pd.to_numeric(injuries['team_id'], errors='coerce')
+    known = (dates.notna() & team_ids.notna()
+             & team_ids.isin(schedules['team_id'].unique())).to_numpy()
+
+    result = pd.DataFrame({'injury_id': injuries['injury_id']})
+    for column in TRAVEL_COLUMNS:
+        result[column] = np.nan
+    if known.any() and len(schedules):
+        travel = match_travel(schedules, geo)
+        q_teams = team_ids[known].to_numpy('int64')
+        q_days = (dates[known] - pd.Timestamp('1970-01-01')).dt.days.to_numpy('int64')
+
+        last = last_match_index(schedules, q_teams, q_days)
+        match_days = schedules['day'].to_numpy('int64')
+        recent = (last >= 0) & (q_days - match_days[np.maximum(last, 0)] <= MATCH_WINDOW_DAYS)
+        row = np.maximum(last, 0)
+        result.loc[known, 'last_match_travel_km'] = np.where(recent, travel['travel_km'].to_numpy()[row], np.nan)
+        result.loc[known, 'last_match_tz_crossed'] = np.where(
+            recent, np.abs(travel['tz_shift'].to_numpy()[row]), np.nan
+        )
+        result.loc[known, f'travel_km_prior_{TRAVEL_WINDOW_DAYS}d'] = window_sums(
+            schedules, np.nan_to_num(travel['travel_km'].to_numpy()), q_teams, q_days, TRAVEL_WINDOW_DAYS
+        )
+    result['last_match_travel_km'] = result['last_match_travel_km'].round(0)
+    result[f'travel_km_prior_{TRAVEL_WINDOW_DAYS}d'] = result[f'travel_km_prior_{TRAVEL_WINDOW_DAYS}d'].round(0)
+    logger.info(f"Travel features for {int(known.sum()):,} of {len(result):,} injuries")
+    return result
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Stadium distance matrices and per-injury travel load")
+    parser.add_argument('--injuries', default="mls_player_injuries.csv")
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES)
+    parser.add_argument('--stadiums', default="mls_stadiums.csv")
+    parser.add_argument('--geo', default=DEFAULT_GEO)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--matrix', type=int, default=None, metavar='YEAR',
+                        help="Print the team distance matrix (km) for a year and exit")
+    args = parser.parse_args()
+
+    geo = StadiumGeo(args.stadiums, args.geo)
+    if args.matrix is not None:
+        with pd.option_context('display.width', 250, 'display.max_columns', None):
+            print(geo.matrix(args.matrix).round(0))
+        return
+
+    schedules = load_schedules(args.fixtures)
+    if schedules.empty:
+        logger.error(f"No stored fixtures in {args.fixtures}; run match_injuries_to_fixtures.py first")
+        return
+    features = injury_travel(pd.read_csv(args.injuries), schedules, geo)
+    features.to_csv(args.output, index=False)
+
+    covered = features.dropna(subset=[f'travel_km_prior_{TRAVEL_WINDOW_DAYS}d'])
+    away = covered[covered['last_match_travel_km'] > 0]
+    print("="*70)
+    print("TRAVEL LOAD SUMMARY")
+    print("="*70)
+    print(f"Injuries: {len(features):,} ({len(covered):,} with a stored schedule)")
+    if len(covered):
+        print(f"After an away match: {len(away):,} (median {away['last_match_travel_km'].median():,.0f} km)")
+        print(f"Mean km travelled in prior {TRAVEL_WINDOW_DAYS} days: "
+              f"{covered[f'travel_km_prior_{TRAVEL_WINDOW_DAYS}d'].mean():,.0f}")
+        print(f"Crossed 2+ time zones for the last match: {(covered['last_match_tz_crossed'] >= 2).sum():,}")
+    print(f"Saved to {args.output}")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Transfer-history interval index
+Builds per-player team stints from transfer dates once, caches them on disk,
+and attributes injuries to teams with a vectorized as-of lookup
+"""
+
+import os
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from date_normalization import parse_dates
+from mls_ids import extract_player_id
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+STINT_COLUMNS = ['player_id', 'team_id', 'team_name', 'start_date', 'end_date']
+
+
+def _typed(stints: pd.DataFrame) -> pd.DataFrame:
+    """
+    Coerce a stint table to its canonical dtypes
+
+    Dates are pinned to datetime64[ns], the unit parse_dates returns, so
+    merge_asof keys agree however the table was built (read_csv infers
+    other units on newer pandas)
+    """
+    return stints.astype({'player_id': 'int64', 'team_id': 'Int64'}).assign(
+        start_date=lambda d: pd.to_datetime(d['start_date']).astype('datetime64[ns]'),
+        end_date=lambda d: pd.to_datetime(d['end_date']).astype('datetime64[ns]')
+    )
+
+
+def build_stints(player_id: int, transfers: List[Dict]) -> pd.DataFrame:
+    """
+    Turn a transfer history into contiguous team stints
+
+    Each transfer opens a stint at the joining club that lasts until the day
+    before the next transfer; the most recent stint is open-ended.
+
+    Args:
+        player_id: Transfermarkt spieler ID
+        transfers: Records from TransfermarktScraper.get_player_transfer_history
+
+    Returns:
+        DataFrame with STINT_COLUMNS sorted by start_date
+    """
+    if not transfers:
+        return pd.DataFrame(columns=STINT_COLUMNS)
+
+    df = pd.DataFrame(transfers)
+    stints = pd.DataFrame({
+        'player_id': player_id,
+        'team_id': pd.array(df.get('to_team_id', pd.Series([None] * len(df))), dtype='Int64'),
+        'team_name': df['to_team'],
+        'start_date': parse_dates(df['date']),
+    })
+    stints = stints.dropna(subset=['start_date']).sort_values('start_date', kind='stable')
+    stints['end_date'] = stints['start_date'].shift(-1) - pd.Timedelta(days=1)
+    return stints[STINT_COLUMNS].reset_index(drop=True)
+
+
+def stint_team_at(stints: pd.DataFrame, when: datetime) -> Optional[str]:
+    """Team name of the stint covering a date, or None"""
+    if stints.empty:
+        return None
+    pos = stints['start_date'].searchsorted(pd.Timestamp(when), side='right') - 1
+    if pos < 0:
+        return None
+    return stints['team_name'].iloc[pos]
+
+
+class TransferStintIndex:
+    """On-disk cache of (player_id, team_id, start_date, end_date) stints"""
+
+    def __init__(self, cache_file: str = "transfer_stints.csv"):
+        """
+        Initialize index and load cached stints
+
+        Args:
+            cache_file: CSV holding every player's stints. Players whose
+                transfer page had no usable rows are stored as a row with
+                an empty start_date so they are not fetched again.
+        """
+        self.cache_file = cache_file
+        self._frames: List[pd.DataFrame] = []
+        self.players: set = set()
+        self.stints = _typed(pd.DataFrame(columns=STINT_COLUMNS))
+        self._load()
+
+    def _load(self):
+        """Load cached stints from disk if present"""
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            df = _typed(pd.read_csv(self.cache_file))
+            self.players = set(df['player_id'].unique().tolist())
+            self.stints = df.dropna(subset=['start_date']).reset_index(drop=True)
+            logger.info(f"Loaded {len(self.stints)} stints for {len(self.players)} players")
+        except Exception as e:
+            logger.warning(f"Could not load stint cache: {e}")
+
+    def __contains__(self, player_id: int) -> bool:
+        return player_id in self.players
+
+    def add_player(self, player_id: int, transfers: List[Dict]):
+        """Build and cache stints for one player"""
+        stints = build_stints(player_id, transfers)
+        if stints.empty:
+            stints = pd.DataFrame([{'player_id': player_id}], columns=STINT_COLUMNS)
+        self._frames.append(stints)
+        self.players.add(player_id)
+
+    def _consolidate(self):
+        """Fold pending per-player frames into the main table"""
+        if not self._frames:
+            return
+        pending = pd.concat(self._frames, ignore_index=True)
+        self._frames = []
+        pending = pending.dropna(subset=['start_date'])
+        if not pending.empty:
+            self.stints = _typed(pd.concat([self.stints, pending], ignore_index=True))
+
+    def save(self):
+        """Write the stint cache (including empty-history markers)"""
+        self._consolidate()
+        fetched_empty = self.players - set(self.stints['player_id'].unique().tolist())
+        markers = pd.DataFrame({'player_id': sorted(fetched_empty)}, columns=STINT_COLUMNS)
+        frames = [df for df in (self.stints, markers) if not df.empty]
+        out = pd.concat(frames, ignore_index=True) if frames else markers
+        out.sort_values(['player_id', 'start_date']).to_csv(self.cache_file, index=False)
+
+    def stints_for(self, player_id: int) -> pd.DataFrame:
+        """All stints for one player, sorted by start_date"""
+        self._consolidate()
+        return self.stints[self.stints['player_id'] == player_id].sort_values('start_date')
+
+    def ensure_players(self, scraper, player_urls: Iterable[str], save_every: int = 25):
+        """
+        Fetch transfer history for every player not yet cached
+
+        Args:
+            scraper: TransfermarktScraper used for transfer page fetches
+            player_urls: Profile URLs of the players to cover
+            save_every: Persist the cache after this many new players
+        """
+        fetched = 0
+        for url in player_urls:
+            player_id = extract_player_id(url)
+            if player_id is None or player_id in self.players:
+                continue
+            self.add_player(player_id, scraper.get_player_transfer_history(url))
+            fetched += 1
+            if fetched % save_every == 0:
+                self.save()
+        if fetched:
+            self.save()
+        logger.info(f"Fetched transfer history for {fetched} uncached players")
+
+    def attribute(self, injuries: pd.DataFrame, date_column: str = 'injury_date') -> pd.DataFrame:
+        """
+        Attribute every injury to the team the player belonged to on that day
+
+        Uses a single merge_asof by player_id over stints sorted by start_date,
+        then drops matches that fall after the stint's end_date.
+
+        Args:
+            injuries: Injury table with player_id and a date column
+            date_column: Column holding the injury date
+
+        Returns:
+            Copy of injuries with stint_team_id and stint_team columns
+        """
+        self._consolidate()
+        result = injuries.copy()
+        result['_row'] = range(len(result))
+        result['_date'] = parse_dates(result[date_column])
+        left = result.dropna(subset=['_date', 'player_id'])[['_row', 'player_id', '_date']]
+        left = left.astype({'player_id': 'int64'}).sort_values('_date')
+        right = self.stints.sort_values('start_date')
+
+        matched = pd.merge_asof(
+            left, right,
+            left_on='_date', right_on='start_date',
+            by='player_id', direction='backward'
+        )
+        open_ended = matched['end_date'].isna()
+        matched = matched[open_ended | (matched['_date'] <= matched['end_date'])]
+        matched = matched.set_index('_row')
+
+        result['stint_team_id'] = matched['team_id'].reindex(result['_row']).to_numpy()
+        result['stint_team'] = matched['team_name'].reindex(result['_row']).to_numpy()
+        result['stint_team_id'] = result['stint_team_id'].astype('Int64')
+        return result.drop(columns=['_row', '_date'])
+
+
+def main():
+    """Build the stint cache for every player in the dataset and attribute injuries"""
+    from scrape_mls_injuries import TransfermarktScraper
+
+    print("="*70)
+    print("MLS Injury Data - Transfer Stint Attribution")
+    print("="*70)
+
+    scraper = TransfermarktScraper(delay=3.0)
+    index = TransferStintIndex()
+
+    injuries = pd.read_csv("mls_player_injuries.csv")
+    scraper.registry.register_from_dataset(injuries)
+    scraper.registry.add_id_columns(injuries)
+    scraper.registry.attach_player_urls(injuries)
+
+    player_urls = injuries.drop_duplicates('player_id')['player_url'].dropna()
+    print(f"\nPlayers: {len(player_urls):,} ({len(index.players):,} already cached)")
+    index.ensure_players(scraper, player_urls)
+
+    attributed = index.attribute(injuries)
+    attributed.to_csv("mls_player_injuries_team_attributed.csv", index=False)
+
+    print(f"\n✓ Attributed {attributed['stint_team'].notna().sum():,} of {len(attributed):,} injuries")
+    print("✓ Saved mls_player_injuries_team_attributed.csv")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Lease-based work queue for sharded scraping
+Workers in any number of processes (or machines sharing a filesystem) lease
+team-season and player units, and units whose lease expires are handed out again
+"""
+
+import os
+import json
+import time
+import fcntl
+import sqlite3
+import logging
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueBackend(ABC):
+    """Storage interface for work units (dicts with unit_id, kind, priority, payload)"""
+
+    @abstractmethod
+    def add(self, units: List[Dict]) -> int:
+        """Insert units that are not already queued; returns number inserted"""
+
+    @abstractmethod
+    def lease(self, worker_id: str, limit: int, lease_seconds: float, max_attempts: int) -> List[Dict]:
+        """Claim up to `limit` available units for a worker"""
+
+    @abstractmethod
+    def complete(self, unit_id: str, worker_id: str) -> bool:
+        """Mark a leased unit done; False if the lease was lost"""
+
+    @abstractmethod
+    def fail(self, unit_id: str, worker_id: str, error: str, retry_delay: float, max_attempts: int) -> bool:
+        """Release a leased unit for retry (or mark it failed after max_attempts)"""
+
+    @abstractmethod
+    def extend(self, unit_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Push out a lease the worker still holds"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of units per status"""
+
+    @abstractmethod
+    def units(self, status: Optional[str] = None, kind: Optional[str] = None) -> List[Dict]:
+        """List units, optionally filtered by status and kind"""
+
+
+class SQLiteQueueBackend(QueueBackend):
+    """Work queue stored in a SQLite database (safe across processes on one host)"""
+
+    def __init__(self, path: str = "scrape_queue.db"):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS work_units (
+                    unit_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    priority REAL NOT NULL DEFAULT 0,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    available_at REAL NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_units_status ON work_units (status, priority, available_at)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_unit(row: sqlite3.Row) -> Dict:
+        unit = dict(row)
+        unit['payload'] = json.loads(unit['payload'])
+        return unit
+
+    def add(self, units: List[Dict]) -> int:
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR IGNORE INTO work_units (unit_id, kind, priority, payload) VALUES (?, ?, ?, ?)",
+                [(u['unit_id'], u['kind'], u.get('priority', 0), json.dumps(u['payload'])) for u in units]
+            )
+            conn.execute("COMMIT")
+            return conn.total_changes - before
+
+    def lease(self, worker_id: str, limit: int, lease_seconds: float, max_attempts: int) -> List[Dict]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # An expired lease counts as a failed attempt: fail exhausted units
+            # first so they do not take up the LIMIT below
+            conn.execute(
+                """
+                UPDATE work_units SET status = 'failed', lease_owner = NULL
+                WHERE attempts >= ?
+                  AND ((status = 'pending' AND available_at <= ?)
+                       OR (status = 'leased' AND lease_expires < ?))
+                """,
+                (max_attempts, now, now)
+            )
+            rows = conn.execute(
+                """
+                SELECT * FROM work_units
+                WHERE ((status = 'pending' AND available_at <= ?)
+                       OR (status = 'leased' AND lease_expires < ?))
+                  AND attempts < ?
+                ORDER BY priority, unit_id
+                LIMIT ?
+                """,
+                (now, now, max_attempts, limit)
+            ).fetchall()
+            leased = []
+            for row in rows:
+                attempts = row['attempts'] + 1
+                conn.execute(
+                    """
+                    UPDATE work_units
+                    SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = ?
+                    WHERE unit_id = ?
+                    """,
+                    (worker_id, now + lease_seconds, attempts, row['unit_id'])
+                )
+                unit = self._row_to_unit(row)
+                unit.update(status=LEASED, lease_owner=worker_id, attempts=attempts)
+                leased.append(unit)
+            conn.execute("COMMIT")
+            return leased
+
+    def complete(self, unit_id: str, worker_id: str) -> bool:
+        with self._connect() as conn:
+            cur = conn.execute(
+                """
+                UPDATE work_units SET status = 'done', lease_owner = NULL, lease_expires = NULL
+                WHERE unit_id = ? AND status = 'leased' AND lease_owner = ?
+                """,
+                (unit_id, worker_id)
+            )
+            return cur.rowcount == 1
+
+    def fail(self, unit_id: str, worker_id: str, error: str, retry_delay: float, max_attempts: int) -> bool:
+        with self._connect() as conn:
+            cur = conn.execute(
+                """
+                UPDATE work_units
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    lease_owner = NULL, lease_expires = NULL,
+                    available_at = ?, last_error = ?
+                WHERE unit_id = ? AND status = 'leased' AND lease_owner = ?
+                """,
+                (max_attempts, time.time() + retry_delay, error, unit_id, worker_id)
+            )
+            return cur.rowcount == 1
+
+    def extend(self, unit_id: str, worker_id: str, lease_seconds: float) -> bool:
+        with self._connect() as conn:
+            cur = conn.execute(
+                """
+                UPDATE work_units SET lease_expires = ?
+                WHERE unit_id = ? AND status = 'leased' AND lease_owner = ?
+                """,
+                (time.time() + lease_seconds, unit_id, worker_id)
+            )
+            return cur.rowcount == 1
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM work_units GROUP BY status").fetchall()
+            return {status: count for status, count in rows}
+
+    def units(self, status: Optional[str] = None, kind: Optional[str] = None) -> List[Dict]:
+        query, params = "SELECT * FROM work_units WHERE 1 = 1", []
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self._connect() as conn:
+            return [self._row_to_unit(r) for r in conn.execute(query + " ORDER BY priority, unit_id", params)]
+
+
+class FileLockQueueBackend(QueueBackend):
+    """
+    Work queue stored as a JSON file guarded by an flock'd lock file
+
+    Slower than SQLite for large queues but works on filesystems where
+    SQLite locking is unreliable (e.g. some network mounts).
+    """
+
+    def __init__(self, path: str = "scrape_queue.json"):
+        self.path = path
+        self.lock_path = path + ".lock"
+
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                units = {}
+                if os.path.exists(self.path):
+                    with open(self.path, 'r') as f:
+                        units = json.load(f)
+                yield units
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(units, f)
+                os.replace(tmp_path, self.path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def add(self, units: List[Dict]) -> int:
+        inserted = 0
+        with self._locked() as store:
+            for u in units:
+                if u['unit_id'] in store:
+                    continue
+                store[u['unit_id']] = {
+                    'unit_id': u['unit_id'], 'kind': u['kind'], 'priority': u.get('priority', 0),
+                    'payload': u['payload'], 'status': PENDING, 'lease_owner': None,
+                    'lease_expires': None, 'available_at': 0, 'attempts': 0, 'last_error': None
+                }
+                inserted += 1
+        return inserted
+
+    def lease(self, worker_id: str, limit: int, lease_seconds: float, max_attempts: int) -> List[Dict]:
+        now = time.time()
+        leased = []
+        with self._locked() as store:
+            available = [
+                u for u in store.values()
+                if (u['status'] == PENDING and u['available_at'] <= now)
+                or (u['status'] == LEASED and u['lease_expires'] < now)
+            ]
+            # Fail exhausted units before applying the limit
+            for unit in available:
+                if unit['attempts'] >= max_attempts:
+                    unit.update(status=FAILED, lease_owner=None)
+            available = [u for u in available if u['status'] != FAILED]
+            available.sort(key=lambda u: (u['priority'], u['unit_id']))
+            for unit in available[:limit]:
+                unit['attempts'] += 1
+                unit.update(status=LEASED, lease_owner=worker_id, lease_expires=now + lease_seconds)
+                leased.append(dict(unit))
+        return leased
+
+    def _owned(self, store: Dict, unit_id: str, worker_id: str) -> Optional[Dict]:
+        unit = store.get(unit_id)
+        if unit and unit['status'] == LEASED and unit['lease_owner'] == worker_id:
+            return unit
+        return None
+
+    def complete(self, unit_id: str, worker_id: str) -> bool:
+        with self._locked() as store:
+            unit = self._owned(store, unit_id, worker_id)
+            if unit:
+                unit.update(status=DONE, lease_owner=None, lease_expires=None)
+            return unit is not None
+
+    def fail(self, unit_id: str, worker_id: str, error: str, retry_delay: float, max_attempts: int) -> bool:
+        with self._locked() as store:
+            unit = self._owned(store, unit_id, worker_id)
+            if unit:
+                unit.update(
+                    status=FAILED if unit['attempts'] >= max_attempts else PENDING,
+                    lease_owner=None, lease_expires=None,
+                    available_at=time.time() + retry_delay, last_error=error
+                )
+            return unit is not None
+
+    def extend(self, unit_id: str, worker_id: str, lease_seconds: float) -> bool:
+        with self._locked() as store:
+            unit = self._owned(store, unit_id, worker_id)
+            if unit:
+                unit['lease_expires'] = time.time() + lease_seconds
+            return unit is not None
+
+    def counts(self) -> Dict[str, int]:
+        with self._locked() as store:
+            counts: Dict[str, int] = {}
+            for unit in store.values():
+                counts[unit['status']] = counts.get(unit['status'], 0) + 1
+            return counts
+
+    def units(self, status: Optional[str] = None, kind: Optional[str] = None) -> List[Dict]:
+        with self._locked() as store:
+            selected = [
+                dict(u) for u in store.values()
+                if (status is None or u['status'] == status) and (kind is None or u['kind'] == kind)
+            ]
+        return sorted(selected, key=lambda u: (u['priority'], u['unit_id']))
+
+
+def open_backend(location: str) -> QueueBackend:
+    """
+    Open a queue backend from a location string
+
+    Args:
+        location: 'sqlite:///queue.db' or 'file:///queue.json' (four slashes
+            for an absolute path), or a bare path (.json selects the
+            file-lock backend)
+    """
+    if location.startswith('sqlite:///'):
+        return SQLiteQueueBackend(location[len('sqlite:///'):])
+    if location.startswith('file:///'):
+        return FileLockQueueBackend(location[len('file:///'):])
+    if location.endswith('.json'):
+        return FileLockQueueBackend(location)
+    return SQLiteQueueBackend(location)
+
+
+class WorkQueue:
+    """Team-season and player work units on top of a pluggable backend"""
+
+    TEAM_SEASON = 'team_season'
+    PLAYER = 'player'
+
+    def __init__(self, backend: QueueBackend, lease_seconds: float = 600.0, max_attempts: int = 5,
+                 retry_delay: float = 60.0):
+        """
+        Args:
+            backend: Storage backend shared by all workers
+            lease_seconds: How long a worker owns a unit before it is re-issued
+            max_attempts: Attempts (including expired leases) before a unit is marked failed
+            retry_delay: Seconds a failed unit waits before it can be leased again
+        """
+        self.backend = backend
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    @staticmethod
+    def team_season_unit(season: str, team: Dict, priority: float = 0) -> Dict:
+        """Build a unit that expands one squad page into player units"""
+        return {
+            'unit_id': f"team:{season}:{team['team_id']}",
+            'kind': WorkQueue.TEAM_SEASON,
+            'priority': priority,
+            'payload': {'season': season, 'team': team}
+        }
+
+    @staticmethod
+    def player_unit(season: str, team: Dict, player: Dict, priority: float = 0) -> Dict:
+        """Build a unit that fetches one player's injury page for a season"""
+        return {
+            'unit_id': f"player:{season}:{player['player_id']}",
+            'kind': WorkQueue.PLAYER,
+            'priority': priority,
+            'payload': {'season': season, 'team': team, 'player': player}
+        }
+
+    def add(self, units: List[Dict]) -> int:
+        return self.backend.add(units) if units else 0
+
+    def lease(self, worker_id: str, limit: int = 1) -> List[Dict]:
+        return self.backend.lease(worker_id, limit, self.lease_seconds, self.max_attempts)
+
+    def complete(self, unit: Dict, worker_id: str) -> bool:
+        ok = self.backend.complete(unit['unit_id'], worker_id)
+        if not ok:
+            logger.warning(f"Lease lost before completing {unit['unit_id']}")
+        return ok
+
+    def fail(self, unit: Dict, worker_id: str, error: str, permanent: bool = False) -> bool:
+        """
+        Release a unit for retry with exponential backoff
+
+        Args:
+            permanent: Mark the unit failed now (errors retrying cannot fix)
+        """
+        delay = self.retry_delay * (2 ** max(unit.get('attempts', 1) - 1, 0))
+        max_attempts = 0 if permanent else self.max_attempts
+        return self.backend.fail(unit['unit_id'], worker_id, error, delay, max_attempts)
+
+    def extend(self, unit: Dict, worker_id: str) -> bool:
+        return self.backend.extend(unit['unit_id'], worker_id, self.lease_seconds)
+
+    def counts(self) -> Dict[str, int]:
+        return self.backend.counts()
+
+    def is_drained(self) -> bool:
+        counts = self.counts()
+        return counts.get(PENDING, 0) == 0 and counts.get(LEASED, 0) == 0